@@ -1,4 +1,7 @@
+import os
 import uvicorn
 
 if __name__ == "__main__":
-    uvicorn.run("src.api:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    # Auto-reload only works with a single worker; with more, sessions are shared through SESSION_BACKEND
+    workers = int(os.getenv("API_WORKERS", "1"))
+    uvicorn.run("src.api:app", host="0.0.0.0", port=8000, reload=workers == 1, workers=workers)
@@ -1,11 +1,14 @@
 from fastapi.responses import FileResponse
 from .core.config import app
-from .routes import chat, documents, sessions
+from .routes import chat, documents, jobs, metrics, search, sessions
 
 # Include routers
 app.include_router(chat.router, tags=["chat"])
 app.include_router(documents.router, tags=["documents"])
 app.include_router(sessions.router, tags=["sessions"])
+app.include_router(jobs.router, tags=["jobs"])
+app.include_router(search.router, tags=["search"])
+app.include_router(metrics.router, tags=["metrics"])
 
 @app.get("/")
 async def read_root():
@@ -2,11 +2,52 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import logging
+import os
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Maximum number of QA chain runs in flight per process; further chats wait their turn
+QA_MAX_CONCURRENCY = int(os.getenv("QA_MAX_CONCURRENCY", "4"))
+
+# Sessions idle longer than the TTL are evicted, as are the least recently used ones while the
+# estimated footprint of all sessions exceeds the memory budget
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_MEMORY_BUDGET_BYTES = int(os.getenv("SESSION_MEMORY_BUDGET_BYTES", str(1024 * 1024 * 1024)))
+
+# Where session snapshots are persisted so sessions survive restarts and are shared by workers:
+# "file" (one JSON file per session in SESSION_STORE_DIR), "sqlite" (SESSION_STORE_PATH) or
+# "memory" (not persisted; only safe with a single worker)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "file")
+SESSION_STORE_DIR = os.getenv("SESSION_STORE_DIR", ".cache/sessions")
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", ".cache/sessions.sqlite")
+
+# Answer cache: entries kept in memory, their lifetime, and an optional SQLite file to persist them
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(24 * 3600)))
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH") or None
+
+# Streaming ingest: chunks embedded per call, and items buffered between pipeline stages
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+
+# Uploaded PDFs: where they are kept, bytes read per step while streaming them to disk, the largest
+# accepted upload, and how long an unused upload is kept
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", ".cache/uploads")
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_TTL_SECONDS = float(os.getenv("UPLOAD_TTL_SECONDS", str(24 * 3600)))
+
+# Background jobs (document ingestion): worker threads per process, finished jobs kept for polling,
+# and how often a running job's progress is saved to the session store for other workers to report
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "2"))
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "256"))
+JOB_PROGRESS_SAVE_SECONDS = float(os.getenv("JOB_PROGRESS_SAVE_SECONDS", "1"))
+
+# Corpus search: how often each worker picks up documents other workers added to the artifact cache
+CORPUS_REFRESH_SECONDS = float(os.getenv("CORPUS_REFRESH_SECONDS", "30"))
+
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application."""
     app = FastAPI(title="RAG API", description="API for document processing and chat")
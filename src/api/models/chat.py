@@ -1,14 +1,17 @@
 from pydantic import BaseModel
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Any
 
 class ChatRequest(BaseModel):
     query: str
     session_id: Optional[str] = None
+    bypass_cache: bool = False
 
 class ChatResponse(BaseModel):
     response: str
     session_id: str
     context: Optional[str] = None
+    cached: bool = False
+    faq_match: Optional[Dict[str, Any]] = None
 
 class ChatMessage(BaseModel):
     query: str
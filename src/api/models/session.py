@@ -3,9 +3,14 @@ from typing import Optional, Dict, Any, List
 
 class SessionData(BaseModel):
     pdf_path: Optional[str] = None
+    document_id: Optional[str] = None  # Handle returned by POST /upload; takes precedence over pdf_path
 
 class SessionState(BaseModel):
     pdf_path: Optional[str] = None
+    document_hash: Optional[str] = None
+    vector_bytes: int = 0
+    chunk_bytes: int = 0
     qa_chain: Optional[Any] = None
     summary: Optional[str] = None
-    faqs: Optional[List[Dict[str, str]]] = None 
\ No newline at end of file
+    faqs: Optional[List[Dict[str, str]]] = None
+    job_id: Optional[str] = None 
\ No newline at end of file
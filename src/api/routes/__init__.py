@@ -1,3 +1,3 @@
-from . import chat, documents, sessions
+from . import chat, documents, jobs, metrics, search, sessions
 
-__all__ = ['chat', 'documents', 'sessions'] 
\ No newline at end of file
+__all__ = ['chat', 'documents', 'jobs', 'metrics', 'search', 'sessions'] 
\ No newline at end of file
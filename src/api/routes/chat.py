@@ -2,7 +2,9 @@ from fastapi import APIRouter, WebSocket, HTTPException, WebSocketDisconnect
 from ..models.chat import ChatRequest, ChatResponse, ChatMessage
 from ..core.config import logger
 from ..services.session import session_manager
+from ..services.answers import answer_question, astream_answer
 from typing import Dict, Any
+import asyncio
 import json
 
 router = APIRouter()
@@ -14,37 +16,60 @@ async def chat(request: ChatRequest):
         if not request.session_id:
             raise HTTPException(status_code=400, detail="Missing session_id")
             
-        session = session_manager.get_session(request.session_id)
+        session = await asyncio.to_thread(session_manager.get_session, request.session_id)
         if not session:
             raise HTTPException(status_code=400, detail="Invalid session_id")
             
         qa_chain = session.get("qa_chain")
+        if not qa_chain and session.get("job_id"):
+            raise HTTPException(status_code=409, detail=f"Document is still being indexed; see /jobs/{session['job_id']}")
         if not qa_chain:
             raise HTTPException(status_code=400, detail="No QA chain initialized for this session")
             
-        result = qa_chain({"question": request.query})
+        result = await answer_question(
+            qa_chain,
+            request.query,
+            document_hash=session.get("document_hash"),
+            bypass_cache=request.bypass_cache
+        )
+        await asyncio.to_thread(session_manager.record_turn, request.session_id)
         
         return ChatResponse(
-            response=result["answer"],
+            response=result["response"],
             session_id=request.session_id,
-            context="\n".join([doc.page_content for doc in result["source_documents"]])
+            context="\n".join(result["sources"]),
+            cached=result["cached"],
+            faq_match=result["faq_match"]
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.websocket("/ws/chat/{session_id}")
 async def websocket_chat(websocket: WebSocket, session_id: str):
-    """WebSocket endpoint for real-time chat."""
+    """WebSocket endpoint for real-time chat.
+    
+    Messages are {"query": ..., "stream": bool, "bypass_cache": bool}. Without "stream" the
+    server replies with a single {"response", "sources", "cached", "faq_match"} message.
+    With "stream": true it sends a {"type": "start"} frame, one {"type": "delta", "delta": token}
+    frame per generated token and a final
+    {"type": "end", "response", "sources", "cached", "faq_match"} frame.
+    """
     logger.info(f"WebSocket connection attempt for session {session_id}")
     
-    session = session_manager.get_session(session_id)
+    session = await asyncio.to_thread(session_manager.get_session, session_id)
     if not session:
         logger.error(f"Invalid session {session_id}")
         await websocket.close(code=4003, reason="Invalid session")
         return
         
     qa_chain = session.get("qa_chain")
+    if not qa_chain and session.get("job_id"):
+        logger.info(f"Document of session {session_id} is still being indexed")
+        await websocket.close(code=4009, reason="Document is still being indexed")
+        return
     if not qa_chain:
         logger.error(f"No QA chain found for session {session_id}")
         await websocket.close(code=4003, reason="No QA chain initialized")
@@ -68,16 +93,34 @@ async def websocket_chat(websocket: WebSocket, session_id: str):
                 })
                 continue
                 
+            # Look the session up again: it keeps it alive, and rehydrates it if it was evicted while idle
+            session = await asyncio.to_thread(session_manager.get_session, session_id)
+            if not session or not session.get("qa_chain"):
+                logger.info(f"Session {session_id} no longer exists")
+                await websocket.close(code=4003, reason="Invalid session")
+                return
+            qa_chain = session["qa_chain"]
+            
             logger.info(f"Processing query in session {session_id}: {query}")
+            if data.get("stream"):
+                await stream_answer(websocket, session_id, session, qa_chain, query, data.get("bypass_cache", False))
+                continue
+            
             try:
-                result = qa_chain({"question": query})
-                answer = result["answer"]
-                sources = [doc.page_content for doc in result["source_documents"]]
+                result = await answer_question(
+                    qa_chain,
+                    query,
+                    document_hash=session.get("document_hash"),
+                    bypass_cache=data.get("bypass_cache", False)
+                )
+                await asyncio.to_thread(session_manager.record_turn, session_id)
                 
                 logger.info(f"Sending response for session {session_id}")
                 response_data = {
-                    "response": answer,
-                    "sources": sources
+                    "response": result["response"],
+                    "sources": result["sources"],
+                    "cached": result["cached"],
+                    "faq_match": result["faq_match"]
                 }
                 logger.info(f"Response data: {json.dumps(response_data, indent=2)}")
                 await websocket.send_json(response_data)
@@ -100,4 +143,30 @@ async def websocket_chat(websocket: WebSocket, session_id: str):
                 "sources": []
             })
         except:
-            pass 
\ No newline at end of file
+            pass 
+
+async def stream_answer(
+    websocket: WebSocket,
+    session_id: str,
+    session: Dict[str, Any],
+    qa_chain: Any,
+    query: str,
+    bypass_cache: bool = False
+) -> None:
+    """Send the answer to one query as start, delta and end frames."""
+    await websocket.send_json({"type": "start", "query": query})
+    try:
+        async for frame in astream_answer(qa_chain, query, session.get("document_hash"), bypass_cache):
+            await websocket.send_json(frame)
+        await asyncio.to_thread(session_manager.record_turn, session_id)
+        logger.info(f"Finished streaming response for session {session_id}")
+    except WebSocketDisconnect:
+        raise
+    except Exception as e:
+        logger.error(f"Error streaming query in session {session_id}: {str(e)}")
+        await websocket.send_json({
+            "type": "error",
+            "error": f"Error processing query: {str(e)}",
+            "response": "",
+            "sources": []
+        })
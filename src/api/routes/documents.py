@@ -1,74 +1,75 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException
-from ..services.pdf import extract_text_from_pdf
-from ..services.qa import initialize_qa_chain
+from ..services.artifacts import prepare_document
+from ..services.faqs import aget_document_faqs, generate_document_faqs
+from ..services.uploads import UploadTooLarge, upload_store
 from ..core.config import logger
 from typing import Dict
-import tempfile
-import json
+import asyncio
 
 router = APIRouter()
 
 @router.post("/upload")
 async def upload_document(file: UploadFile = File(...)):
-    """Upload a PDF document and process it."""
+    """Upload a PDF document.
+    
+    The file is streamed to disk and registered under a document handle; pass it as
+    document_id to POST /sessions/{session_id}, which indexes the document.
+    """
     try:
-        # Create a temporary file to store the uploaded PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file.flush()
-            
-            # Process the PDF
-            text = extract_text_from_pdf(temp_file.name)
-            qa_chain, document_state = initialize_qa_chain([text])
-            
-            return {
-                "message": "Document processed successfully",
-                "text": text,
-                "temp_path": temp_file.name
-            }
-            
+        upload = await upload_store.save(file)
+        return {
+            "message": "Document uploaded successfully",
+            **upload,
+            "temp_path": upload_store.resolve(upload["document_id"])
+        }
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Error uploading document: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.delete("/documents/{document_id}")
+async def delete_document(document_id: str):
+    """Delete an uploaded document; its cached artifacts are kept."""
+    if upload_store.delete(document_id):
+        return {"message": "Document deleted successfully"}
+    raise HTTPException(status_code=404, detail="Document not found")
+
+@router.get("/documents/{document_id}/faqs")
+async def get_document_faqs(document_id: str):
+    """Return the FAQs of an indexed document, generating them from its cached chunks on first use."""
+    try:
+        faqs = await aget_document_faqs(document_id)
+        if faqs is None:
+            raise HTTPException(status_code=404, detail="Document not indexed; create a session with it first")
+        return {"document_id": document_id, "faqs": faqs}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating FAQs for document {document_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/faq")
 async def generate_faq(data: Dict[str, str]):
-    """Generate FAQs from a document."""
+    """Generate FAQs from a document, given its document_id or PDF path."""
     try:
         logger.info("Generating FAQs for document")
         pdf_path = data.get("pdf_path")
+        document_id = data.get("document_id")
+        if document_id:
+            pdf_path = upload_store.resolve(document_id)
+            if pdf_path is None:
+                raise HTTPException(status_code=404, detail="Document not found; upload it again")
         if not pdf_path:
-            raise HTTPException(status_code=400, detail="PDF path is required")
+            raise HTTPException(status_code=400, detail="Document ID or PDF path is required")
             
         logger.info(f"Processing PDF: {pdf_path}")
-        text = extract_text_from_pdf(pdf_path)
-        
-        # Initialize QA chain for FAQ generation
-        qa_chain, _ = initialize_qa_chain([text])
-        
-        # Generate FAQs using the QA chain
-        faq_prompt = """Based on the following document content, generate 5 frequently asked questions (FAQs) that would be most relevant for users trying to understand this document. For each FAQ, provide a clear and concise answer.
-
-Document Content:
-{context}
-
-Please format the response as a JSON array of objects with 'question' and 'answer' fields."""
-        
-        # Get FAQs from QA chain
-        result = qa_chain({"question": faq_prompt})
-        faqs = result["answer"]
-        
-        # Try to parse the JSON response
-        try:
-            faqs = json.loads(faqs)
-        except json.JSONDecodeError:
-            # If parsing fails, create a simple FAQ structure
-            faqs = [{"question": "What is this document about?", "answer": "This document appears to be a technical specification or regulatory document."}]
-        
-        logger.info(f"Generated {len(faqs)} FAQs")
+        document = await asyncio.to_thread(prepare_document, pdf_path, None, document_id)
+        faqs = await asyncio.to_thread(generate_document_faqs, document["document_hash"], document["chunks"])
         return {"faqs": faqs}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating FAQs: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
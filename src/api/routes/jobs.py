@@ -0,0 +1,12 @@
+from fastapi import APIRouter, HTTPException
+from ..services.jobs import job_manager
+
+router = APIRouter()
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Return the status and per-stage progress of a background job, whichever worker runs it."""
+    status = job_manager.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from ...config.settings import embedding_service, embeddings
+from ...common.faq_index import faq_fast_path_stats
+from ..services.answer_cache import answer_cache
+from ..services.corpus import corpus_index
+from ..services.jobs import job_manager
+from ..services.session import session_manager
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def get_metrics():
+    """Return runtime metrics for the shared services."""
+    return {
+        "embedding_service": embedding_service.stats(),
+        "embedding_cache": embeddings.inner.stats(),
+        "answer_cache": answer_cache.stats(),
+        "faq_fast_path": faq_fast_path_stats.stats(),
+        "jobs": job_manager.stats(),
+        "corpus_index": corpus_index.stats(),
+        "sessions": {key: value for key, value in session_manager.stats().items() if key != "sessions"}
+    }
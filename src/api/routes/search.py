@@ -0,0 +1,19 @@
+from fastapi import APIRouter, HTTPException
+from ..services.corpus import asearch_corpus, corpus_index
+from ..core.config import logger
+from typing import Dict, Any
+
+router = APIRouter()
+
+@router.post("/search")
+async def search_corpus(data: Dict[str, Any]):
+    """Search the chunks of every indexed document, or of the given document_ids."""
+    query = data.get("query")
+    if not query:
+        raise HTTPException(status_code=400, detail="Query is required")
+    try:
+        results = await asearch_corpus(query, int(data.get("k", 4)), data.get("document_ids"))
+        return {"query": query, "index": corpus_index.index_kind, "results": results}
+    except Exception as e:
+        logger.error(f"Error searching the corpus: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,49 +1,92 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
 from ..models.session import SessionData, SessionState
-from ..services.pdf import extract_text_from_pdf
-from ..services.qa import initialize_qa_chain
-from ..services.session import session_manager
+from ..services.jobs import job_manager
+from ..services.session import build_document_session, session_manager
+from ..services.uploads import upload_store
+from ..services.faqs import aget_document_faqs
 from ..core.config import logger
 from typing import Dict, Any
+import asyncio
 
 router = APIRouter()
 
 @router.post("/sessions/{session_id}")
-async def create_session(session_id: str, session_data: SessionData):
-    """Create a new session with the given PDF path"""
+async def create_session(session_id: str, session_data: SessionData, wait: bool = False):
+    """Create a new session with the given uploaded document (document_id) or PDF path.
+    
+    The document is indexed by a background job: the response is 202 with the job ID, and
+    GET /jobs/{job_id} reports progress. The session answers questions once the job has
+    succeeded. With wait=true the request blocks until then instead.
+    """
     try:
+        pdf_path = session_data.pdf_path
+        if session_data.document_id:
+            pdf_path = upload_store.resolve(session_data.document_id)
+            if pdf_path is None:
+                raise HTTPException(status_code=404, detail="Document not found; upload it again")
+        
         # Initialize session data
         session = SessionState(
-            pdf_path=session_data.pdf_path,
+            pdf_path=pdf_path,
             qa_chain=None,
             summary=None,
             faqs=None
         )
+        session_manager.create_session(session_id, session)
         
-        # Only process PDF if path is provided
-        if session_data.pdf_path:
-            # Extract text from PDF
-            text = extract_text_from_pdf(session_data.pdf_path)
-            
-            # Generate summary and FAQs
-            summary = "Document summary will be generated here"  # Placeholder for now
-            faqs = []  # Placeholder for now
-            
-            # Create QA chain
-            qa_chain, document_state = initialize_qa_chain([text], summary, faqs)
-            
-            # Update session data
-            session.qa_chain = qa_chain
-            session.summary = summary
-            session.faqs = faqs
+        # Without a PDF the session is ready right away
+        if not pdf_path:
+            return {"session_id": session_id, "status": "created"}
         
-        # Store session data
-        session_manager.create_session(session_id, session)
-        return {"session_id": session_id, "status": "created"}
+        job = job_manager.submit(
+            "ingest",
+            build_document_session,
+            session_id,
+            pdf_path,
+            document_hash=session_data.document_id,
+            subject=session_id
+        )
+        session_manager.update_session(session_id, {"job_id": job.id})
+        if wait:
+            await asyncio.wrap_future(job_manager.future(job.id))
+            return {"session_id": session_id, "status": "created", "job_id": job.id}
+        return JSONResponse(status_code=202, content={
+            "session_id": session_id,
+            "status": "indexing",
+            "job_id": job.id,
+            "status_url": f"/jobs/{job.id}"
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating session {session_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/sessions/{session_id}/faqs")
+async def get_session_faqs(session_id: str):
+    """Return the FAQs of a session's document, generating them from its cached chunks on first use."""
+    session = await asyncio.to_thread(session_manager.get_session, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if session.get("job_id") and not session.get("qa_chain"):
+        raise HTTPException(status_code=409, detail=f"Document is still being indexed; see /jobs/{session['job_id']}")
+    if not session.get("document_hash"):
+        raise HTTPException(status_code=400, detail="Session has no document")
+    try:
+        faqs = await aget_document_faqs(session["document_hash"])
+    except Exception as e:
+        logger.error(f"Error generating FAQs for session {session_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if faqs is None:
+        raise HTTPException(status_code=404, detail="Document artifacts are no longer cached")
+    return {"session_id": session_id, "document_hash": session["document_hash"], "faqs": faqs}
+
+@router.get("/sessions")
+async def list_sessions():
+    """List active sessions with their estimated memory footprint and last access time."""
+    return session_manager.stats()
+
 @router.delete("/sessions/{session_id}")
 async def delete_session(session_id: str):
     """Delete a chat session."""
@@ -1,3 +1,3 @@
-from . import pdf, qa, session
+from . import answer_cache, answers, artifacts, faqs, ingest, jobs, pdf, qa, session, session_store, uploads
 
-__all__ = ['pdf', 'qa', 'session'] 
\ No newline at end of file
+__all__ = ['answer_cache', 'answers', 'artifacts', 'faqs', 'ingest', 'jobs', 'pdf', 'qa', 'session', 'session_store', 'uploads'] 
\ No newline at end of file
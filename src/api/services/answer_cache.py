@@ -0,0 +1,124 @@
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+from ..core.config import ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_PATH
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def normalize_question(question: str) -> str:
+    """Normalize a question so trivially different phrasings share a cache entry."""
+    return re.sub(r"\s+", " ", question).strip().lower().rstrip("?.! ")
+
+class AnswerCache:
+    """Exact answer cache keyed by (document hash, normalized question, model, prompt version).
+    
+    Entries live in an in-memory LRU with a TTL. When a path is given they are also written
+    to SQLite, so answers survive restarts and are shared by every process using the file.
+    Async callers use aget/aput, which keep the SQLite access off the event loop.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        path: Optional[str] = ANSWER_CACHE_PATH
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+    
+    @staticmethod
+    def make_key(document_hash: str, question: str, model: str, prompt_version: str) -> str:
+        """Build the cache key for one question about one document."""
+        parts = [document_hash, normalize_question(question), model, prompt_version]
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+    
+    def _disk(self) -> Optional[sqlite3.Connection]:
+        """Open the SQLite store on first use, if persistence is enabled."""
+        if self.path and self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, value TEXT, created REAL)")
+            self._db.commit()
+        return self._db
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached answer for a key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._disk():
+                row = self._db.execute("SELECT value, created FROM answers WHERE key = ?", (key,)).fetchone()
+                if row:
+                    entry = {"value": json.loads(row[0]), "created": row[1]}
+                    self._remember(key, entry)
+            if entry is None or time.time() - entry["created"] > self.ttl_seconds:
+                if entry is not None:
+                    self._forget(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["value"]
+    
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store an answer, evicting the least recently used entries beyond the size limit."""
+        with self._lock:
+            entry = {"value": value, "created": time.time()}
+            self._remember(key, entry)
+            if self._disk():
+                self._db.execute(
+                    "INSERT OR REPLACE INTO answers (key, value, created) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), entry["created"])
+                )
+                self._db.execute("DELETE FROM answers WHERE created < ?", (time.time() - self.ttl_seconds,))
+                self._db.commit()
+    
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """Like get, running it in a worker thread when entries are also read from SQLite."""
+        if not self.path:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+    
+    async def aput(self, key: str, value: Dict[str, Any]) -> None:
+        """Like put, running it in a worker thread when entries are also written to SQLite."""
+        if not self.path:
+            self.put(key, value)
+            return
+        await asyncio.to_thread(self.put, key, value)
+    
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def _forget(self, key: str) -> None:
+        self._entries.pop(key, None)
+        if self._disk():
+            self._db.execute("DELETE FROM answers WHERE key = ?", (key,))
+            self._db.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the number of in-memory entries."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+                "entries": len(self._entries)
+            }
+
+# Create a global answer cache instance
+answer_cache = AnswerCache()
@@ -0,0 +1,119 @@
+from typing import Dict, Any, Optional, AsyncIterator
+from ...common.faq_index import faq_fast_path_stats
+from ...config.settings import FAQ_MATCH_THRESHOLD
+from .answer_cache import AnswerCache, answer_cache
+from .artifacts import get_faq_index
+from .qa import arun_qa_chain, astream_qa_chain, LLM_MODEL_NAME, QA_PROMPT_VERSION
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _is_standalone(qa_chain: Any) -> bool:
+    """Return True if a question to the chain stands on its own.
+    
+    Once the conversation has history the chain rewrites the question with it, so the same
+    text can ask something different ("what is the penalty for that?").
+    """
+    memory = getattr(qa_chain, "memory", None)
+    return memory is None or not memory.chat_memory.messages
+
+def _answer_cache_key(qa_chain: Any, question: str, document_hash: Optional[str]) -> Optional[str]:
+    """Return the answer cache key for a question, or None if the answer must not be cached.
+    
+    Only standalone questions are cached.
+    """
+    if not document_hash or not _is_standalone(qa_chain):
+        return None
+    return AnswerCache.make_key(document_hash, question, LLM_MODEL_NAME, QA_PROMPT_VERSION)
+
+def _remember_turn(qa_chain: Any, question: str, answer: str) -> None:
+    """Record a turn answered without the chain in the chain's memory, as if the chain had run."""
+    memory = getattr(qa_chain, "memory", None)
+    if memory is not None:
+        memory.save_context({"question": question}, {"answer": answer})
+
+async def _fast_answer(
+    qa_chain: Any,
+    question: str,
+    document_hash: Optional[str],
+    key: Optional[str],
+    bypass_cache: bool
+) -> Optional[Dict[str, Any]]:
+    """Answer a question from the answer cache or the document's FAQs, without the LLM.
+    
+    Returns None when neither applies and the QA chain has to run. Like the answer cache,
+    FAQs only answer standalone questions.
+    """
+    cached = await answer_cache.aget(key) if key and not bypass_cache else None
+    if cached is not None:
+        _remember_turn(qa_chain, question, cached["response"])
+        return {**cached, "cached": True, "faq_match": None}
+    
+    if not document_hash or not _is_standalone(qa_chain):
+        return None
+    faq_index = await asyncio.to_thread(get_faq_index, document_hash)
+    if faq_index is None:
+        return None
+    match = await faq_index.amatch(question, FAQ_MATCH_THRESHOLD)
+    faq_fast_path_stats.record(match is not None)
+    if match is None:
+        return None
+    logger.info(f"Answered from FAQ (score {match['score']}): {match['question']}")
+    _remember_turn(qa_chain, question, match["answer"])
+    return {"response": match["answer"], "sources": [], "cached": False, "faq_match": match}
+
+async def answer_question(
+    qa_chain: Any,
+    question: str,
+    document_hash: Optional[str] = None,
+    bypass_cache: bool = False
+) -> Dict[str, Any]:
+    """
+    Answer a question from the answer cache, a matching FAQ, or by running the QA chain.
+    
+    Returns {"response", "sources", "cached", "faq_match"}. Fresh answers to standalone
+    questions are stored for the document; bypass_cache skips the lookup but still
+    refreshes the entry.
+    """
+    # Key the answer before the chain runs and adds this turn to its memory
+    key = _answer_cache_key(qa_chain, question, document_hash)
+    fast = await _fast_answer(qa_chain, question, document_hash, key, bypass_cache)
+    if fast is not None:
+        return fast
+    
+    result = await arun_qa_chain(qa_chain, question)
+    answer = {
+        "response": result["answer"],
+        "sources": [doc.page_content for doc in result["source_documents"]]
+    }
+    if key:
+        await answer_cache.aput(key, answer)
+    return {**answer, "cached": False, "faq_match": None}
+
+async def astream_answer(
+    qa_chain: Any,
+    question: str,
+    document_hash: Optional[str] = None,
+    bypass_cache: bool = False
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream the answer to a question like astream_qa_chain, answering from the answer cache
+    or a matching FAQ when possible.
+    
+    Such an answer is sent as a single delta frame. The end frame carries "cached" and
+    "faq_match".
+    """
+    key = _answer_cache_key(qa_chain, question, document_hash)
+    fast = await _fast_answer(qa_chain, question, document_hash, key, bypass_cache)
+    if fast is not None:
+        yield {"type": "delta", "delta": fast["response"]}
+        yield {"type": "end", **fast}
+        return
+    
+    async for frame in astream_qa_chain(qa_chain, question):
+        if frame["type"] == "end":
+            if key:
+                await answer_cache.aput(key, {"response": frame["response"], "sources": frame["sources"]})
+            frame = {**frame, "cached": False, "faq_match": None}
+        yield frame
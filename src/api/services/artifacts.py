@@ -0,0 +1,112 @@
+from typing import Dict, Any, Callable, List, Optional
+from collections import OrderedDict
+from ...common.cache import artifact_cache, hash_file
+from ...common.faq_index import FAQIndex
+from ...config.settings import LLM_MODEL_NAME as FAQ_MODEL_NAME, PROMPT_VERSION
+from .ingest import ingest_document
+from .qa import CHUNKER_VERSION, EMBEDDING_MODEL_NAME, get_embeddings
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Version of the pypdf extraction step; bump when its output changes
+EXTRACTOR_VERSION = "pypdf-v1"
+
+# FAQs come from the FAQ graph (faq_generation_prompt, run by the settings LLM) over sections of
+# FAQ_SECTION_CHARS characters; bump PROMPT_VERSION when the prompt changes so cached FAQs are regenerated
+FAQ_SECTION_CHARS = 4000
+FAQ_PROMPT_VERSION = f"faq-graph-{PROMPT_VERSION}-{FAQ_SECTION_CHARS}"
+FAQ_CACHE_VERSION = (EXTRACTOR_VERSION, CHUNKER_VERSION, FAQ_MODEL_NAME, FAQ_PROMPT_VERSION)
+
+# Number of documents whose FAQ index is kept in memory
+FAQ_INDEX_CACHE_SIZE = 64
+
+def load_document(document_hash: str) -> Optional[Dict[str, Any]]:
+    """Load a document's text, chunks and vectors from the artifact cache by content hash.
+    
+    The vectors are memory-mapped rather than read into memory. Returns None unless all
+    three artifacts are cached.
+    """
+    text = artifact_cache.get(document_hash, "text", EXTRACTOR_VERSION)
+    chunks = artifact_cache.get(document_hash, "chunks", EXTRACTOR_VERSION, CHUNKER_VERSION)
+    vectors = artifact_cache.get_vectors(
+        document_hash, "embeddings", EXTRACTOR_VERSION, CHUNKER_VERSION, EMBEDDING_MODEL_NAME, mmap=True
+    )
+    if text is None or chunks is None or vectors is None:
+        return None
+    return {
+        "document_hash": document_hash,
+        "text": text,
+        "chunks": chunks,
+        "vectors": vectors,
+        "vectorstore": None
+    }
+
+def load_document_chunks(document_hash: str) -> Optional[Dict[str, Any]]:
+    """Load a document's chunks and memory-mapped vectors from the artifact cache, without its text."""
+    chunks = artifact_cache.get(document_hash, "chunks", EXTRACTOR_VERSION, CHUNKER_VERSION)
+    vectors = artifact_cache.get_vectors(
+        document_hash, "embeddings", EXTRACTOR_VERSION, CHUNKER_VERSION, EMBEDDING_MODEL_NAME, mmap=True
+    )
+    if chunks is None or vectors is None:
+        return None
+    return {"document_hash": document_hash, "chunks": chunks, "vectors": vectors}
+
+def prepare_document(
+    pdf_path: str,
+    on_progress: Optional[Callable[[Dict[str, int]], None]] = None,
+    document_hash: Optional[str] = None
+) -> Dict[str, Any]:
+    """Load a document's text, chunks and vectors from the artifact cache, ingesting it on a miss.
+    
+    A freshly ingested document also carries the populated "vectorstore" so callers can use
+    it without indexing the chunks again. Pass document_hash when the file's SHA-256 is
+    already known (e.g. an upload handle) to skip hashing it again.
+    """
+    doc_hash = document_hash or hash_file(pdf_path)
+    logger.info(f"Preparing document {pdf_path} ({doc_hash[:12]})")
+    
+    document = load_document(doc_hash)
+    if document is not None:
+        return document
+    
+    document = ingest_document(pdf_path, on_progress)
+    artifact_cache.put(doc_hash, "text", document["text"], EXTRACTOR_VERSION)
+    artifact_cache.put(doc_hash, "chunks", document["chunks"], EXTRACTOR_VERSION, CHUNKER_VERSION)
+    artifact_cache.put_vectors(
+        doc_hash, "embeddings", document["vectors"], EXTRACTOR_VERSION, CHUNKER_VERSION, EMBEDDING_MODEL_NAME
+    )
+    document["document_hash"] = doc_hash
+    return document
+
+def get_faqs(document_hash: str) -> Optional[List[Dict[str, str]]]:
+    """Return the generated FAQs of a document, or None if none have been generated yet."""
+    return artifact_cache.get(document_hash, "faqs", *FAQ_CACHE_VERSION)
+
+_faq_indexes: "OrderedDict[str, Optional[FAQIndex]]" = OrderedDict()
+_faq_indexes_lock = threading.Lock()
+
+def put_faqs(document_hash: str, faqs: List[Dict[str, str]]) -> None:
+    """Store the generated FAQs of a document and drop its stale FAQ index."""
+    artifact_cache.put(document_hash, "faqs", faqs, *FAQ_CACHE_VERSION)
+    with _faq_indexes_lock:
+        _faq_indexes.pop(document_hash, None)
+
+def get_faq_index(document_hash: str) -> Optional[FAQIndex]:
+    """Return the index over a document's FAQ questions, or None if it has no FAQs yet."""
+    with _faq_indexes_lock:
+        if document_hash in _faq_indexes:
+            _faq_indexes.move_to_end(document_hash)
+            return _faq_indexes[document_hash]
+    
+    faqs = get_faqs(document_hash)
+    if not faqs:
+        # Not cached: FAQs may still be generated for this document later
+        return None
+    index = FAQIndex(faqs, get_embeddings())
+    with _faq_indexes_lock:
+        _faq_indexes[document_hash] = index
+        while len(_faq_indexes) > FAQ_INDEX_CACHE_SIZE:
+            _faq_indexes.popitem(last=False)
+    return index
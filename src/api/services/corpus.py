@@ -0,0 +1,85 @@
+from typing import Dict, Any, List, Optional
+from ...common.cache import artifact_cache
+from ...common.corpus_index import CorpusIndex
+from ...config.settings import (
+    CORPUS_INDEX_KIND,
+    CORPUS_FLAT_MAX_VECTORS,
+    CORPUS_HNSW_MAX_VECTORS,
+    CORPUS_HNSW_M,
+    CORPUS_HNSW_EF_CONSTRUCTION,
+    CORPUS_HNSW_EF_SEARCH,
+    CORPUS_IVF_NLIST,
+    CORPUS_IVF_NPROBE
+)
+from ..core.config import CORPUS_REFRESH_SECONDS
+from .artifacts import load_document_chunks
+from .qa import get_embeddings
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_refreshed_at: Optional[float] = None
+_refresh_lock = threading.Lock()
+
+def add_to_corpus(document: Dict[str, Any]) -> None:
+    """Add a prepared document's chunks to the corpus index, unless it is indexed already.
+    
+    Documents are keyed by content hash, so the same PDF uploaded twice is indexed once.
+    """
+    if document["document_hash"] in corpus_index:
+        return
+    corpus_index.add(document["document_hash"], document["vectors"], document["chunks"])
+    logger.info(f"Added document {document['document_hash'][:12]} to the corpus index ({len(corpus_index)} chunks)")
+
+def refresh_corpus(force: bool = False) -> int:
+    """Add the documents of the shared artifact cache that the corpus index does not hold yet.
+    
+    Each worker only adds the documents it ingests itself, so the index is filled from the
+    artifact cache on first use (after a restart too) and then at most every
+    CORPUS_REFRESH_SECONDS, to pick up documents ingested by other workers. Returns the
+    number of documents added.
+    """
+    global _refreshed_at
+    with _refresh_lock:
+        if not force and _refreshed_at is not None and time.monotonic() - _refreshed_at < CORPUS_REFRESH_SECONDS:
+            return 0
+        added = 0
+        for document_hash in artifact_cache.documents():
+            if document_hash in corpus_index:
+                continue
+            document = load_document_chunks(document_hash)
+            if document is not None:
+                add_to_corpus(document)
+                added += 1
+        _refreshed_at = time.monotonic()
+        return added
+
+def search_corpus(query_vector: Any, k: int = 4, document_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Return the k chunks most similar to an embedded query across the corpus, or within some documents."""
+    refresh_corpus()
+    return corpus_index.search(query_vector, k, document_ids)
+
+async def asearch_corpus(
+    query: str,
+    k: int = 4,
+    document_ids: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """Embed a query and search the corpus like search_corpus."""
+    query_vector = await get_embeddings().aembed_query(query)
+    # Off the event loop: refreshing may load documents, and the first search after documents were added may (re)build the index
+    return await asyncio.to_thread(search_corpus, query_vector, k, document_ids)
+
+# Create a global corpus index instance
+corpus_index = CorpusIndex(
+    CORPUS_INDEX_KIND,
+    flat_max_vectors=CORPUS_FLAT_MAX_VECTORS,
+    hnsw_max_vectors=CORPUS_HNSW_MAX_VECTORS,
+    hnsw_m=CORPUS_HNSW_M,
+    ef_construction=CORPUS_HNSW_EF_CONSTRUCTION,
+    ef_search=CORPUS_HNSW_EF_SEARCH,
+    nlist=CORPUS_IVF_NLIST,
+    nprobe=CORPUS_IVF_NPROBE
+)
@@ -0,0 +1,72 @@
+from typing import Dict, Any, List, Optional
+from ...faq_generation.processor import build_faq_graph
+from .artifacts import FAQ_SECTION_CHARS, get_faqs, load_document, put_faqs
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_faq_graph = None
+_generation_locks: Dict[str, threading.Lock] = {}
+_generation_locks_lock = threading.Lock()
+
+def _sections(chunks: List[str], max_chars: int = FAQ_SECTION_CHARS) -> List[str]:
+    """Join consecutive chunks into sections of up to max_chars, so the FAQ graph makes one LLM call per section."""
+    sections: List[str] = []
+    current: List[str] = []
+    size = 0
+    for chunk in chunks:
+        if current and size + len(chunk) > max_chars:
+            sections.append("\n".join(current))
+            current, size = [], 0
+        current.append(chunk)
+        size += len(chunk)
+    if current:
+        sections.append("\n".join(current))
+    return sections
+
+def generate_document_faqs(document_hash: str, chunks: List[str]) -> List[Dict[str, str]]:
+    """
+    Return a document's FAQs, generating them with the FAQ graph from its cached chunks on a miss.
+    
+    Sections are processed concurrently by the graph, and the result is stored with the
+    document's artifacts, so later calls (and the FAQ fast path) reuse it. Concurrent calls
+    for the same document wait for a single generation.
+    """
+    global _faq_graph
+    faqs = get_faqs(document_hash)
+    if faqs is not None:
+        return faqs
+    
+    with _generation_locks_lock:
+        lock = _generation_locks.setdefault(document_hash, threading.Lock())
+    with lock:
+        faqs = get_faqs(document_hash)
+        if faqs is not None:
+            return faqs
+        
+        if _faq_graph is None:
+            _faq_graph = build_faq_graph()
+        sections = _sections(chunks)
+        logger.info(f"Generating FAQs for document {document_hash[:12]} from {len(sections)} sections")
+        result: Dict[str, Any] = _faq_graph.invoke({"chunks": sections, "faqs": None, "error": None})
+        if result.get("error"):
+            raise RuntimeError(f"FAQ generation failed: {result['error']}")
+        
+        faqs = result.get("faqs") or []
+        put_faqs(document_hash, faqs)
+        logger.info(f"Generated {len(faqs)} FAQs for document {document_hash[:12]}")
+    with _generation_locks_lock:
+        _generation_locks.pop(document_hash, None)
+    return faqs
+
+async def aget_document_faqs(document_hash: str) -> Optional[List[Dict[str, str]]]:
+    """Return an indexed document's FAQs like generate_document_faqs, or None if it is not indexed."""
+    faqs = get_faqs(document_hash)
+    if faqs is not None:
+        return faqs
+    document = await asyncio.to_thread(load_document, document_hash)
+    if document is None:
+        return None
+    return await asyncio.to_thread(generate_document_faqs, document_hash, document["chunks"])
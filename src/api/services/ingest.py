@@ -0,0 +1,75 @@
+from typing import Dict, Any, Iterator, List, Tuple, Callable, Optional
+from ...common.embeddings import PrecomputedEmbeddings
+from ...common.pipeline import run_pipeline
+from ..core.config import EMBED_BATCH_SIZE, INGEST_QUEUE_SIZE
+from .pdf import iter_pdf_pages
+from .qa import iter_chunks, create_vectorstore, get_embeddings
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+def _batched(chunks: Iterator[str], size: int) -> Iterator[List[str]]:
+    """Group a stream of chunks into lists of at most size chunks."""
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def ingest_document(
+    pdf_path: str,
+    on_progress: Optional[Callable[[Dict[str, int]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Extract, chunk, embed and index a PDF as a streaming pipeline.
+    
+    Pages flow into the chunker while extraction is still running, chunks are embedded in
+    batches, and each embedded batch is added to the vector store straight away. Bounded
+    queues between the stages cap how much text is held in memory at once.
+    
+    Returns the extracted text, the chunks, their vectors and the populated vector store.
+    """
+    start = time.perf_counter()
+    embedder = get_embeddings()
+    store_embeddings = PrecomputedEmbeddings(embedder, [], [])
+    vectorstore = create_vectorstore(store_embeddings)
+    
+    pages: List[str] = []
+    chunks: List[str] = []
+    vectors: List[List[float]] = []
+    
+    def extract_stage() -> Iterator[str]:
+        for page_text in iter_pdf_pages(pdf_path):
+            pages.append(page_text)
+            yield page_text
+    
+    def chunk_stage(page_stream: Iterator[str]) -> Iterator[List[str]]:
+        yield from _batched(iter_chunks(page_stream), EMBED_BATCH_SIZE)
+    
+    def embed_stage(batches: Iterator[List[str]]) -> Iterator[Tuple[List[str], List[List[float]]]]:
+        for batch in batches:
+            yield batch, embedder.embed_documents(batch)
+    
+    # Index stage: runs in this thread as the pipeline's consumer
+    for batch, batch_vectors in run_pipeline(extract_stage(), chunk_stage, embed_stage, maxsize=INGEST_QUEUE_SIZE):
+        store_embeddings.add(batch, batch_vectors)
+        vectorstore.add_texts(batch)
+        chunks.extend(batch)
+        vectors.extend(batch_vectors)
+        if on_progress:
+            on_progress({"pages_extracted": len(pages), "chunks_embedded": len(chunks)})
+    
+    logger.info(
+        f"Ingested {pdf_path}: {len(pages)} pages, {len(chunks)} chunks "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+    return {
+        "text": "".join(pages),
+        "chunks": chunks,
+        "vectors": vectors,
+        "vectorstore": vectorstore
+    }
@@ -0,0 +1,171 @@
+from typing import Dict, Any, Optional, Callable
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from ..core.config import JOB_MAX_WORKERS, JOB_HISTORY_SIZE, JOB_PROGRESS_SAVE_SECONDS
+from .session_store import SessionBackend, create_session_backend
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+def _store_key(job_id: str) -> str:
+    """Key of a job's status record in the session store."""
+    return f"job:{job_id}"
+
+class Job:
+    """A unit of background work (e.g. ingesting a document) and its progress."""
+    
+    def __init__(self, kind: str, subject: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.subject = subject
+        self.status = "queued"
+        self.progress: Dict[str, Any] = {"stage": "queued"}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the job's status as JSON-serializable data."""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "subject": self.subject,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+class JobManager:
+    """Runs jobs on a bounded worker pool and keeps their status for polling.
+    
+    Job functions receive an on_progress callback; every dict passed to it is merged into
+    the job's progress. Finished jobs are kept until history_size newer jobs have finished.
+    
+    With a store, every job's status is also snapshotted to it (on status changes, and at
+    most every save_interval seconds while progress is reported), so any worker sharing the
+    store can report jobs run by another one.
+    """
+    
+    def __init__(
+        self,
+        max_workers: int = JOB_MAX_WORKERS,
+        history_size: int = JOB_HISTORY_SIZE,
+        store: Optional[SessionBackend] = None,
+        save_interval: float = JOB_PROGRESS_SAVE_SECONDS
+    ):
+        self.history_size = history_size
+        self.store = store
+        self.save_interval = save_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._futures: Dict[str, Future] = {}
+        self._saved_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, kind: str, fn: Callable[..., Optional[Dict[str, Any]]], *args: Any, subject: Optional[str] = None, **kwargs: Any) -> Job:
+        """Queue fn(*args, on_progress=..., **kwargs) and return its job right away."""
+        job = Job(kind, subject)
+        
+        def on_progress(update: Dict[str, Any]) -> None:
+            with self._lock:
+                job.progress.update(update)
+            self._save(job)
+        
+        def run() -> Optional[Dict[str, Any]]:
+            job.status = "running"
+            job.started_at = time.time()
+            on_progress({"stage": "running"})
+            self._save(job, force=True)
+            try:
+                job.result = fn(*args, on_progress=on_progress, **kwargs)
+                job.status = "succeeded"
+                on_progress({"stage": "done"})
+                return job.result
+            except Exception as e:
+                logger.error(f"Job {job.id} ({kind}) failed: {str(e)}")
+                job.error = str(e)
+                job.status = "failed"
+                on_progress({"stage": "failed"})
+                raise
+            finally:
+                job.finished_at = time.time()
+                self._save(job, force=True)
+                self._prune()
+        
+        with self._lock:
+            self._jobs[job.id] = job
+        self._save(job, force=True)
+        with self._lock:
+            self._futures[job.id] = self._executor.submit(run)
+        logger.info(f"Queued job {job.id} ({kind})")
+        return job
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by ID."""
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job's status, from this worker or, for a job run by another worker, from the store."""
+        job = self.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        record = self.store.load(_store_key(job_id)) if self.store is not None else None
+        if record is None:
+            return None
+        record.pop("revision", None)
+        record.pop("session_id", None)
+        return record
+    
+    def future(self, job_id: str) -> Optional[Future]:
+        """Return the future of a job, to wait for its result."""
+        with self._lock:
+            return self._futures.get(job_id)
+    
+    def stats(self) -> Dict[str, int]:
+        """Count the known jobs by status."""
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+    
+    def _save(self, job: Job, force: bool = False) -> None:
+        """Snapshot a job's status to the store; progress updates are throttled unless forced."""
+        if self.store is None:
+            return
+        now = time.time()
+        if not force and now - self._saved_at.get(job.id, 0) < self.save_interval:
+            return
+        self._saved_at[job.id] = now
+        with self._lock:
+            status = job.to_dict()
+        try:
+            self.store.save(_store_key(job.id), status)
+        except Exception as e:
+            logger.warning(f"Could not save the status of job {job.id}: {str(e)}")
+    
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs beyond the history size."""
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+            pruned = finished[:max(0, len(finished) - self.history_size)]
+            for job_id in pruned:
+                self._jobs.pop(job_id, None)
+                self._futures.pop(job_id, None)
+                self._saved_at.pop(job_id, None)
+        if self.store is not None:
+            for job_id in pruned:
+                self.store.delete(_store_key(job_id))
+
+# Create a global job manager instance; job status is shared with other workers through the session store
+job_manager = JobManager(store=create_session_backend())
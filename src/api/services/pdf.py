@@ -1,5 +1,6 @@
 from fastapi import HTTPException
 from pypdf import PdfReader
+from typing import Iterator
 import logging
 
 logger = logging.getLogger(__name__)
@@ -8,10 +9,18 @@ def extract_text_from_pdf(pdf_path: str) -> str:
     """Extract text from a PDF file using pypdf."""
     try:
         reader = PdfReader(pdf_path)
-        text = ""
+        # Join once at the end; repeated string concatenation is quadratic in document size
+        return "".join(page.extract_text() + "\n" for page in reader.pages)
+    except Exception as e:
+        logging.error(f"Error extracting text from PDF: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error extracting text from PDF: {str(e)}") 
+
+def iter_pdf_pages(pdf_path: str) -> Iterator[str]:
+    """Yield the text of each page of a PDF file as soon as it is extracted."""
+    try:
+        reader = PdfReader(pdf_path)
         for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+            yield page.extract_text() + "\n"
     except Exception as e:
         logging.error(f"Error extracting text from PDF: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error extracting text from PDF: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error extracting text from PDF: {str(e)}")
@@ -1,37 +1,143 @@
-from typing import List, Dict, Optional, Any, Tuple
+from typing import List, Dict, Optional, Any, Tuple, AsyncIterator, Iterable, Iterator
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import ChatOpenAI
-from langchain_community.embeddings import OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
 from langchain.prompts import PromptTemplate
+from langchain_core.callbacks import AsyncCallbackHandler, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from ...common.embeddings import PrecomputedEmbeddings
+from ...common.memory import create_chat_memory, llm_summarizer
+from ...common.retrieval import HybridSearcher
+from ...config.settings import (
+    embeddings as shared_embeddings,
+    EMBEDDING_MODEL_NAME,
+    RETRIEVAL_MODE,
+    HYBRID_ALPHA,
+    IDENTIFIER_QUERY_MAX_WORDS,
+    CHAT_MEMORY_MODE,
+    CHAT_MEMORY_MAX_TOKENS,
+    CHAT_MEMORY_WINDOW_TOKENS,
+    history_summary_prompt
+)
+from ..core.config import QA_MAX_CONCURRENCY, EMBED_BATCH_SIZE
+import asyncio
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
+# Chunking and embedding settings; they also key cached artifacts, so bump the version on change
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+CHUNKER_VERSION = f"recursive-stream-{CHUNK_SIZE}-{CHUNK_OVERLAP}-v2"
+LLM_MODEL_NAME = "gpt-3.5-turbo"
+# Version of the answer prompt below; it keys cached answers, so bump it when the prompt changes
+QA_PROMPT_VERSION = "v1"
+
+def iter_chunks(texts: Iterable[str]) -> Iterator[str]:
+    """
+    Split a stream of text (e.g. pages) into chunks as the text arrives.
+    
+    Text is buffered until it spans a few chunks; every chunk but the last is emitted and
+    the last one is carried over so it can grow with the text that follows.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        length_function=len,
+    )
+    buffer = ""
+    for text in texts:
+        buffer += text
+        if len(buffer) >= CHUNK_SIZE * 4:
+            pieces = text_splitter.split_text(buffer)
+            yield from pieces[:-1]
+            buffer = pieces[-1] + "\n" if pieces else ""
+    if buffer.strip():
+        yield from text_splitter.split_text(buffer)
+
+def split_documents(documents: List[str]) -> List[str]:
+    """Split document text into the chunks indexed by the QA chain."""
+    return [chunk for document in documents for chunk in iter_chunks([document])]
+
+def create_vectorstore(embeddings: Any) -> Chroma:
+    """Create an empty in-memory vector store in a collection of its own."""
+    return Chroma(collection_name=f"qa-{uuid.uuid4().hex}", embedding_function=embeddings)
+
+def get_embeddings() -> Any:
+    """Return the shared embedding service (cached, and batched across sessions)."""
+    return shared_embeddings
+
+class HybridRetriever(BaseRetriever):
+    """Retriever over a HybridSearcher; identifier lookups are served by BM25 without embedding the query.
+    
+    The session's vector store is kept alongside so it can be released with the chain.
+    """
+    
+    searcher: Any
+    vectorstore: Any = None
+    k: int = 4
+    mode: str = "hybrid"
+    
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return [
+            Document(page_content=self.searcher.chunks[i], metadata={"chunk": i, "score": score})
+            for i, score in self.searcher.search(query, self.k, self.mode)
+        ]
+
+def create_retriever(vectorstore: Any, chunks: List[str], vectors: Optional[Any] = None) -> BaseRetriever:
+    """
+    Create the chunk retriever of a QA chain for RETRIEVAL_MODE.
+    
+    "dense" searches the vector store; "lexical" and "hybrid" search a BM25 index over the
+    chunks, fused in hybrid mode with the chunk vectors (embedded, or read from the embedding
+    cache, when not passed in).
+    """
+    if RETRIEVAL_MODE == "dense":
+        return vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 4})
+    embeddings = get_embeddings()
+    if vectors is None:
+        vectors = embeddings.embed_documents(chunks)
+    searcher = HybridSearcher(chunks, vectors, embeddings, HYBRID_ALPHA, IDENTIFIER_QUERY_MAX_WORDS)
+    return HybridRetriever(searcher=searcher, vectorstore=vectorstore, k=4, mode=RETRIEVAL_MODE)
+
 def initialize_qa_chain(
     documents: List[str],
     summary: Optional[str] = None,
-    faqs: Optional[List[Dict[str, str]]] = None
+    faqs: Optional[List[Dict[str, str]]] = None,
+    chunks: Optional[List[str]] = None,
+    vectors: Optional[Any] = None,
+    vectorstore: Optional[Any] = None
 ) -> Tuple[Any, Dict[str, Any]]:
-    """Initialize the QA chain with the provided documents."""
-    # Create text splitter
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len,
-    )
+    """Initialize the QA chain with the provided documents.
     
+    Pre-split chunks and their embedding vectors (e.g. from the artifact cache), or an
+    already populated vector store, can be passed in to skip splitting and embedding.
+    """
     # Split documents into chunks
-    splits = text_splitter.create_documents(documents)
+    if chunks is None:
+        chunks = split_documents(documents)
     
-    # Create vectorstore
-    embeddings = OpenAIEmbeddings()
-    vectorstore = Chroma.from_documents(splits, embeddings)
+    # Create vectorstore, reusing precomputed vectors when available
+    if vectorstore is None:
+        embeddings = get_embeddings()
+        if vectors is not None:
+            embeddings = PrecomputedEmbeddings(embeddings, chunks, vectors)
+        vectorstore = create_vectorstore(embeddings)
+        for start in range(0, len(chunks), EMBED_BATCH_SIZE):
+            vectorstore.add_texts(chunks[start:start + EMBED_BATCH_SIZE])
     
-    # Initialize memory
-    memory = ConversationBufferMemory(
+    # Initialize memory; in "summary" mode older turns are folded into a rolling summary between turns
+    condense_llm = ChatOpenAI(model_name=LLM_MODEL_NAME, temperature=0)
+    memory = create_chat_memory(
+        CHAT_MEMORY_MODE,
+        summarize=llm_summarizer(condense_llm, history_summary_prompt),
+        max_tokens=CHAT_MEMORY_MAX_TOKENS,
+        window_tokens=CHAT_MEMORY_WINDOW_TOKENS,
         memory_key="chat_history",
         return_messages=True,
         output_key="answer"
@@ -61,13 +167,12 @@ Instructions:
 Provide a clear, accurate answer based on the regulatory context."""
     )
     
-    # Create QA chain
+    # Create QA chain; only the answer LLM streams, so token callbacks never see the
+    # intermediate question-condensing call
     qa_chain = ConversationalRetrievalChain.from_llm(
-        llm=ChatOpenAI(temperature=0),
-        retriever=vectorstore.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 4}
-        ),
+        llm=ChatOpenAI(model_name=LLM_MODEL_NAME, temperature=0, streaming=True),
+        condense_question_llm=condense_llm,
+        retriever=create_retriever(vectorstore, chunks, vectors),
         memory=memory,
         return_source_documents=True,
         verbose=True,
@@ -78,4 +183,64 @@ Provide a clear, accurate answer based on the regulatory context."""
         "chunks": documents,
         "summary": summary,
         "faqs": faqs
-    } 
\ No newline at end of file
+    } 
+
+_qa_semaphore: Optional[asyncio.Semaphore] = None
+
+def get_qa_semaphore() -> asyncio.Semaphore:
+    """Return the per-process semaphore that bounds concurrent QA chain runs."""
+    global _qa_semaphore
+    if _qa_semaphore is None:
+        _qa_semaphore = asyncio.Semaphore(QA_MAX_CONCURRENCY)
+    return _qa_semaphore
+
+async def _acall_limited(qa_chain: Any, question: str, **kwargs: Any) -> Dict[str, Any]:
+    """Run the chain's async API once a concurrency slot is free."""
+    async with get_qa_semaphore():
+        return await qa_chain.acall({"question": question}, **kwargs)
+
+async def arun_qa_chain(qa_chain: Any, question: str) -> Dict[str, Any]:
+    """Run the QA chain without blocking the event loop."""
+    return await _acall_limited(qa_chain, question)
+
+class TokenQueueHandler(AsyncCallbackHandler):
+    """Callback handler that pushes streamed LLM tokens onto an asyncio queue."""
+    
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+    
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        """Queue each new token as the LLM generates it."""
+        if token:
+            self.queue.put_nowait(token)
+
+async def astream_qa_chain(qa_chain: Any, question: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run the QA chain and yield its answer incrementally.
+    
+    Yields {"type": "delta", "delta": token} for every generated token, then a single
+    {"type": "end", "response": answer, "sources": [...]} once the chain has finished.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    task = asyncio.ensure_future(
+        _acall_limited(qa_chain, question, callbacks=[TokenQueueHandler(queue)])
+    )
+    # Wake the consumer once the chain is done, whether it succeeded or not
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    
+    try:
+        while True:
+            token = await queue.get()
+            if token is None:
+                break
+            yield {"type": "delta", "delta": token}
+        
+        result = task.result()
+        yield {
+            "type": "end",
+            "response": result["answer"],
+            "sources": [doc.page_content for doc in result["source_documents"]]
+        }
+    finally:
+        if not task.done():
+            task.cancel()
@@ -1,55 +1,444 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Callable, Tuple
+from collections import OrderedDict
 from ..models.session import SessionState
+from ..core.config import SESSION_TTL_SECONDS, SESSION_MEMORY_BUDGET_BYTES
+from .artifacts import load_document, prepare_document
+from .corpus import add_to_corpus
+from .qa import initialize_qa_chain
+from .session_store import SessionBackend, create_session_backend
+import json
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+def _history_bytes(qa_chain: Any) -> int:
+    """Estimate the size of a QA chain's conversation memory."""
+    memory = getattr(qa_chain, "memory", None)
+    if memory is None:
+        return 0
+    return sum(len(str(message.content).encode("utf-8")) for message in memory.chat_memory.messages)
+
+def _chat_history(qa_chain: Any) -> List[Dict[str, str]]:
+    """Return a QA chain's conversation memory as role/content pairs."""
+    memory = getattr(qa_chain, "memory", None)
+    if memory is None:
+        return []
+    return [
+        {"role": "user" if message.type == "human" else "assistant", "content": message.content}
+        for message in memory.chat_memory.messages
+    ]
+
+def _restore_history(qa_chain: Any, chat_history: List[Dict[str, str]]) -> None:
+    """Replace a QA chain's conversation memory with stored role/content pairs."""
+    chat_memory = qa_chain.memory.chat_memory
+    chat_memory.clear()
+    for message in chat_history:
+        if message["role"] == "user":
+            chat_memory.add_user_message(message["content"])
+        else:
+            chat_memory.add_ai_message(message["content"])
+
+def rehydrate_session(record: Dict[str, Any]) -> Optional[Any]:
+    """Rebuild a session's QA chain from its snapshot and the cached document artifacts.
+    
+    Chunks and memory-mapped vectors come from the artifact cache, so nothing is extracted
+    or embedded again. Returns None if the document's artifacts are no longer cached.
+    """
+    if not record.get("document_hash"):
+        return None
+    document = load_document(record["document_hash"])
+    if document is None:
+        logger.warning(f"Artifacts of document {record['document_hash'][:12]} are no longer cached")
+        return None
+    add_to_corpus(document)
+    
+    qa_chain, _ = initialize_qa_chain(
+        [document["text"]],
+        record.get("summary"),
+        record.get("faqs"),
+        chunks=document["chunks"],
+        vectors=document["vectors"]
+    )
+    _restore_history(qa_chain, record.get("chat_history") or [])
+    return qa_chain
+
+def _release(qa_chain: Any) -> None:
+    """Free a QA chain's vector store; collections otherwise outlive the chain in the Chroma client."""
+    vectorstore = getattr(getattr(qa_chain, "retriever", None), "vectorstore", None)
+    if vectorstore is not None and hasattr(vectorstore, "delete_collection"):
+        try:
+            vectorstore.delete_collection()
+        except Exception as e:
+            logger.warning(f"Could not release vector store: {str(e)}")
+
 class SessionManager:
-    """Manages active chat sessions."""
+    """Manages active chat sessions.
+    
+    Sessions idle for longer than ttl_seconds are evicted, and the least recently used
+    sessions are evicted while the estimated footprint of all sessions (vectors, chunk
+    text, conversation history) exceeds memory_budget_bytes.
     
-    def __init__(self):
-        self._sessions: Dict[str, Dict[str, Any]] = {}
+    With a store, every session is also snapshotted to it. Eviction then only drops the
+    in-memory copy, and a session missing from memory (evicted, lost in a restart, or
+    created by another worker) is rehydrated from its snapshot on first access. A session
+    held in memory is checked against the store's revision on access, so changes and
+    deletions made by other workers are picked up.
+    """
+    
+    def __init__(
+        self,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        memory_budget_bytes: int = SESSION_MEMORY_BUDGET_BYTES,
+        store: Optional[SessionBackend] = None,
+        rehydrate: Optional[Callable[[Dict[str, Any]], Optional[Any]]] = None
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.memory_budget_bytes = memory_budget_bytes
+        self.store = store
+        self.rehydrate = rehydrate
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()  # Least recently used first
         self._qa_chains: Dict[str, Any] = {}  # Store QA chains separately
+        self._last_access: Dict[str, float] = {}
+        self._revisions: Dict[str, int] = {}
+        self._histories: Dict[str, List[Dict[str, str]]] = {}  # Stored history of sessions awaiting their QA chain
+        self._rehydrating: Dict[str, threading.Event] = {}  # Sessions whose QA chain is being rebuilt
+        self._unsaved: Dict[str, int] = {}  # Sessions with a snapshot not yet written, by snapshot number
+        self._snapshots = 0
+        self._evictions = {"ttl": 0, "memory": 0}
+        self._rehydrations = 0
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()  # Orders store writes; taken after _lock, never before it
     
     def create_session(self, session_id: str, session_data: SessionState) -> None:
         """Create a new session."""
-        # Store QA chain separately if it exists
-        if session_data.qa_chain is not None:
-            self._qa_chains[session_id] = session_data.qa_chain
-        
-        # Store session data without the QA chain
-        session_dict = session_data.dict()
-        session_dict.pop('qa_chain', None)  # Remove QA chain from session data
-        self._sessions[session_id] = session_dict
-        logger.info(f"Created new session: {session_id}")
+        with self._lock:
+            if session_id in self._sessions:
+                self._remove(session_id)
+            self._histories.pop(session_id, None)
+            
+            # Store QA chain separately if it exists
+            if session_data.qa_chain is not None:
+                self._qa_chains[session_id] = session_data.qa_chain
+            
+            # Store session data without the QA chain
+            session_dict = session_data.dict()
+            session_dict.pop('qa_chain', None)  # Remove QA chain from session data
+            self._sessions[session_id] = session_dict
+            self._touch(session_id)
+            self._save(session_id)
+            logger.info(f"Created new session: {session_id}")
+            self._evict(keep=session_id)
     
     def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """Get a session by ID."""
-        session_data = self._sessions.get(session_id)
-        if session_data:
-            # Add QA chain back to session data if it exists
-            if session_id in self._qa_chains:
-                session_data['qa_chain'] = self._qa_chains[session_id]
-        return session_data
+        """Get a session by ID.
+        
+        A session brought back from the store has its QA chain rebuilt outside the manager
+        lock, so other sessions stay available meanwhile. The rebuild re-indexes the document's
+        chunks, so call this off the event loop.
+        """
+        with self._lock:
+            self._evict()
+            session_data = self._sync(session_id) if session_id in self._sessions else self._load(session_id)
+            if session_data is None:
+                return None
+            rebuild = self._needs_chain(session_id)
+        if rebuild:
+            self._build_chain(session_id)
+        with self._lock:
+            session_data = self._sessions.get(session_id)
+            if session_data:
+                self._touch(session_id)
+                # Add QA chain back to session data if it exists
+                if session_id in self._qa_chains:
+                    session_data['qa_chain'] = self._qa_chains[session_id]
+            return session_data
     
     def delete_session(self, session_id: str) -> bool:
         """Delete a session by ID."""
-        if session_id in self._sessions:
-            del self._sessions[session_id]
-            self._qa_chains.pop(session_id, None)  # Remove QA chain if it exists
-            logger.info(f"Deleted session: {session_id}")
-            return True
-        return False
+        with self._lock:
+            # A snapshot still waiting to be written must not bring the session back
+            self._unsaved.pop(session_id, None)
+            stored = self.store is not None and self.store.revision(session_id) is not None
+            if stored:
+                with self._save_lock:
+                    self.store.delete(session_id)
+            if session_id in self._sessions or stored:
+                self._remove(session_id)
+                logger.info(f"Deleted session: {session_id}")
+                return True
+            return False
     
     def update_session(self, session_id: str, session_data: Dict[str, Any]) -> None:
         """Update session data."""
-        if session_id in self._sessions:
-            # Handle QA chain separately if it's in the update data
-            if 'qa_chain' in session_data:
-                self._qa_chains[session_id] = session_data.pop('qa_chain')
-            
-            self._sessions[session_id].update(session_data)
-            logger.info(f"Updated session: {session_id}")
+        with self._lock:
+            if session_id in self._sessions:
+                # Handle QA chain separately if it's in the update data
+                if 'qa_chain' in session_data:
+                    self._qa_chains[session_id] = session_data.pop('qa_chain')
+                
+                self._sessions[session_id].update(session_data)
+                self._touch(session_id)
+                self._save(session_id)
+                logger.info(f"Updated session: {session_id}")
+    
+    def record_turn(self, session_id: str) -> None:
+        """Persist a session's conversation history after a chat turn.
+        
+        The snapshot is taken under the manager lock but written to the store outside it, so
+        other sessions are not held up by the write. It still blocks, so call this off the
+        event loop.
+        """
+        with self._lock:
+            if session_id not in self._sessions or self.store is None:
+                return
+            snapshot = self._snapshot(session_id)
+        self._write(session_id, *snapshot)
+    
+    def session_bytes(self, session_id: str) -> Dict[str, int]:
+        """Estimate the memory held by one session, by component."""
+        session = self._sessions[session_id]
+        metadata = {key: session.get(key) for key in ("summary", "faqs")}
+        footprint = {
+            "vectors": session.get("vector_bytes") or 0,
+            "chunks": session.get("chunk_bytes") or 0,
+            "history": _history_bytes(self._qa_chains.get(session_id)),
+            "metadata": len(json.dumps(metadata, default=str).encode("utf-8"))
+        }
+        footprint["total"] = sum(footprint.values())
+        return footprint
+    
+    def stats(self) -> Dict[str, Any]:
+        """List the sessions with their estimated footprint and last access time."""
+        with self._lock:
+            now = time.time()
+            sessions: List[Dict[str, Any]] = []
+            for session_id in reversed(self._sessions):
+                sessions.append({
+                    "session_id": session_id,
+                    "pdf_path": self._sessions[session_id].get("pdf_path"),
+                    "document_hash": self._sessions[session_id].get("document_hash"),
+                    "bytes": self.session_bytes(session_id),
+                    "last_access": self._last_access[session_id],
+                    "idle_seconds": round(now - self._last_access[session_id], 1)
+                })
+            return {
+                "count": len(sessions),
+                "total_bytes": sum(session["bytes"]["total"] for session in sessions),
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "evictions": dict(self._evictions),
+                "rehydrations": self._rehydrations,
+                "sessions": sessions
+            }
+    
+    def _save(self, session_id: str) -> None:
+        """Snapshot a session's metadata and conversation history to the store."""
+        if self.store is None:
+            return
+        self._write(session_id, *self._snapshot(session_id))
+    
+    def _snapshot(self, session_id: str) -> Tuple[int, Dict[str, Any]]:
+        """Take a numbered snapshot of a session for the store; call with the lock held."""
+        record = {key: value for key, value in self._sessions[session_id].items() if key != "qa_chain"}
+        record["chat_history"] = _chat_history(self._qa_chains.get(session_id))
+        self._snapshots += 1
+        self._unsaved[session_id] = self._snapshots
+        return self._snapshots, record
+    
+    def _write(self, session_id: str, number: int, record: Dict[str, Any]) -> None:
+        """Write a snapshot to the store, unless a newer one was taken or the session was deleted meanwhile."""
+        revision = None
+        try:
+            with self._save_lock:
+                if self._unsaved.get(session_id) != number:
+                    return
+                revision = self.store.save(session_id, record)
+        finally:
+            with self._lock:
+                if self._unsaved.get(session_id) == number:
+                    del self._unsaved[session_id]
+                    if revision is not None and session_id in self._sessions:
+                        self._revisions[session_id] = revision
+    
+    def _load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Bring a stored session back into memory, rebuilding its QA chain."""
+        record = self.store.load(session_id) if self.store is not None else None
+        if record is None:
+            return None
+        chat_history = record.pop("chat_history", [])
+        revision = record.pop("revision")
+        record.pop("session_id", None)
+        self._histories[session_id] = chat_history
+        self._sessions[session_id] = record
+        self._revisions[session_id] = revision
+        self._last_access[session_id] = time.time()
+        self._rehydrations += 1
+        logger.info(f"Rehydrated session: {session_id}")
+        self._evict(keep=session_id)
+        return record
+    
+    def _needs_chain(self, session_id: str) -> bool:
+        """Return True if a session loaded from the store has an indexed document but no QA chain yet."""
+        record = self._sessions.get(session_id)
+        return (
+            self.rehydrate is not None
+            and record is not None
+            and session_id in self._histories
+            and session_id not in self._qa_chains
+            and bool(record.get("document_hash"))
+            and not record.get("job_id")
+        )
+    
+    def _build_chain(self, session_id: str) -> None:
+        """Rebuild a session's QA chain without holding the manager lock.
+        
+        Concurrent callers for the same session wait for a single rebuild. The chain is only
+        installed if the session still holds the same document, with the latest stored history.
+        """
+        with self._lock:
+            pending = self._rehydrating.get(session_id)
+            owner = pending is None and self._needs_chain(session_id)
+            if owner:
+                pending = self._rehydrating[session_id] = threading.Event()
+                record = {key: value for key, value in self._sessions[session_id].items() if key != "qa_chain"}
+                chat_history = self._histories[session_id]
+        if not owner:
+            if pending is not None:
+                pending.wait()
+            return
+        
+        qa_chain = None
+        try:
+            qa_chain = self.rehydrate({**record, "chat_history": chat_history})
+        finally:
+            with self._lock:
+                self._rehydrating.pop(session_id, None)
+                # Dropped even on failure, so a missing document is not re-indexed on every access
+                latest = self._histories.pop(session_id, None)
+                current = self._sessions.get(session_id)
+                if qa_chain is not None:
+                    if (
+                        current is not None
+                        and current.get("document_hash") == record.get("document_hash")
+                        and session_id not in self._qa_chains
+                    ):
+                        if latest is not None and latest is not chat_history:
+                            _restore_history(qa_chain, latest)
+                        self._qa_chains[session_id] = qa_chain
+                    else:
+                        _release(qa_chain)
+            pending.set()
+    
+    def _sync(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return an in-memory session after applying changes other workers made to it."""
+        if self.store is None or session_id in self._unsaved:
+            # A session with a snapshot still being written is ahead of the store
+            return self._sessions[session_id]
+        revision = self.store.revision(session_id)
+        if revision is None:
+            # Deleted through another worker
+            self._remove(session_id)
+            return None
+        if revision != self._revisions.get(session_id):
+            record = self.store.load(session_id)
+            if record is None:
+                self._remove(session_id)
+                return None
+            chat_history = record.pop("chat_history", [])
+            self._revisions[session_id] = record.pop("revision")
+            record.pop("session_id", None)
+            self._sessions[session_id].update(record)
+            qa_chain = self._qa_chains.get(session_id)
+            if qa_chain is not None:
+                _restore_history(qa_chain, chat_history)
+            else:
+                # E.g. loaded while another worker was still indexing its document; get_session rebuilds the chain
+                self._histories[session_id] = chat_history
+        return self._sessions[session_id]
+    
+    def _touch(self, session_id: str) -> None:
+        self._last_access[session_id] = time.time()
+        self._sessions.move_to_end(session_id)
+    
+    def _remove(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+        self._last_access.pop(session_id, None)
+        self._revisions.pop(session_id, None)
+        self._histories.pop(session_id, None)
+        qa_chain = self._qa_chains.pop(session_id, None)  # Remove QA chain if it exists
+        if qa_chain is not None:
+            _release(qa_chain)
+    
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Evict idle sessions, then least recently used ones until the memory budget is met.
+        
+        Evicted sessions stay in the store and can be rehydrated later.
+        """
+        now = time.time()
+        for session_id in [sid for sid, accessed in self._last_access.items() if now - accessed > self.ttl_seconds]:
+            if session_id != keep:
+                self._remove(session_id)
+                self._evictions["ttl"] += 1
+                logger.info(f"Evicted idle session: {session_id}")
+        
+        total = sum(self.session_bytes(session_id)["total"] for session_id in self._sessions)
+        for session_id in list(self._sessions):
+            if total <= self.memory_budget_bytes:
+                break
+            if session_id == keep:
+                continue
+            total -= self.session_bytes(session_id)["total"]
+            self._remove(session_id)
+            self._evictions["memory"] += 1
+            logger.info(f"Evicted session to stay within the memory budget: {session_id}")
+
+def build_document_session(
+    session_id: str,
+    pdf_path: str,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    document_hash: Optional[str] = None
+) -> Dict[str, Any]:
+    """Index a session's document and install its QA chain; run as a background job.
+    
+    Progress is reported per stage ("ingesting", with pages_extracted and chunks_embedded,
+    then "indexing"). The session only becomes queryable once its QA chain is installed. If
+    the session was deleted or given another document meanwhile, the result is discarded.
+    """
+    report = on_progress or (lambda update: None)
+    report({"stage": "ingesting", "pages_extracted": 0, "chunks_embedded": 0})
+    # Load extracted text, chunks and vectors (cached per document)
+    document = prepare_document(pdf_path, report, document_hash)
+    add_to_corpus(document)
+    
+    report({"stage": "indexing", "chunks_embedded": len(document["chunks"])})
+    summary = "Document summary will be generated here"  # Placeholder for now
+    faqs = []  # Placeholder for now
+    qa_chain, _ = initialize_qa_chain(
+        [document["text"]],
+        summary,
+        faqs,
+        chunks=document["chunks"],
+        vectors=document["vectors"],
+        vectorstore=document["vectorstore"]
+    )
+    
+    current = session_manager.get_session(session_id)
+    if current is None or current.get("pdf_path") != pdf_path:
+        _release(qa_chain)
+        raise RuntimeError(f"Session {session_id} was deleted or changed while its document was indexed")
+    
+    session_manager.create_session(session_id, SessionState(
+        pdf_path=pdf_path,
+        document_hash=document["document_hash"],
+        vector_bytes=len(document["vectors"]) * len(document["vectors"][0]) * 4 if len(document["vectors"]) else 0,
+        chunk_bytes=sum(len(chunk.encode("utf-8")) for chunk in document["chunks"]),
+        qa_chain=qa_chain,
+        summary=summary,
+        faqs=faqs
+    ))
+    return {"session_id": session_id, "document_hash": document["document_hash"], "chunks": len(document["chunks"])}
 
 # Create a global session manager instance
-session_manager = SessionManager() 
\ No newline at end of file
+session_manager = SessionManager(store=create_session_backend(), rehydrate=rehydrate_session)
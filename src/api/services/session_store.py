@@ -0,0 +1,147 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional
+from ..core.config import SESSION_BACKEND, SESSION_STORE_DIR, SESSION_STORE_PATH
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class SessionBackend(ABC):
+    """Storage for session snapshots shared by every worker process on a host.
+    
+    A snapshot holds a session's metadata (PDF path, document hash, summary, FAQs) and its
+    conversation history. The document index itself is not copied: chunks and vectors live in
+    the artifact cache under the document hash, so a snapshot stays small.
+    
+    Every save produces a new revision, which lets a worker holding a session in memory
+    notice that another worker has changed or deleted it.
+    """
+    
+    @abstractmethod
+    def save(self, session_id: str, record: Dict[str, Any]) -> int:
+        """Store a session snapshot and return its revision."""
+    
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return a session snapshot with its "revision", or None if the session is not stored."""
+    
+    @abstractmethod
+    def revision(self, session_id: str) -> Optional[int]:
+        """Return the current revision of a session, or None if it is not stored."""
+    
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Remove a session snapshot if it exists."""
+
+def _file_revision(stat: os.stat_result) -> int:
+    """Revision of a snapshot file; every save replaces the file, so its inode changes too."""
+    return hash((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+
+class FileSessionBackend(SessionBackend):
+    """Stores each session snapshot as a JSON file, replaced atomically on every save."""
+    
+    def __init__(self, root: str = SESSION_STORE_DIR):
+        self.root = root
+    
+    def _path(self, session_id: str) -> str:
+        """Session ids come from URLs, so files are named by their hash."""
+        return os.path.join(self.root, hashlib.sha256(session_id.encode("utf-8")).hexdigest() + ".json")
+    
+    def save(self, session_id: str, record: Dict[str, Any]) -> int:
+        """Write a session snapshot atomically, so other processes never read partial data."""
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({**record, "session_id": session_id}, f)
+            revision = _file_revision(os.stat(tmp_path))
+            os.replace(tmp_path, self._path(session_id))
+            return revision
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(session_id), "r", encoding="utf-8") as f:
+                # Stat the open file so the revision matches the content even if it is replaced meanwhile
+                revision = _file_revision(os.fstat(f.fileno()))
+                return {**json.load(f), "revision": revision}
+        except FileNotFoundError:
+            return None
+    
+    def revision(self, session_id: str) -> Optional[int]:
+        try:
+            return _file_revision(os.stat(self._path(session_id)))
+        except FileNotFoundError:
+            return None
+    
+    def delete(self, session_id: str) -> None:
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+class SQLiteSessionBackend(SessionBackend):
+    """Stores session snapshots in one SQLite database, which serializes writes across processes."""
+    
+    def __init__(self, path: str = SESSION_STORE_PATH):
+        self.path = path
+        self._db = None
+        self._lock = threading.Lock()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use; WAL mode lets workers read while another one writes."""
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, record TEXT, revision INTEGER)")
+            self._db.commit()
+        return self._db
+    
+    def save(self, session_id: str, record: Dict[str, Any]) -> int:
+        revision = time.time_ns()
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO sessions (id, record, revision) VALUES (?, ?, ?)",
+                (session_id, json.dumps({**record, "session_id": session_id}), revision)
+            )
+            db.commit()
+        return revision
+    
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute("SELECT record, revision FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        return {**json.loads(row[0]), "revision": row[1]}
+    
+    def revision(self, session_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._connect().execute("SELECT revision FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+    
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            db = self._connect()
+            db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            db.commit()
+
+def create_session_backend(kind: str = SESSION_BACKEND) -> Optional[SessionBackend]:
+    """Create the session backend named by SESSION_BACKEND: "file", "sqlite" or "memory" (none)."""
+    if kind == "file":
+        return FileSessionBackend()
+    if kind == "sqlite":
+        return SQLiteSessionBackend()
+    if kind == "memory":
+        return None
+    raise ValueError(f"Unknown session backend: {kind}")
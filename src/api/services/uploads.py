@@ -0,0 +1,111 @@
+from typing import Dict, Any, Optional
+from fastapi import UploadFile
+from ..core.config import UPLOAD_DIR, UPLOAD_CHUNK_BYTES, UPLOAD_MAX_BYTES, UPLOAD_TTL_SECONDS
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+_DOCUMENT_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds UPLOAD_MAX_BYTES."""
+
+class UploadStore:
+    """Keeps uploaded PDFs on disk under a document handle.
+    
+    Uploads are streamed to disk in fixed-size chunks while being hashed, so memory use does
+    not depend on the file size. The handle (document_id) is the SHA-256 of the file, the same
+    hash the artifact cache uses, so uploading a document twice stores it once. Files not used
+    for ttl_seconds are purged; using a handle keeps its file alive.
+    """
+    
+    def __init__(
+        self,
+        root: str = UPLOAD_DIR,
+        chunk_bytes: int = UPLOAD_CHUNK_BYTES,
+        max_bytes: int = UPLOAD_MAX_BYTES,
+        ttl_seconds: float = UPLOAD_TTL_SECONDS
+    ):
+        self.root = root
+        self.chunk_bytes = chunk_bytes
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+    
+    def _path(self, document_id: str) -> str:
+        return os.path.join(self.root, f"{document_id}.pdf")
+    
+    async def save(self, file: UploadFile) -> Dict[str, Any]:
+        """Stream an upload to disk and return its handle, filename and size."""
+        self.purge()
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = await file.read(self.chunk_bytes)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadTooLarge(f"Upload exceeds {self.max_bytes} bytes")
+                    digest.update(chunk)
+                    f.write(chunk)
+            document_id = digest.hexdigest()
+            # Content-addressed: an identical upload simply replaces the same file
+            os.replace(tmp_path, self._path(document_id))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        logger.info(f"Stored upload {file.filename} ({size} bytes) as {document_id[:12]}")
+        return {"document_id": document_id, "filename": file.filename, "bytes": size}
+    
+    def resolve(self, document_id: str) -> Optional[str]:
+        """Return the path of an uploaded document, or None if the handle is unknown or expired."""
+        if not _DOCUMENT_ID_RE.match(document_id or ""):
+            return None
+        path = self._path(document_id)
+        try:
+            os.utime(path)  # Keep the file alive while it is in use
+        except FileNotFoundError:
+            return None
+        return path
+    
+    def delete(self, document_id: str) -> bool:
+        """Remove an uploaded document; cached artifacts derived from it are kept."""
+        if not _DOCUMENT_ID_RE.match(document_id or ""):
+            return False
+        try:
+            os.remove(self._path(document_id))
+            return True
+        except FileNotFoundError:
+            return False
+    
+    def purge(self) -> int:
+        """Remove uploads and abandoned partial uploads not used for ttl_seconds."""
+        removed = 0
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            entries = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            try:
+                if entry.name.endswith((".pdf", ".part")) and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        if removed:
+            logger.info(f"Purged {removed} expired uploads")
+        return removed
+
+# Create a global upload store instance
+upload_store = UploadStore()
@@ -3,90 +3,247 @@ Chat processing workflow module.
 This module handles the chat system including context management, response generation, and history tracking.
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from langgraph.graph import StateGraph, END
 from langchain_community.vectorstores import FAISS
-from langchain.memory import ConversationBufferMemory
-from langchain.chains import ConversationalRetrievalChain
-from langchain.prompts import PromptTemplate
 from ..common.types import ChatState
-from ..config.settings import llm, embeddings, chat_prompt
+from ..common.context import context_candidates, lexical_context_candidates, pack_context
+from ..common.retrieval import HybridSearcher
+from ..common.faq_index import faq_fast_path_stats
+from ..common.memory import create_chat_memory, format_messages, llm_summarizer
+from ..config.settings import (
+    llm,
+    embeddings,
+    chat_prompt,
+    history_summary_prompt,
+    FAQ_MATCH_THRESHOLD,
+    CHAT_MEMORY_MODE,
+    CHAT_MEMORY_MAX_TOKENS,
+    CHAT_MEMORY_WINDOW_TOKENS,
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_CANDIDATE_CHUNKS,
+    RETRIEVAL_MODE,
+    HYBRID_ALPHA,
+    IDENTIFIER_QUERY_MAX_WORDS
+)
+
+def build_chunk_index(chunks: List[str], vectors: Optional[Any] = None) -> FAISS:
+    """
+    Embed document chunks once and build the vector index used for retrieval.
+    
+    Args:
+        chunks (List[str]): Document chunks to index
+        vectors (Optional[Any]): Precomputed chunk vectors, e.g. from the artifact cache
+        
+    Returns:
+        FAISS: Vector index over the chunks
+    """
+    metadatas = [{"source": f"chunk_{i}"} for i in range(len(chunks))]
+    if vectors is not None:
+        return FAISS.from_embeddings(
+            list(zip(chunks, [list(map(float, vector)) for vector in vectors])),
+            embeddings,
+            metadatas=metadatas
+        )
+    return FAISS.from_texts(chunks, embeddings, metadatas=metadatas)
+
+def build_chunk_searcher(chunks: List[str], vectors: Any) -> HybridSearcher:
+    """
+    Build the BM25 index over the chunks and pair it with their vectors for hybrid retrieval.
+    
+    Args:
+        chunks (List[str]): Document chunks, as indexed in the vector store
+        vectors (Any): Chunk vectors, aligned with the chunks
+        
+    Returns:
+        HybridSearcher: Lexical, dense and hybrid search over the chunks
+    """
+    return HybridSearcher(chunks, vectors, embeddings, HYBRID_ALPHA, IDENTIFIER_QUERY_MAX_WORDS)
+
+def _merge_calls(previous: Dict[str, int], current: Dict[str, int]) -> Dict[str, int]:
+    """Add embedding call counters from two graph nodes of the same turn."""
+    merged = dict(previous or {})
+    for key, value in current.items():
+        merged[key] = merged.get(key, 0) + value
+    return merged
+
+def _append_turn(state: ChatState, response: str) -> List[Dict[str, str]]:
+    """Add the current question and its answer to the chat history."""
+    chat_history = state.get("chat_history") or []
+    chat_history.append({"role": "user", "content": state["query"]})
+    chat_history.append({"role": "assistant", "content": response})
+    return chat_history
+
+def pack_chat_context(state: ChatState, budget: int = CONTEXT_TOKEN_BUDGET) -> Dict[str, Any]:
+    """
+    Select the context for a chat prompt within a token budget.
+    
+    CONTEXT_CANDIDATE_CHUNKS chunks are retrieved for the query through the hybrid searcher
+    (RETRIEVAL_MODE) when the state carries one, otherwise from the vector store. Identifier
+    lookups ("Section 4.2.1") are served by BM25 alone: chunks, FAQs and the summary are then
+    scored lexically and the query is never embedded. Otherwise the summary and every FAQ are
+    scored by embedding similarity to the query; FAQ questions use the vectors of the FAQ index
+    when the state carries one, and other texts go through the shared (disk-cached) embeddings.
+    
+    Args:
+        state (ChatState): Chat state with the query, vectorstore, summary and FAQs
+        budget (int): Maximum estimated tokens of the context
+        
+    Returns:
+        Dict[str, Any]: The packed context, as returned by pack_context, with the retrieval "mode"
+    """
+    query = state["query"]
+    summary = state.get("summary")
+    faq_index = state.get("faq_index")
+    if faq_index is not None:
+        faqs = faq_index.faqs
+    else:
+        faqs = [faq for faq in state.get("faqs") or [] if faq.get("question") and faq.get("answer")]
+    
+    searcher = state.get("searcher")
+    mode = searcher.route(query, RETRIEVAL_MODE) if searcher is not None else "dense"
+    if mode == "lexical":
+        hits = searcher.search(query, CONTEXT_CANDIDATE_CHUNKS, mode)
+        candidates = lexical_context_candidates(query, summary, faqs) + [
+            {"section": "chunks", "text": searcher.chunks[i], "score": score} for i, score in hits
+        ]
+        return {**pack_context(candidates, budget), "mode": mode}
+    
+    query_vector = embeddings.embed_query(query)
+    faq_vectors = faq_index.vectors if faq_index is not None else (
+        embeddings.embed_documents([faq["question"] for faq in faqs]) if faqs else []
+    )
+    summary_vector = embeddings.embed_documents([summary])[0] if summary else None
+    candidates = context_candidates(query_vector, summary, summary_vector, faqs, faq_vectors)
+    if searcher is not None:
+        hits = searcher.search(query, CONTEXT_CANDIDATE_CHUNKS, mode, query_vector)
+        candidates += [{"section": "chunks", "text": searcher.chunks[i], "score": score} for i, score in hits]
+    else:
+        docs = state["vectorstore"].similarity_search_by_vector(query_vector, k=CONTEXT_CANDIDATE_CHUNKS)
+        chunks = [doc.page_content for doc in docs]
+        candidates += context_candidates(
+            query_vector,
+            chunks=chunks,
+            chunk_vectors=embeddings.embed_documents(chunks) if chunks else []
+        )
+    return {**pack_context(candidates, budget), "mode": mode}
+
+def conversation_memory(state: ChatState, mode: str = CHAT_MEMORY_MODE) -> Any:
+    """
+    Return the conversation memory for the current turn.
+    
+    In "buffer" mode every turn starts from an empty memory. In "summary" mode the
+    token-budgeted memory is kept in the state across turns, seeded from the chat history
+    on the first turn, so older turns are summarized in the background between turns.
+    """
+    memory = state.get("memory") if mode == "summary" else None
+    if memory is not None:
+        return memory
+    
+    memory = create_chat_memory(
+        mode,
+        summarize=llm_summarizer(llm, history_summary_prompt),
+        max_tokens=CHAT_MEMORY_MAX_TOKENS,
+        window_tokens=CHAT_MEMORY_WINDOW_TOKENS,
+        memory_key="chat_history",
+        return_messages=True,
+        output_key="answer",
+        input_key="question"
+    )
+    if mode == "summary":
+        for message in state.get("chat_history") or []:
+            if message["role"] == "user":
+                memory.chat_memory.add_user_message(message["content"])
+            else:
+                memory.chat_memory.add_ai_message(message["content"])
+    return memory
 
 def build_chat_graph() -> StateGraph:
     """
     Build the chat processing workflow graph.
     
+    When the state carries an FAQ index, a query that closely matches a generated FAQ is
+    answered with the stored answer, skipping retrieval and the LLM.
+    
     Returns:
         StateGraph: The configured chat processing workflow
     """
     workflow = StateGraph(ChatState)
     
-    def process_chat_question(state: ChatState) -> Dict[str, Any]:
-        """Process a chat question and generate a response."""
+    def match_faq(state: ChatState) -> Dict[str, Any]:
+        """Answer the query from the FAQs if one of their questions matches it closely."""
         try:
-            if not state.get("chunks"):
-                return {"error": "No document chunks available"}
+            before = embeddings.snapshot()
+            match = state["faq_index"].match(state["query"], FAQ_MATCH_THRESHOLD)
+            faq_fast_path_stats.record(match is not None)
+            calls = _merge_calls(state.get("embedding_calls"), embeddings.calls_since(before))
+            if match is None:
+                # An empty match marks the lookup as done so the router moves on to retrieval
+                return {"faq_match": {}, "embedding_calls": calls}
             
-            # Create vector store from chunks
-            vectorstore = FAISS.from_texts(
-                state["chunks"],
-                embeddings,
-                metadatas=[{"source": f"chunk_{i}"} for i in range(len(state["chunks"]))]
-            )
+            # Keep a memory carried across turns in step with the chat history
+            if state.get("memory") is not None:
+                state["memory"].save_context({"question": state["query"]}, {"answer": match["answer"]})
             
-            # Initialize conversation memory
-            memory = ConversationBufferMemory(
-                memory_key="chat_history",
-                return_messages=True,
-                output_key="answer",
-                input_key="question"
-            )
-            
-            # Create the conversational chain
-            chain = ConversationalRetrievalChain.from_llm(
-                llm=llm,
-                retriever=vectorstore.as_retriever(
-                    search_type="similarity",
-                    search_kwargs={"k": 4}
-                ),
-                memory=memory,
-                return_source_documents=True,
-                verbose=True,
-                combine_docs_chain_kwargs={"prompt": chat_prompt}
-            )
+            return {
+                "faq_match": match,
+                "current_chat_response": match["answer"],
+                "chat_history": _append_turn(state, match["answer"]),
+                "context": f"Matched FAQ (score {match['score']}):\nQ: {match['question']}\nA: {match['answer']}",
+                "embedding_calls": calls
+            }
+        except Exception as e:
+            return {"error": str(e)}
+    
+    def build_index(state: ChatState) -> Dict[str, Any]:
+        """Build the document vector index if the state does not carry one yet."""
+        try:
+            if not state.get("chunks"):
+                return {"error": "No document chunks available"}
             
-            # Process the query
-            result = chain.invoke({"question": state["query"]})
+            before = embeddings.snapshot()
+            vectors = embeddings.embed_documents(state["chunks"])
+            vectorstore = build_chunk_index(state["chunks"], vectors)
             
-            # Format the response
-            response = result["answer"]
-            sources = [doc.page_content for doc in result["source_documents"]]
+            return {
+                "vectorstore": vectorstore,
+                "searcher": build_chunk_searcher(state["chunks"], vectors),
+                "embedding_calls": _merge_calls(state.get("embedding_calls"), embeddings.calls_since(before))
+            }
+        except Exception as e:
+            return {"error": str(e)}
+    
+    def process_chat_question(state: ChatState) -> Dict[str, Any]:
+        """Process a chat question and generate a response."""
+        try:
+            if not state.get("vectorstore"):
+                return {"error": "No document index available"}
             
-            # Update chat history
-            if not state.get("chat_history"):
-                state["chat_history"] = []
+            before = embeddings.snapshot()
             
-            state["chat_history"].append({
-                "role": "user",
-                "content": state["query"]
-            })
+            # Initialize conversation memory
+            memory = conversation_memory(state)
+            chat_history = memory.load_memory_variables({})["chat_history"]
             
-            state["chat_history"].append({
-                "role": "assistant",
-                "content": response
-            })
+            # Pack the most relevant summary, FAQs and chunks into the context budget
+            packed = pack_chat_context(state)
             
-            # Store enhanced context
-            context = f"Document Summary:\n{state['summary']}\n\n"
-            context += "Relevant FAQs:\n"
-            for faq in state["faqs"]:
-                context += f"Q: {faq['question']}\nA: {faq['answer']}\n\n"
-            context += "\nRelevant Document Chunks:\n" + "\n\n".join(sources)
+            # Generate the response
+            response = llm.invoke(chat_prompt.format(
+                context=packed["text"],
+                chat_history=format_messages(chat_history),
+                current_question=state["query"]
+            ))
+            memory.save_context({"question": state["query"]}, {"answer": response})
             
             return {
                 "current_chat_response": response,
-                "chat_history": state["chat_history"],
-                "context": context
+                "chat_history": _append_turn(state, response),
+                "memory": memory if CHAT_MEMORY_MODE == "summary" else None,
+                "context": packed["text"],
+                "context_tokens": {**packed["tokens"], "total": packed["total_tokens"]},
+                "retrieval_mode": packed["mode"],
+                "embedding_calls": _merge_calls(state.get("embedding_calls"), embeddings.calls_since(before))
             }
             
         except Exception as e:
@@ -96,22 +253,42 @@ def build_chat_graph() -> StateGraph:
         """Route the workflow based on current state."""
         if "error" in state and state["error"]:
             return "end"
+        if state.get("current_chat_response"):
+            return "end"
+        if state.get("query") and state.get("faq_index") and state.get("faq_match") is None:
+            return "match_faq"
+        if not state.get("vectorstore"):
+            return "build_index"
         if "query" in state and state["query"] and not state.get("current_chat_response"):
             return "process_chat_question"
         return "end"
     
     # Add nodes to the workflow
+    workflow.add_node("match_faq", match_faq)
+    workflow.add_node("build_index", build_index)
     workflow.add_node("process_chat_question", process_chat_question)
     
     # Add edges to the workflow
-    workflow.add_conditional_edges(
-        "process_chat_question",
+    for node in ["match_faq", "build_index", "process_chat_question"]:
+        workflow.add_conditional_edges(
+            node,
+            router,
+            {
+                "match_faq": "match_faq",
+                "build_index": "build_index",
+                "process_chat_question": "process_chat_question",
+                "end": END
+            }
+        )
+    
+    # Skip straight to answering when the caller already holds an index
+    workflow.set_conditional_entry_point(
         router,
         {
+            "match_faq": "match_faq",
+            "build_index": "build_index",
             "process_chat_question": "process_chat_question",
             "end": END
         }
     )
-    
-    workflow.set_entry_point("process_chat_question")
     return workflow.compile() 
\ No newline at end of file
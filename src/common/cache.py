@@ -0,0 +1,311 @@
+"""
+Content-addressed artifact cache.
+This module stores per-document processing artifacts (extracted text, chunks, embedding vectors,
+summaries and FAQs) on local disk, keyed by the SHA-256 of the PDF bytes plus the versions of the
+steps that produced them, and caches embedding vectors per model keyed by the text they embed.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+
+# Root directory for cached artifacts
+ARTIFACT_CACHE_DIR = os.getenv("ARTIFACT_CACHE_DIR", ".cache/artifacts")
+
+def hash_file(path: str, block_size: int = 1 << 20) -> str:
+    """
+    Compute the SHA-256 of a file without reading it into memory at once.
+
+    Args:
+        path (str): Path to the file
+        block_size (int): Number of bytes read per step
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ArtifactCache:
+    """On-disk cache of document artifacts keyed by content hash and step versions."""
+
+    def __init__(self, root: str = ARTIFACT_CACHE_DIR):
+        self.root = root
+
+    def _path(self, doc_hash: str, name: str, version: tuple, suffix: str) -> str:
+        """Build the file path for one artifact of one document."""
+        fingerprint = hashlib.sha256("|".join(str(part) for part in version).encode()).hexdigest()[:16]
+        return os.path.join(self.root, doc_hash[:2], doc_hash, f"{name}-{fingerprint}{suffix}")
+
+    def _write_atomic(self, path: str, write: Callable[[Any], None]) -> None:
+        """Write a file through a temporary name so readers never see partial data."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, doc_hash: str, name: str, *version: Any) -> Optional[Any]:
+        """Return a cached JSON artifact, or None if it has not been stored yet."""
+        path = self._path(doc_hash, name, version, ".json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def put(self, doc_hash: str, name: str, value: Any, *version: Any) -> None:
+        """Store a JSON-serializable artifact."""
+        path = self._path(doc_hash, name, version, ".json")
+        self._write_atomic(path, lambda f: f.write(json.dumps(value).encode("utf-8")))
+
+    def get_vectors(self, doc_hash: str, name: str, *version: Any, mmap: bool = False) -> Optional[np.ndarray]:
+        """
+        Return cached embedding vectors as a float32 matrix, or None if missing.
+
+        With mmap=True the matrix is memory-mapped read-only instead of loaded, so pages are
+        read on demand and shared between processes that map the same file.
+        """
+        path = self._path(doc_hash, name, version, ".npy")
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode="r" if mmap else None)
+
+    def put_vectors(self, doc_hash: str, name: str, vectors: Any, *version: Any) -> None:
+        """Store embedding vectors as a float32 matrix."""
+        path = self._path(doc_hash, name, version, ".npy")
+        matrix = np.asarray(vectors, dtype=np.float32)
+        self._write_atomic(path, lambda f: np.save(f, matrix))
+
+    def documents(self) -> List[str]:
+        """Return the content hashes of every document with cached artifacts."""
+        if not os.path.isdir(self.root):
+            return []
+        return [
+            entry.name
+            for prefix in os.scandir(self.root) if prefix.is_dir()
+            for entry in os.scandir(prefix.path) if entry.is_dir()
+        ]
+
+    def get_or_compute(self, doc_hash: str, name: str, compute: Callable[[], Any], *version: Any) -> Any:
+        """Return a cached JSON artifact, computing and storing it on a miss."""
+        value = self.get(doc_hash, name, *version)
+        if value is None:
+            value = compute()
+            self.put(doc_hash, name, value, *version)
+        return value
+
+    def get_or_compute_vectors(self, doc_hash: str, name: str, compute: Callable[[], Any], *version: Any) -> np.ndarray:
+        """Return cached embedding vectors, computing and storing them on a miss."""
+        vectors = self.get_vectors(doc_hash, name, *version)
+        if vectors is None:
+            vectors = np.asarray(compute(), dtype=np.float32)
+            self.put_vectors(doc_hash, name, vectors, *version)
+        return vectors
+
+# Create a global artifact cache instance
+artifact_cache = ArtifactCache()
+
+# Root directory and size cap of the embedding cache
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+class EmbeddingCache:
+    """
+    On-disk cache of embedding vectors for one model.
+
+    Vectors live in a float32 file that is memory-mapped rather than loaded, one row per
+    cached text. A small SQLite index maps text keys to rows and tracks when each row was
+    last used, so the least recently used rows are overwritten once the size cap is reached.
+
+    Several processes (e.g. API workers) can share one cache directory: readers and writers
+    take the SQLite write lock while they map keys to rows and touch the vector file, and
+    every process picks up rows added by the others from the index.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = EMBEDDING_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._vectors = None
+        self._rows = 0
+        self._dim = None
+        self._size = 0
+
+    @property
+    def _vector_path(self) -> str:
+        return os.path.join(self.directory, "vectors.f32")
+
+    @property
+    def max_rows(self) -> int:
+        """Maximum number of cached vectors allowed by the size cap."""
+        return max(1, self.max_bytes // (self._dim * 4))
+
+    def _open(self) -> None:
+        """Open the index and vector file on first use."""
+        if self._db is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(self.directory, "index.sqlite"), timeout=30, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, slot INTEGER, last_used REAL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+        self._db.commit()
+        self._refresh()
+
+    def _refresh(self) -> None:
+        """Re-read the cache size and remap the vector file if another process has grown it."""
+        meta = dict(self._db.execute("SELECT name, value FROM meta").fetchall())
+        self._dim = meta.get("dim", self._dim)
+        self._size = meta.get("size", 0)
+        if self._dim and os.path.exists(self._vector_path):
+            rows = os.path.getsize(self._vector_path) // (self._dim * 4)
+            if rows != self._rows:
+                self._map(rows)
+
+    def _map(self, rows: int) -> None:
+        """Memory-map the vector file with room for the given number of rows."""
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self._vector_path, "ab") as f:
+            f.truncate(rows * self._dim * 4)
+        self._rows = rows
+        if rows:
+            self._vectors = np.memmap(self._vector_path, dtype=np.float32, mode="r+", shape=(rows, self._dim))
+
+    def _set_meta(self, name: str, value: int) -> None:
+        self._db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value))
+
+    def _lookup(self, keys: List[str]) -> Dict[str, int]:
+        """Return the row slot of every key that is cached."""
+        slots = {}
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = self._db.execute(
+                f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(batch))})", batch
+            ).fetchall()
+            slots.update(rows)
+        return slots
+
+    def _allocate(self, count: int) -> List[int]:
+        """Return row slots for new entries, growing the file or evicting old rows as needed."""
+        slots = []
+        if self._size < self.max_rows:
+            new_size = min(self._size + count, self.max_rows)
+            if new_size > self._rows:
+                # Grow geometrically so the file is not resized on every batch
+                self._map(min(max(new_size, self._rows * 2, 1024), self.max_rows))
+            slots.extend(range(self._size, new_size))
+            self._size = new_size
+            self._set_meta("size", self._size)
+        if len(slots) < count:
+            # Reuse the rows of the least recently used entries
+            evicted = self._db.execute(
+                "SELECT key, slot FROM entries ORDER BY last_used LIMIT ?", (count - len(slots),)
+            ).fetchall()
+            self._db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in evicted])
+            slots.extend(slot for _, slot in evicted)
+            self.evictions += len(evicted)
+        return slots
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors for the given keys; missing keys are left out."""
+        with self._lock:
+            self._open()
+            # Writers overwrite evicted rows in the vector file before committing the index, so
+            # the key -> slot lookup and the copy of the rows hold the same write lock as put_many;
+            # otherwise another process could reuse a slot between the two and hand back another
+            # text's vector. The last_used update needs the lock anyway.
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if self._dim is None:
+                    self._refresh()
+                slots = self._lookup(keys) if self._dim else {}
+                if slots and max(slots.values()) >= self._rows:
+                    self._refresh()
+                found = {key: np.array(self._vectors[slot]) for key, slot in slots.items()}
+                if found:
+                    now = time.time()
+                    self._db.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+            return found
+
+    def put_many(self, keys: List[str], vectors: Any) -> None:
+        """Store vectors for the given keys, evicting the least recently used rows when full."""
+        if not keys:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            self._open()
+            # Hold the write lock across processes while rows are allocated and written
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._refresh()
+                if self._dim is None:
+                    self._dim = int(matrix.shape[1])
+                    self._set_meta("dim", self._dim)
+                # One row per key, even if the batch repeats a text
+                unique = dict(zip(keys, matrix))
+                existing = self._lookup(list(unique))
+                new_keys = [key for key in unique if key not in existing]
+                slots = self._allocate(len(new_keys))
+                for key, slot in zip(new_keys, slots):
+                    self._vectors[slot] = unique[key]
+                if slots:
+                    self._vectors.flush()
+                now = time.time()
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO entries (key, slot, last_used) VALUES (?, ?, ?)",
+                    [(key, slot, now) for key, slot in zip(new_keys, slots)]
+                )
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current cache size."""
+        with self._lock:
+            self._open()
+            entries = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": entries * (self._dim or 0) * 4
+            }
+
+_embedding_caches: Dict[str, EmbeddingCache] = {}
+_embedding_caches_lock = threading.Lock()
+
+def get_embedding_cache(model_name: str) -> EmbeddingCache:
+    """Return the shared embedding cache for a model, creating it on first use."""
+    with _embedding_caches_lock:
+        if model_name not in _embedding_caches:
+            directory = os.path.join(EMBEDDING_CACHE_DIR, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+            _embedding_caches[model_name] = EmbeddingCache(directory)
+        return _embedding_caches[model_name]
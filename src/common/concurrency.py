@@ -0,0 +1,79 @@
+"""
+Concurrency helpers shared across the processing pipelines.
+These helpers fan per-item work (typically LLM calls) out over a bounded thread pool.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+logger = logging.getLogger(__name__)
+
+def call_with_retry(fn: Callable[[T], R], item: T, retries: int = 0, backoff: float = 1.0) -> R:
+    """
+    Call fn(item), retrying failures with exponential backoff.
+
+    Args:
+        fn (Callable): Function to call
+        item: Argument passed to fn
+        retries (int): Number of retries after the first failure
+        backoff (float): Seconds to wait before the first retry; doubles on each retry
+
+    Returns:
+        The result of fn(item)
+    """
+    for attempt in range(retries + 1):
+        try:
+            return fn(item)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * (2 ** attempt)
+            logger.warning(f"Attempt {attempt + 1} failed ({e}); retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+def map_concurrently(
+    fn: Callable[[T], R],
+    items: Sequence[T],
+    max_workers: int = 1,
+    retries: int = 0,
+    backoff: float = 1.0,
+    on_result: Optional[Callable[[int, R], None]] = None
+) -> List[R]:
+    """
+    Apply fn to every item with at most max_workers calls in flight.
+
+    Results come back in input order. A failing item is retried on its own without
+    restarting the rest of the map; if it still fails, the remaining work is cancelled
+    and the error is raised.
+
+    Args:
+        fn (Callable): Function applied to each item
+        items (Sequence): Items to process
+        max_workers (int): Concurrency cap; 1 runs the items serially
+        retries (int): Retries per item after its first failure
+        backoff (float): Seconds before the first retry of an item
+        on_result (Optional[Callable]): Called with (index, result) as each item completes
+
+    Returns:
+        List: fn(item) for every item, in input order
+    """
+    def run(index: int) -> R:
+        result = call_with_retry(fn, items[index], retries, backoff)
+        if on_result:
+            on_result(index, result)
+        return result
+
+    if max_workers <= 1 or len(items) <= 1:
+        return [run(i) for i in range(len(items))]
+
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(items)))
+    try:
+        futures = [pool.submit(run, i) for i in range(len(items))]
+        return [future.result() for future in futures]
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
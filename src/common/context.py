@@ -0,0 +1,123 @@
+"""
+Context packing for chat prompts.
+This module selects the pieces of context (document summary, FAQs, retrieved chunks) that go
+into a chat prompt: every candidate is scored by its relevance to the query and the best ones
+are packed into a fixed token budget, so prompt size (and prefill time) stays bounded however
+many FAQs or chunks a document has.
+"""
+
+from typing import Any, Dict, List, Optional
+import numpy as np
+from .retrieval import BM25Index
+from .tokens import estimate_tokens
+
+# Sections of the packed context, in prompt order, with their headers
+CONTEXT_SECTIONS = {
+    "summary": "Document Summary:",
+    "faqs": "Relevant FAQs:",
+    "chunks": "Relevant Document Chunks:"
+}
+
+def cosine_scores(query_vector: Any, vectors: Any) -> np.ndarray:
+    """Return the cosine similarity of a query vector to each row of a matrix."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.size == 0:
+        return np.zeros(0, dtype=np.float32)
+    matrix = matrix.reshape(len(matrix), -1)
+    query = np.asarray(query_vector, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    return (matrix @ query) / np.where(norms == 0, 1, norms)
+
+def format_faq(faq: Dict[str, str]) -> str:
+    """Render an FAQ as a context piece."""
+    return f"Q: {faq['question']}\nA: {faq['answer']}"
+
+def pack_context(candidates: List[Dict[str, Any]], budget: int) -> Dict[str, Any]:
+    """
+    Fill a token budget with the most relevant context pieces.
+
+    Candidates are taken by decreasing score; a piece that does not fit is skipped so smaller,
+    less relevant ones can still use the remaining budget. Section headers count against the
+    budget once their section has a piece. The packed text lists sections in CONTEXT_SECTIONS
+    order and pieces by relevance within a section.
+
+    Args:
+        candidates (List[Dict[str, Any]]): Pieces with "section", "text" and "score" fields
+        budget (int): Maximum estimated tokens of the packed text
+
+    Returns:
+        Dict[str, Any]: The packed "text", the selected "pieces", estimated "tokens" used per
+        section, "total_tokens", and the number of "candidates" and "dropped" pieces per section
+    """
+    header_tokens = {section: estimate_tokens(header) for section, header in CONTEXT_SECTIONS.items()}
+    selected: Dict[str, List[Dict[str, Any]]] = {section: [] for section in CONTEXT_SECTIONS}
+    tokens = {section: 0 for section in CONTEXT_SECTIONS}
+    used = 0
+    for candidate in sorted(candidates, key=lambda piece: -piece["score"]):
+        section = candidate["section"]
+        cost = estimate_tokens(candidate["text"]) + (0 if selected[section] else header_tokens[section])
+        if used + cost > budget:
+            continue
+        selected[section].append(candidate)
+        tokens[section] += cost
+        used += cost
+
+    blocks = [
+        CONTEXT_SECTIONS[section] + "\n" + "\n\n".join(piece["text"] for piece in pieces)
+        for section, pieces in selected.items() if pieces
+    ]
+    counts = {section: sum(1 for piece in candidates if piece["section"] == section) for section in CONTEXT_SECTIONS}
+    return {
+        "text": "\n\n".join(blocks),
+        "pieces": [piece for pieces in selected.values() for piece in pieces],
+        "tokens": tokens,
+        "total_tokens": used,
+        "candidates": counts,
+        "dropped": {section: counts[section] - len(selected[section]) for section in CONTEXT_SECTIONS}
+    }
+
+def context_candidates(
+    query_vector: Any,
+    summary: Optional[str] = None,
+    summary_vector: Optional[Any] = None,
+    faqs: Optional[List[Dict[str, str]]] = None,
+    faq_vectors: Optional[Any] = None,
+    chunks: Optional[List[str]] = None,
+    chunk_vectors: Optional[Any] = None
+) -> List[Dict[str, Any]]:
+    """
+    Score the summary, FAQs and chunks by cosine similarity to the query.
+
+    FAQs are scored by their question vectors (e.g. from an FAQ index); every vector list
+    must be aligned with its texts.
+    """
+    candidates: List[Dict[str, Any]] = []
+    if summary and summary_vector is not None:
+        candidates.append({"section": "summary", "text": summary, "score": float(cosine_scores(query_vector, [summary_vector])[0])})
+    for faq, score in zip(faqs or [], cosine_scores(query_vector, faq_vectors if faqs else [])):
+        candidates.append({"section": "faqs", "text": format_faq(faq), "score": float(score)})
+    for chunk, score in zip(chunks or [], cosine_scores(query_vector, chunk_vectors if chunks else [])):
+        candidates.append({"section": "chunks", "text": chunk, "score": float(score)})
+    return candidates
+
+def lexical_context_candidates(
+    query: str,
+    summary: Optional[str] = None,
+    faqs: Optional[List[Dict[str, str]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Score the summary and FAQs by BM25 against the query, scaled to [0, 1], without embeddings.
+
+    Used for identifier lookups, whose chunks come from the lexical index. Pieces sharing no
+    term with the query are left out.
+    """
+    texts = ([summary] if summary else []) + [format_faq(faq) for faq in faqs or []]
+    if not texts:
+        return []
+    scores = BM25Index(texts).scores(query)
+    best = float(scores.max())
+    sections = (["summary"] if summary else []) + ["faqs"] * len(faqs or [])
+    return [
+        {"section": section, "text": text, "score": float(score) / best if best > 0 else 0.0}
+        for section, text, score in zip(sections, texts, scores) if score > 0
+    ]
@@ -0,0 +1,494 @@
+"""
+Corpus-level vector index.
+This module keeps the chunk vectors of many documents in a single FAISS index whose type
+follows the size of the corpus: exact (flat) search for small corpora, an HNSW graph for large
+ones and an inverted file (IVF) beyond that. Searches can be restricted to some documents, and
+the recall/speed trade-off of the approximate indexes can be tuned per index and per query.
+"""
+
+import bisect
+import math
+import os
+import statistics
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import faiss
+import numpy as np
+
+INDEX_KINDS = ("flat", "hnsw", "ivf")
+
+# IVF lists are trained on at most this many sample vectors per list
+IVF_TRAINING_POINTS_PER_LIST = 64
+
+def choose_index_kind(size: int, flat_max_vectors: int = 50_000, hnsw_max_vectors: int = 2_000_000) -> str:
+    """Return the index kind for a corpus of the given number of vectors."""
+    if size <= flat_max_vectors:
+        return "flat"
+    if size <= hnsw_max_vectors:
+        return "hnsw"
+    return "ivf"
+
+def _normalize(vectors: Any) -> np.ndarray:
+    """Return vectors as float32 rows of unit length, for cosine similarity by inner product.
+
+    Vectors that are already normalized float32 rows (e.g. memory-mapped from the artifact
+    cache) are returned without a copy.
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+    if np.allclose(norms, 1, atol=1e-4):
+        return matrix
+    return matrix / np.where(norms == 0, 1, norms)[:, None]
+
+def _sample(parts: List[np.ndarray], count: int, seed: int = 0) -> np.ndarray:
+    """Draw count rows at random from a list of matrices without concatenating them."""
+    offsets = np.cumsum([0] + [len(part) for part in parts])
+    rows = np.sort(np.random.default_rng(seed).choice(offsets[-1], size=min(count, offsets[-1]), replace=False))
+    owners = np.searchsorted(offsets, rows, side="right") - 1
+    return np.stack([parts[owner][row - offsets[owner]] for owner, row in zip(owners, rows)])
+
+class CorpusIndex:
+    """
+    Cosine-similarity index over the chunks of many documents.
+
+    Documents are added as blocks of consecutive rows, so a document filter is a set of row
+    ranges. Added vectors are buffered and indexed on the next search. The index is rebuilt
+    when the corpus grows past the size of its kind (flat, then HNSW, then IVF; see
+    choose_index_kind), when an IVF index has grown four-fold since it was trained, or when
+    more than a quarter of its rows belong to removed documents. Filters that leave at most
+    flat_max_vectors vectors are searched exactly.
+    """
+
+    def __init__(
+        self,
+        kind: str = "auto",
+        flat_max_vectors: int = 50_000,
+        hnsw_max_vectors: int = 2_000_000,
+        hnsw_m: int = 32,
+        ef_construction: int = 80,
+        ef_search: int = 64,
+        nlist: int = 0,
+        nprobe: int = 16
+    ):
+        """
+        Args:
+            kind (str): "flat", "hnsw", "ivf", or "auto" to choose by corpus size
+            flat_max_vectors (int): Largest corpus (and filtered subset) searched exactly
+            hnsw_max_vectors (int): Largest corpus indexed with HNSW in "auto" mode; IVF beyond
+            hnsw_m (int): Neighbors per HNSW node; more improves recall at the cost of memory
+            ef_construction (int): HNSW build beam width; more improves graph quality, builds slower
+            ef_search (int): Default HNSW search beam width; more improves recall, searches slower
+            nlist (int): IVF lists; 0 chooses about 4 * sqrt(vectors)
+            nprobe (int): Default IVF lists scanned per query; more improves recall, searches slower
+        """
+        if kind != "auto" and kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown index kind: {kind}. Expected 'auto' or one of {INDEX_KINDS}")
+        self.kind = kind
+        self.flat_max_vectors = flat_max_vectors
+        self.hnsw_max_vectors = hnsw_max_vectors
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.dim: Optional[int] = None
+        self.index_kind: Optional[str] = None
+        self.builds = 0
+        self._index: Optional[Any] = None
+        self._trained_size = 0
+        self._pending: List[np.ndarray] = []  # Vectors added since the index was last synced
+        self._size = 0  # Rows, indexed or pending, including those of removed documents
+        self._removed = 0
+        self._ranges: Dict[str, Tuple[int, int]] = {}  # Live document -> rows [start, end)
+        self._starts: List[int] = []  # First row of every block, in row order
+        self._owners: List[str] = []  # Document of every block
+        self._texts: Dict[str, Optional[Sequence[str]]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._size - self._removed
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self._ranges
+
+    @property
+    def documents(self) -> List[str]:
+        return list(self._ranges)
+
+    def add(self, document_id: str, vectors: Any, texts: Optional[Sequence[str]] = None) -> None:
+        """
+        Add (or replace) a document's chunk vectors.
+
+        Args:
+            document_id (str): Document the vectors belong to, used in filters and results
+            vectors (Any): One vector per chunk
+            texts (Optional[Sequence[str]]): Chunk texts, aligned with vectors, returned with results
+        """
+        if not len(vectors):
+            return
+        matrix = _normalize(vectors)
+        with self._lock:
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(f"Expected vectors of dimension {self.dim}, got {matrix.shape[1]}")
+            self.remove(document_id)
+            self._ranges[document_id] = (self._size, self._size + len(matrix))
+            self._starts.append(self._size)
+            self._owners.append(document_id)
+            self._texts[document_id] = texts
+            self._pending.append(matrix)
+            self._size += len(matrix)
+
+    def remove(self, document_id: str) -> bool:
+        """Remove a document from search results; its rows are dropped at the next rebuild."""
+        with self._lock:
+            rows = self._ranges.pop(document_id, None)
+            if rows is None:
+                return False
+            self._texts.pop(document_id, None)
+            self._removed += rows[1] - rows[0]
+            return True
+
+    def _target_kind(self) -> str:
+        if self.kind != "auto":
+            return self.kind
+        return choose_index_kind(len(self), self.flat_max_vectors, self.hnsw_max_vectors)
+
+    def _create(self, kind: str, parts: List[np.ndarray], size: int) -> Any:
+        """Create an empty index of the given kind, trained on the vectors to index if it needs training."""
+        if kind == "flat":
+            return faiss.IndexFlatIP(self.dim)
+        if kind == "hnsw":
+            index = faiss.IndexHNSWFlat(self.dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = self.ef_construction
+            return index
+        nlist = max(1, min(self.nlist or int(4 * math.sqrt(size)), size))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatIP(self.dim), self.dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(_sample(parts, nlist * IVF_TRAINING_POINTS_PER_LIST))
+        # Row -> list position map, so filtered subsets can be read back for exact search
+        index.make_direct_map()
+        self._trained_size = size
+        return index
+
+    def _live_parts(self) -> List[Tuple[str, np.ndarray]]:
+        """Return the vectors of every live document, in row order, from the index or the pending buffer."""
+        indexed = self._index.ntotal if self._index is not None else 0
+        pending_offsets = np.cumsum([indexed] + [len(part) for part in self._pending])
+        parts = []
+        for document_id, (start, end) in sorted(self._ranges.items(), key=lambda item: item[1]):
+            if start < indexed:
+                parts.append((document_id, self._index.reconstruct_n(start, end - start)))
+            else:
+                block = int(np.searchsorted(pending_offsets, start, side="right")) - 1
+                parts.append((document_id, self._pending[block]))
+        return parts
+
+    def _rebuild(self, kind: str) -> None:
+        """Index the live documents from scratch with an index of the given kind."""
+        parts = self._live_parts()
+        size = sum(len(vectors) for _, vectors in parts)
+        index = self._create(kind, [vectors for _, vectors in parts], size)
+        self._ranges, self._starts, self._owners = {}, [], []
+        row = 0
+        for document_id, vectors in parts:
+            index.add(vectors)
+            self._ranges[document_id] = (row, row + len(vectors))
+            self._starts.append(row)
+            self._owners.append(document_id)
+            row += len(vectors)
+        self._index, self.index_kind = index, kind
+        self._pending, self._size, self._removed = [], size, 0
+        self.builds += 1
+
+    def _sync(self) -> None:
+        """Bring the index up to date with added and removed documents."""
+        if not len(self):
+            return
+        kind = self._target_kind()
+        if (
+            self._index is None
+            or kind != self.index_kind
+            or self._removed > self._size // 4
+            or (kind == "ivf" and len(self) > 4 * self._trained_size)
+        ):
+            self._rebuild(kind)
+            return
+        for part in self._pending:
+            self._index.add(part)
+        self._pending = []
+
+    def _allowed_ranges(self, documents: Optional[Iterable[str]]) -> List[Tuple[int, int]]:
+        """Return the row ranges of the live documents in a filter (all of them without a filter)."""
+        if documents is None:
+            return sorted(self._ranges.values())
+        return sorted(self._ranges[document_id] for document_id in set(documents) if document_id in self._ranges)
+
+    def _vectors(self, start: int, end: int) -> np.ndarray:
+        """Return indexed rows [start, end); a view into flat and HNSW storage, a copy for IVF."""
+        if self.index_kind == "ivf":
+            return self._index.reconstruct_n(start, end - start)
+        storage = self._index if self.index_kind == "flat" else faiss.downcast_index(self._index.storage)
+        xb = faiss.rev_swig_ptr(storage.get_xb(), storage.ntotal * self.dim)
+        return xb.reshape(storage.ntotal, self.dim)[start:end]
+
+    def _exact_search(self, query: np.ndarray, k: int, ranges: List[Tuple[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+        scores = np.concatenate([self._vectors(start, end) @ query for start, end in ranges])
+        rows = np.concatenate([np.arange(start, end) for start, end in ranges])
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return scores[top], rows[top]
+
+    def _search_params(
+        self,
+        ranges: List[Tuple[int, int]],
+        allowed: int,
+        k: int,
+        ef_search: Optional[int],
+        nprobe: Optional[int]
+    ) -> Tuple[Any, Any]:
+        """Return the FAISS search parameters for a query, and the filter bitmap they point to."""
+        selector, bitmap = None, None
+        if allowed < self._index.ntotal:
+            if len(ranges) == 1:
+                selector = faiss.IDSelectorRange(*ranges[0])
+            else:
+                mask = np.zeros(self._index.ntotal, dtype=bool)
+                for start, end in ranges:
+                    mask[start:end] = True
+                bitmap = np.packbits(mask, bitorder="little")
+                selector = faiss.IDSelectorBitmap(self._index.ntotal, faiss.swig_ptr(bitmap))
+        if self.index_kind == "hnsw":
+            ef = max(ef_search or self.ef_search, k)
+            if selector is not None:
+                # Filtered-out nodes are still traversed; widen the beam as the filter gets more selective
+                ef = min(int(ef * self._index.ntotal / allowed), max(ef, 1024))
+            return faiss.SearchParametersHNSW(efSearch=ef, sel=selector), bitmap
+        if self.index_kind == "ivf":
+            return faiss.SearchParametersIVF(nprobe=nprobe or self.nprobe, sel=selector), bitmap
+        return (faiss.SearchParameters(sel=selector) if selector is not None else None), bitmap
+
+    def search(
+        self,
+        query_vector: Any,
+        k: int = 4,
+        documents: Optional[Iterable[str]] = None,
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the k chunks most similar to an embedded query, best first.
+
+        Args:
+            query_vector (Any): Query embedding
+            k (int): Number of chunks to return
+            documents (Optional[Iterable[str]]): Only search these documents
+            ef_search (Optional[int]): HNSW beam width for this query, instead of the default
+            nprobe (Optional[int]): IVF lists scanned for this query, instead of the default
+
+        Returns:
+            List[Dict[str, Any]]: Chunks with "document_id", "chunk" (position in the document),
+            "score" (cosine similarity) and "text" (None if the document was added without texts)
+        """
+        query = _normalize(query_vector)[0]
+        with self._lock:
+            self._sync()
+            ranges = self._allowed_ranges(documents)
+            allowed = sum(end - start for start, end in ranges)
+            if k <= 0 or not allowed:
+                return []
+            if allowed < self._index.ntotal and allowed <= self.flat_max_vectors:
+                scores, rows = self._exact_search(query, k, ranges)
+            else:
+                params, bitmap = self._search_params(ranges, allowed, k, ef_search, nprobe)
+                scores, rows = self._index.search(query.reshape(1, -1), k, params=params)
+                scores, rows = scores[0], rows[0]
+            return [self._hit(int(row), float(score)) for row, score in zip(rows, scores) if row >= 0]
+
+    def _hit(self, row: int, score: float) -> Dict[str, Any]:
+        block = bisect.bisect_right(self._starts, row) - 1
+        document_id = self._owners[block]
+        chunk = row - self._starts[block]
+        texts = self._texts.get(document_id)
+        return {
+            "document_id": document_id,
+            "chunk": chunk,
+            "score": round(score, 4),
+            "text": texts[chunk] if texts is not None else None
+        }
+
+    def memory_bytes(self) -> int:
+        """Estimate the memory held by the index structure (vectors, graph links or lists)."""
+        index = self._index
+        if index is None:
+            return 0
+        size = index.ntotal * self.dim * 4
+        if self.index_kind == "hnsw":
+            hnsw = index.hnsw
+            size += hnsw.neighbors.size() * 4 + hnsw.levels.size() * 4 + hnsw.offsets.size() * 8
+        elif self.index_kind == "ivf":
+            # Row ids in the lists, the direct map, and the list centroids
+            size += index.ntotal * 16 + index.nlist * self.dim * 4
+        return size
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the index kind, its size and its estimated memory."""
+        with self._lock:
+            return {
+                "kind": self.index_kind,
+                "documents": len(self._ranges),
+                "vectors": len(self),
+                "pending_vectors": sum(len(part) for part in self._pending),
+                "removed_vectors": self._removed,
+                "builds": self.builds,
+                "memory_bytes": self.memory_bytes()
+            }
+
+def synthetic_vectors(size: int, dim: int, clusters: int = 1000, seed: int = 0, batch: int = 100_000) -> np.ndarray:
+    """Generate unit vectors scattered around random cluster centers, a rough stand-in for text embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    vectors = np.empty((size, dim), dtype=np.float32)
+    for start in range(0, size, batch):
+        end = min(start + batch, size)
+        block = centers[rng.integers(clusters, size=end - start)]
+        block += rng.standard_normal(block.shape, dtype=np.float32) * 0.8
+        vectors[start:end] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    return vectors
+
+def exact_top_k(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    rows: Optional[np.ndarray] = None,
+    batch: int = 100_000
+) -> np.ndarray:
+    """Return the rows of the k most similar vectors to each query by brute force, optionally among some rows only."""
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_rows = np.full((len(queries), k), -1, dtype=np.int64)
+    candidates = np.arange(len(vectors)) if rows is None else rows
+    for start in range(0, len(candidates), batch):
+        block = candidates[start:start + batch]
+        scores = queries @ vectors[block].T if rows is not None else queries @ vectors[block[0]:block[-1] + 1].T
+        merged_scores = np.concatenate([best_scores, scores], axis=1)
+        merged_rows = np.concatenate([best_rows, np.broadcast_to(block, scores.shape)], axis=1)
+        top = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(merged_scores, top, axis=1)
+        best_rows = np.take_along_axis(merged_rows, top, axis=1)
+    return best_rows
+
+def _rss_bytes() -> Optional[int]:
+    """Return the resident memory of this process (Linux only)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+def _measure(
+    index: CorpusIndex,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    k: int,
+    documents: Optional[List[Optional[List[str]]]] = None,
+    **knobs: Any
+) -> Dict[str, float]:
+    """Search every query one at a time; return recall@k against the exact results, and latency."""
+    latencies, recalls = [], []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        hits = index.search(query, k, documents[i] if documents else None, **knobs)
+        latencies.append((time.perf_counter() - start) * 1000)
+        rows = {index._ranges[hit["document_id"]][0] + hit["chunk"] for hit in hits}
+        recalls.append(len(rows & set(truth[i].tolist())) / k)
+    return {
+        "recall": round(statistics.mean(recalls), 3),
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "p95_ms": round(sorted(latencies)[int(0.95 * (len(latencies) - 1))], 3)
+    }
+
+def benchmark_corpus_index(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    kinds: Sequence[str] = INDEX_KINDS,
+    k: int = 10,
+    document_size: int = 1000,
+    sweeps: Optional[Dict[str, Tuple[str, Sequence[int]]]] = None,
+    **options: Any
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Build an index of each kind over the vectors and measure query latency, recall@k and memory.
+
+    The vectors are split into documents of document_size chunks. Each kind is searched
+    without a filter (once per value of its recall/speed knob), within one document, and
+    within every tenth document. Indexes are built one after another so their memory can be
+    compared.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Per kind, the build time in seconds, estimated index memory
+        and process memory growth in MB, and recall and mean/p95 latency in ms per scenario
+    """
+    sweeps = sweeps or {"hnsw": ("ef_search", (16, 32, 64, 128, 256)), "ivf": ("nprobe", (1, 4, 16, 64))}
+    starts = list(range(0, len(vectors), document_size))
+    document_ids = [f"doc-{i}" for i in range(len(starts))]
+    truth = exact_top_k(vectors, queries, k)
+    # Filter on the document holding each query's nearest neighbor, and on every tenth document
+    document_rows = lambda document: np.arange(starts[document], min(starts[document] + document_size, len(vectors)))
+    own = [int(rows[0]) // document_size for rows in truth]
+    own_documents = [[document_ids[document]] for document in own]
+    own_truth = np.concatenate([exact_top_k(vectors, queries[i:i + 1], k, document_rows(document)) for i, document in enumerate(own)])
+    tenth = document_ids[::10]
+    tenth_rows = np.concatenate([document_rows(document) for document in range(0, len(starts), 10)])
+    tenth_truth = exact_top_k(vectors, queries, k, tenth_rows)
+
+    report: Dict[str, Dict[str, Any]] = {}
+    for kind in kinds:
+        rss = _rss_bytes()
+        index = CorpusIndex(kind, **options)
+        start = time.perf_counter()
+        for document_id, row in zip(document_ids, starts):
+            index.add(document_id, vectors[row:row + document_size])
+        index.search(queries[0], k)
+        build_seconds = time.perf_counter() - start
+        row = {
+            "build_s": round(build_seconds, 1),
+            "index_mb": round(index.memory_bytes() / 2**20, 1),
+            "rss_growth_mb": round((_rss_bytes() - rss) / 2**20, 1) if rss is not None else None,
+            "search": []
+        }
+        knob, values = sweeps.get(kind, (None, (None,)))
+        for value in values:
+            knobs = {knob: value} if knob else {}
+            row["search"].append({"filter": "none", "knob": knob, "value": value, **_measure(index, queries, truth, k, **knobs)})
+        row["search"].append({"filter": "1 document", **_measure(index, queries, own_truth, k, own_documents)})
+        row["search"].append({"filter": "10% of documents", **_measure(index, queries, tenth_truth, k, [tenth] * len(queries))})
+        report[kind] = row
+        del index
+    return report
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark corpus index kinds on synthetic vectors")
+    parser.add_argument("--vectors", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--kinds", default=",".join(INDEX_KINDS))
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.vectors, args.dim)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = _normalize(queries + rng.standard_normal(queries.shape, dtype=np.float32) * 0.02)
+    report = benchmark_corpus_index(vectors, queries, args.kinds.split(","), args.k)
+    print(f"{args.vectors} vectors of dimension {args.dim}, {args.queries} queries, recall@{args.k}")
+    for kind, row in report.items():
+        print(f"\n{kind}: built in {row['build_s']} s, index {row['index_mb']} MB, process grew {row['rss_growth_mb']} MB")
+        print(f"  {'filter':<17} {'knob':<14} {'recall':>7} {'mean (ms)':>10} {'p95 (ms)':>9}")
+        for search in row["search"]:
+            knob = f"{search['knob']}={search['value']}" if search.get("knob") else "-"
+            print(f"  {search['filter']:<17} {knob:<14} {search['recall']:>7} {search['mean_ms']:>10} {search['p95_ms']:>9}")
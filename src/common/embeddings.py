@@ -0,0 +1,265 @@
+"""
+Embedding model wrappers shared across the application.
+These wrappers add bookkeeping around a langchain Embeddings model without changing its results.
+"""
+
+import asyncio
+import hashlib
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from .cache import EmbeddingCache, get_embedding_cache
+
+class CountingEmbeddings(Embeddings):
+    """Embeddings wrapper that counts how often the underlying model is called."""
+
+    def __init__(self, inner: Embeddings):
+        self.inner = inner
+        self.document_calls = 0
+        self.query_calls = 0
+        self.texts_embedded = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed search docs and record the call."""
+        with self._lock:
+            self.document_calls += 1
+            self.texts_embedded += len(texts)
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed query text and record the call."""
+        with self._lock:
+            self.query_calls += 1
+            self.texts_embedded += 1
+        return self.inner.embed_query(text)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Return the current call counters."""
+        with self._lock:
+            return {
+                "document_calls": self.document_calls,
+                "query_calls": self.query_calls,
+                "texts_embedded": self.texts_embedded
+            }
+
+    def calls_since(self, snapshot: Dict[str, int]) -> Dict[str, int]:
+        """Return the number of calls made since the given snapshot was taken."""
+        current = self.snapshot()
+        return {key: current[key] - snapshot.get(key, 0) for key in current}
+
+class PrecomputedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves known vectors and only embeds unseen text."""
+
+    def __init__(self, inner: Embeddings, texts: List[str], vectors: List[List[float]]):
+        self.inner = inner
+        self._vectors = {}
+        self.add(texts, vectors)
+
+    def add(self, texts: List[str], vectors: List[List[float]]) -> None:
+        """Register vectors that were computed elsewhere."""
+        for text, vector in zip(texts, vectors):
+            self._vectors[text] = vector.tolist() if hasattr(vector, "tolist") else list(vector)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed search docs, reusing precomputed vectors where available."""
+        missing = [text for text in texts if text not in self._vectors]
+        if missing:
+            for text, vector in zip(missing, self.inner.embed_documents(missing)):
+                self._vectors[text] = vector
+        return [self._vectors[text] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed query text with the underlying model."""
+        return self.inner.embed_query(text)
+
+def embedding_key(model_name: str, text: str) -> str:
+    """Cache key for a text: model name plus a hash of the whitespace-normalized text."""
+    normalized = " ".join(text.split())
+    return hashlib.sha256(f"{model_name}\x00{normalized}".encode("utf-8")).hexdigest()
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper backed by the on-disk embedding cache; only unseen text reaches the model."""
+
+    def __init__(self, inner: Embeddings, model_name: str, cache: Optional[EmbeddingCache] = None):
+        self.inner = inner
+        self.model_name = model_name
+        self.cache = cache or get_embedding_cache(model_name)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed search docs, reading cached vectors and embedding only the misses."""
+        keys = [embedding_key(self.model_name, text) for text in texts]
+        found = self.cache.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.inner.embed_documents(list(missing.values()))
+            self.cache.put_many(list(missing), vectors)
+            found.update(zip(missing, vectors))
+
+        return [self._as_list(found[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed query text, reusing a cached vector when the same query was seen before."""
+        # Some models embed queries differently from documents, so queries get keys of their own
+        key = embedding_key(f"{self.model_name}:query", text)
+        found = self.cache.get_many([key])
+        if key in found:
+            return self._as_list(found[key])
+        vector = self.inner.embed_query(text)
+        self.cache.put_many([key], [vector])
+        return vector
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the cache's hit/miss counters and size."""
+        return self.cache.stats()
+
+    @staticmethod
+    def _as_list(vector: Any) -> List[float]:
+        return vector.tolist() if hasattr(vector, "tolist") else list(vector)
+
+class _EmbedRequest:
+    """Texts from one caller waiting to be embedded in a shared batch."""
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+class BatchingEmbeddings(Embeddings):
+    """
+    In-process embedding service that merges concurrent requests into shared batches.
+
+    Callers from any thread enqueue their texts; a single worker thread collects requests
+    until max_batch_size texts are waiting or max_wait_ms has passed since the first one,
+    runs the model once over the whole batch and hands every caller its own vectors.
+    Queries go through the same batches, which suits symmetric models such as
+    sentence-transformers.
+    """
+
+    def __init__(self, inner: Embeddings, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.inner = inner
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: queue.Queue = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._texts = 0
+        self._largest_batch = 0
+        self._queue_wait = 0.0
+        self._max_queue_wait = 0.0
+        self._model_seconds = 0.0
+
+    def _ensure_worker(self) -> None:
+        """Start the batching thread on first use."""
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def _submit(self, texts: List[str]) -> List[Future]:
+        """Enqueue texts in pieces no larger than one batch."""
+        self._ensure_worker()
+        requests = [
+            _EmbedRequest(texts[start:start + self.max_batch_size])
+            for start in range(0, len(texts), self.max_batch_size)
+        ]
+        for request in requests:
+            self._queue.put(request)
+        return [request.future for request in requests]
+
+    def _collect(self, carry: Optional[_EmbedRequest]) -> Tuple[List[_EmbedRequest], Optional[_EmbedRequest]]:
+        """Gather requests for one batch; returns the batch and a request left for the next one."""
+        first = carry or self._queue.get()
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while size < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if size + len(request.texts) > self.max_batch_size:
+                return batch, request
+            batch.append(request)
+            size += len(request.texts)
+        return batch, None
+
+    def _run(self) -> None:
+        """Worker loop: embed one batch at a time and resolve the callers' futures."""
+        carry = None
+        while True:
+            batch, carry = self._collect(carry)
+            started = time.perf_counter()
+            texts = [text for request in batch for text in request.texts]
+            try:
+                vectors = self.inner.embed_documents(texts)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            offset = 0
+            for request in batch:
+                request.future.set_result(vectors[offset:offset + len(request.texts)])
+                offset += len(request.texts)
+
+            with self._stats_lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._texts += len(texts)
+                self._largest_batch = max(self._largest_batch, len(texts))
+                self._model_seconds += finished - started
+                for request in batch:
+                    wait = started - request.enqueued_at
+                    self._queue_wait += wait
+                    self._max_queue_wait = max(self._max_queue_wait, wait)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed search docs as part of the shared batches."""
+        vectors = []
+        for future in self._submit(texts):
+            vectors.extend(future.result())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed query text as part of the shared batches."""
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed search docs without holding an executor thread while the batch fills."""
+        vectors = []
+        for future in self._submit(texts):
+            vectors.extend(await asyncio.wrap_future(future))
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed query text without holding an executor thread while the batch fills."""
+        return (await self.aembed_documents([text]))[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return batch-size, queue-wait and throughput metrics."""
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "texts_embedded": self._texts,
+                "average_batch_size": round(self._texts / self._batches, 2) if self._batches else 0,
+                "largest_batch_size": self._largest_batch,
+                "average_queue_wait_ms": round(1000 * self._queue_wait / self._requests, 2) if self._requests else 0,
+                "max_queue_wait_ms": round(1000 * self._max_queue_wait, 2),
+                "embeddings_per_second": round(self._texts / self._model_seconds, 1) if self._model_seconds else 0,
+                "queued_requests": self._queue.qsize()
+            }
@@ -0,0 +1,79 @@
+"""
+FAQ fast path.
+This module indexes the questions of generated FAQs as embedding vectors so that a chat query
+which closely matches one of them can be answered with the stored answer instead of an LLM call.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+class FAQIndex:
+    """Cosine-similarity index over the questions of a document's FAQs."""
+
+    def __init__(self, faqs: List[Dict[str, str]], embeddings: Embeddings, vectors: Optional[Any] = None):
+        """
+        Args:
+            faqs (List[Dict[str, str]]): FAQs with "question" and "answer" fields
+            embeddings (Embeddings): Model used to embed the questions and incoming queries
+            vectors (Optional[Any]): Precomputed question vectors, e.g. from the artifact cache
+        """
+        self.faqs = [faq for faq in faqs if faq.get("question") and faq.get("answer")]
+        self.embeddings = embeddings
+        if vectors is None:
+            vectors = embeddings.embed_documents([faq["question"] for faq in self.faqs]) if self.faqs else []
+        self.vectors = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(len(self.faqs), -1))
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    def match_vector(self, vector: Any, threshold: float) -> Optional[Dict[str, Any]]:
+        """Return the FAQ whose question is most similar to an embedded query, if it reaches the threshold."""
+        if not self.faqs:
+            return None
+        scores = self.vectors @ self._normalize(np.asarray(vector, dtype=np.float32))
+        best = int(np.argmax(scores))
+        if scores[best] < threshold:
+            return None
+        return {**self.faqs[best], "score": round(float(scores[best]), 4)}
+
+    def match(self, query: str, threshold: float) -> Optional[Dict[str, Any]]:
+        """Embed a query and return the best matching FAQ above the threshold, or None."""
+        if not self.faqs:
+            return None
+        return self.match_vector(self.embeddings.embed_query(query), threshold)
+
+    async def amatch(self, query: str, threshold: float) -> Optional[Dict[str, Any]]:
+        """Async version of match for use in request handlers."""
+        if not self.faqs:
+            return None
+        return self.match_vector(await self.embeddings.aembed_query(query), threshold)
+
+class FastPathStats:
+    """Counts how many chat queries were answered from FAQs."""
+
+    def __init__(self):
+        self.lookups = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit: bool) -> None:
+        """Record the outcome of one FAQ lookup."""
+        with self._lock:
+            self.lookups += 1
+            self.hits += int(hit)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return lookup and hit counters and the hit rate."""
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0
+            }
+
+# Create a global counter shared by every FAQ fast path in the process
+faq_fast_path_stats = FastPathStats()
@@ -0,0 +1,196 @@
+"""
+Token-budgeted conversation memory.
+This module keeps the chat history fed to a conversational chain within a fixed token budget:
+recent turns are kept verbatim, and older turns are folded into a rolling summary by a
+background thread between turns, so prompt size stays flat however long a session runs.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from langchain.memory import ConversationBufferMemory
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain_core.messages import BaseMessage, SystemMessage, get_buffer_string
+from .tokens import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+MEMORY_MODES = ("buffer", "summary")
+
+def format_messages(messages: List[Any]) -> str:
+    """Render chat messages as Human:/Assistant: lines for a prompt; system messages are kept as they are."""
+    roles = {"human": "Human: ", "ai": "Assistant: ", "system": ""}
+    return "\n".join(f"{roles.get(message.type, 'Assistant: ')}{message.content}" for message in messages)
+
+def llm_summarizer(llm: Any, prompt: Any) -> Callable[[str, str], str]:
+    """
+    Build a summarize(summary, new_lines) function that extends a summary with an LLM.
+
+    The prompt takes "summary" and "new_lines"; chat models and plain LLMs are both accepted.
+    """
+    def summarize(summary: str, new_lines: str) -> str:
+        result = llm.invoke(prompt.format(summary=summary or "(none)", new_lines=new_lines))
+        return str(getattr(result, "content", result)).strip()
+    return summarize
+
+class RollingSummary:
+    """
+    Bookkeeping behind TokenBudgetMemory, independent of the chain framework.
+
+    Messages older than the most recent window_tokens are folded into a summary by a background
+    thread. select() returns the summary and as many recent messages as fit max_tokens; messages
+    waiting to be folded that do not fit are left out of the prompt until they are summarized.
+    """
+
+    def __init__(self, summarize: Callable[[str, str], str], max_tokens: int = 1000, window_tokens: int = 500):
+        """
+        Args:
+            summarize (Callable[[str, str], str]): Extends a summary with new Human:/Assistant: lines
+            max_tokens (int): Hard budget for the summary and recent messages together
+            window_tokens (int): Recent history kept verbatim; the rest of the budget holds the summary
+        """
+        self.summarize = summarize
+        self.max_tokens = max_tokens
+        self.window_tokens = min(window_tokens, max_tokens)
+        self.summary = ""
+        self.summarized = 0  # Number of leading messages folded into the summary
+        self.summaries = 0
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+    def reset(self) -> None:
+        """Forget the summary, e.g. when the history is cleared."""
+        with self._lock:
+            self.summary = ""
+            self.summarized = 0
+
+    def _fold_point(self, messages: List[Any]) -> int:
+        """Return the index up to which messages should be summarized, keeping whole turns in the window."""
+        tokens = 0
+        start = len(messages)
+        while start > self.summarized and tokens + estimate_tokens(str(messages[start - 1].content)) <= self.window_tokens:
+            start -= 1
+            tokens += estimate_tokens(str(messages[start].content))
+        # Human/assistant messages alternate; never split a turn
+        return max(self.summarized, start - start % 2)
+
+    def select(self, messages: List[Any]) -> Tuple[str, List[Any]]:
+        """Return the summary and the most recent messages that fit the token budget."""
+        with self._lock:
+            if self.summarized > len(messages):
+                # The history was replaced by a shorter one
+                self.summary, self.summarized = "", 0
+            summary = self.summary[:(self.max_tokens - self.window_tokens) * CHARS_PER_TOKEN]
+            start = self.summarized
+        budget = self.max_tokens - estimate_tokens(summary)
+        recent: List[Any] = []
+        for message in reversed(messages[start:]):
+            tokens = estimate_tokens(str(message.content))
+            if tokens > budget:
+                break
+            recent.append(message)
+            budget -= tokens
+        recent.reverse()
+        return summary, recent
+
+    def schedule(self, messages: List[Any]) -> bool:
+        """Start folding old messages in the background if the window overflows; returns True if started."""
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return False
+            if self._fold_point(messages) <= self.summarized:
+                return False
+            self._worker = threading.Thread(target=self._fold, args=(list(messages),), daemon=True)
+            self._worker.start()
+            return True
+
+    def _fold(self, messages: List[Any]) -> None:
+        """Summarize every message before the fold point into the rolling summary."""
+        with self._lock:
+            start, end, summary = self.summarized, self._fold_point(messages), self.summary
+        try:
+            new_summary = self.summarize(summary, format_messages(messages[start:end]))
+        except Exception as e:
+            logger.warning(f"Could not summarize conversation history: {str(e)}")
+            return
+        with self._lock:
+            # Discard the result if the history was reset meanwhile
+            if self.summarized == start and self.summary == summary:
+                self.summary, self.summarized = new_summary, end
+                self.summaries += 1
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Wait for a running summarization to finish."""
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the summary size and how many messages it covers."""
+        with self._lock:
+            return {
+                "summary_tokens": estimate_tokens(self.summary),
+                "summarized_messages": self.summarized,
+                "summaries": self.summaries
+            }
+
+class TokenBudgetMemory(BaseChatMemory):
+    """
+    Chat memory that replays a rolling summary plus a verbatim window of recent turns.
+
+    The full history stays in chat_memory (so sessions can persist and restore it); only the
+    history passed to the chain is bounded. The summary is rebuilt in the background after
+    the history is restored.
+    """
+
+    memory_key: str = "chat_history"
+    rolling: RollingSummary
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the summary (as a system message) and recent messages within the token budget."""
+        summary, recent = self.rolling.select(self.chat_memory.messages)
+        messages: List[BaseMessage] = list(recent)
+        if summary:
+            messages.insert(0, SystemMessage(content=f"Summary of the earlier conversation: {summary}"))
+        return {self.memory_key: messages if self.return_messages else get_buffer_string(messages)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        """Record a turn, then fold older turns into the summary in the background."""
+        super().save_context(inputs, outputs)
+        self.rolling.schedule(self.chat_memory.messages)
+
+    def clear(self) -> None:
+        super().clear()
+        self.rolling.reset()
+
+def create_chat_memory(
+    mode: str,
+    summarize: Optional[Callable[[str, str], str]] = None,
+    max_tokens: int = 1000,
+    window_tokens: int = 500,
+    **kwargs: Any
+) -> BaseChatMemory:
+    """
+    Create the conversation memory for a chain.
+
+    Args:
+        mode (str): "buffer" replays the whole history; "summary" keeps it within max_tokens
+        summarize (Optional[Callable[[str, str], str]]): Summary function, required for "summary"
+        max_tokens (int): Token budget of the history in "summary" mode
+        window_tokens (int): Recent history kept verbatim in "summary" mode
+        **kwargs: Passed to the memory (memory_key, return_messages, output_key, ...)
+
+    Returns:
+        BaseChatMemory: The memory
+    """
+    if mode == "buffer":
+        return ConversationBufferMemory(**kwargs)
+    if mode == "summary":
+        if summarize is None:
+            raise ValueError("The summary memory mode needs a summarize function")
+        return TokenBudgetMemory(rolling=RollingSummary(summarize, max_tokens, window_tokens), **kwargs)
+    raise ValueError(f"Unknown memory mode: {mode}. Expected one of {MEMORY_MODES}")
@@ -0,0 +1,87 @@
+"""
+Streaming pipeline helpers.
+A pipeline chains generator stages, runs each stage in its own thread, and connects neighbouring
+stages with bounded queues so that stages overlap while memory stays capped.
+"""
+
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator
+
+# Marks the end of a stage's output
+_DONE = object()
+
+class _StageError:
+    """Carries an exception raised in one stage to the stages after it."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+def _put(out: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Put an item on a bounded queue, giving up if the pipeline was stopped."""
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _drain(source: queue.Queue, stop: threading.Event) -> Iterator[Any]:
+    """Yield the items of a stage's output queue until it is done, re-raising stage errors."""
+    while not stop.is_set():
+        try:
+            item = source.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is _DONE:
+            return
+        if isinstance(item, _StageError):
+            raise item.error
+        yield item
+
+def _pump(items: Iterable[Any], out: queue.Queue, stop: threading.Event) -> None:
+    """Move the items of one stage onto its output queue; runs in the stage's thread."""
+    try:
+        for item in items:
+            if not _put(out, item, stop):
+                return
+        _put(out, _DONE, stop)
+    except BaseException as e:
+        _put(out, _StageError(e), stop)
+
+def run_pipeline(
+    source: Iterable[Any],
+    *stages: Callable[[Iterator[Any]], Iterator[Any]],
+    maxsize: int = 8
+) -> Iterator[Any]:
+    """
+    Stream items from source through generator stages running concurrently.
+
+    Each stage is a function that takes an iterator of inputs and yields outputs. The source
+    and every stage run in their own thread; at most maxsize items wait between two stages.
+    An exception in any stage is re-raised to the consumer.
+
+    Args:
+        source (Iterable): Items fed to the first stage (e.g. a page generator)
+        *stages (Callable): Generator functions applied in order
+        maxsize (int): Capacity of each queue between stages
+
+    Returns:
+        Iterator: Outputs of the last stage, in order
+    """
+    stop = threading.Event()
+    current = queue.Queue(maxsize=maxsize)
+    threads = [threading.Thread(target=_pump, args=(source, current, stop), daemon=True)]
+    for stage in stages:
+        out = queue.Queue(maxsize=maxsize)
+        threads.append(threading.Thread(target=_pump, args=(stage(_drain(current, stop)), out, stop), daemon=True))
+        current = out
+
+    for thread in threads:
+        thread.start()
+    try:
+        yield from _drain(current, stop)
+    finally:
+        # Unblock any stage still waiting to hand over or receive items
+        stop.set()
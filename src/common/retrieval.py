@@ -0,0 +1,302 @@
+"""
+Lexical and hybrid retrieval over document chunks.
+This module implements an in-memory BM25 inverted index whose tokenizer keeps identifiers such
+as "4.2.1", "B-12" or "XR-2000/3" whole, and a hybrid searcher that fuses BM25 scores with
+dense (embedding) similarity. Queries that are clearly identifier lookups ("Section 4.2.1",
+"Annex B") are answered from the lexical index alone, without embedding the query.
+"""
+
+import math
+import re
+import statistics
+import time
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+
+# Words, numbers and identifiers; inner dots, dashes and slashes are kept ("4.2.1", "ab-12", "2016/679")
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[./\-][a-z0-9]+)*")
+_CASED_TOKEN_RE = re.compile(_TOKEN_RE.pattern, re.IGNORECASE)
+
+# Nouns that introduce a reference to a part of a regulatory document
+_REFERENCE_WORDS = {
+    "section", "sections", "article", "articles", "annex", "annexes", "appendix", "clause", "paragraph", "chapter"
+}
+
+# Reference nouns that are also everyday words ("what form i need", "item a list"): their label must be marked
+_GENERIC_REFERENCE_WORDS = {"part", "schedule", "table", "figure", "rule", "regulation", "directive", "item", "form"}
+
+_ROMAN_RE = re.compile(r"(?=[ivxlcdm])m{0,3}(cm|cd|d?c{0,3})(xc|xl|l?x{0,3})(ix|iv|v?i{0,3})")
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase index terms, keeping identifiers whole."""
+    return _TOKEN_RE.findall(text.lower())
+
+def _is_label(token: str) -> bool:
+    """A label that can follow a reference word: a number or code, a single letter or a roman numeral."""
+    return any(char.isdigit() for char in token) or len(token) == 1 or bool(_ROMAN_RE.fullmatch(token))
+
+def _is_marked_label(reference: str, label: str, following: str) -> bool:
+    """
+    A label that can follow an everyday reference word, as written in the query.
+
+    Numbers and codes qualify; a single letter or roman numeral only when it is uppercase
+    ("Item A", "Part IV") or followed by a period ("item a."). The pronoun "I" also needs a
+    capitalized reference word ("Form I", but not "what form I need").
+    """
+    if any(char.isdigit() for char in label):
+        return True
+    if not _is_label(label.lower()):
+        return False
+    if following == ".":
+        return True
+    return label.isupper() and (label != "I" or reference[:1].isupper())
+
+def is_identifier_query(query: str, max_words: int = 8) -> bool:
+    """
+    Return True if a query is clearly a lookup of an identifier.
+
+    That is a short query (at most max_words terms) that contains a code mixing letters and
+    digits or a dotted number ("XR-2000", "4.2.1"), or a reference word followed by a label
+    ("Annex B", "Article 5", "Part IV"). Everyday reference words such as "item" or "form"
+    need a number or a marked label (see _is_marked_label).
+    """
+    matches = list(_CASED_TOKEN_RE.finditer(query))
+    tokens = [match.group().lower() for match in matches]
+    if not tokens or len(tokens) > max_words:
+        return False
+    for i, token in enumerate(tokens):
+        if any(char.isdigit() for char in token) and not token.isdigit():
+            return True
+        if i + 1 == len(tokens):
+            break
+        if token in _REFERENCE_WORDS and _is_label(tokens[i + 1]):
+            return True
+        label = matches[i + 1]
+        if token in _GENERIC_REFERENCE_WORDS and _is_marked_label(
+            matches[i].group(), label.group(), query[label.end():label.end() + 1]
+        ):
+            return True
+    return False
+
+class BM25Index:
+    """Okapi BM25 inverted index over a fixed list of texts."""
+
+    def __init__(self, texts: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            texts (Sequence[str]): Texts to index, addressed by their position
+            k1 (float): Term frequency saturation
+            b (float): Document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self.size = len(texts)
+        postings: Dict[str, Dict[int, int]] = {}
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[doc_id] = len(tokens)
+            for token in tokens:
+                counts = postings.setdefault(token, {})
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+        average_length = float(lengths.mean()) if self.size and lengths.mean() > 0 else 1.0
+        # Per-document length normalization, precomputed once
+        self._norms = k1 * (1 - b + b * lengths / average_length)
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray, float]] = {}
+        for term, counts in postings.items():
+            ids = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+            tfs = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+            idf = math.log(1 + (self.size - len(counts) + 0.5) / (len(counts) + 0.5))
+            self._postings[term] = (ids, tfs, idf)
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._postings)
+
+    def scores(self, query: str) -> np.ndarray:
+        """Return the BM25 score of every text for a query."""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            ids, tfs, idf = posting
+            scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + self._norms[ids])
+        return scores
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[int, float]]:
+        """Return the k best matching texts as (position, score), best first; texts without a query term are left out."""
+        return _top_k(self.scores(query), k)
+
+def _top_k(scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    """Return the k highest positive scores as (position, score), best first."""
+    if k <= 0 or not len(scores):
+        return []
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+class HybridSearcher:
+    """
+    Retrieves chunks by BM25, by embedding similarity, or by a fusion of both.
+
+    In hybrid mode both scores are scaled to [0, 1] (BM25 by the best score for the query,
+    cosine similarity clipped at 0) and combined as alpha * dense + (1 - alpha) * lexical.
+    Identifier lookups skip the dense side and its query embedding.
+    """
+
+    def __init__(
+        self,
+        chunks: Sequence[str],
+        vectors: Any,
+        embeddings: Optional[Embeddings] = None,
+        alpha: float = 0.5,
+        identifier_max_words: int = 8
+    ):
+        """
+        Args:
+            chunks (Sequence[str]): Chunk texts
+            vectors (Any): Chunk embedding vectors, aligned with chunks
+            embeddings (Optional[Embeddings]): Model used to embed queries for dense search
+            alpha (float): Weight of the dense score in hybrid mode
+            identifier_max_words (int): Longest query treated as an identifier lookup
+        """
+        self.chunks = list(chunks)
+        self.embeddings = embeddings
+        self.alpha = alpha
+        self.identifier_max_words = identifier_max_words
+        self.lexical = BM25Index(self.chunks)
+        # Kept as given (e.g. memory-mapped from the artifact cache); only the norms are computed
+        self.vectors = np.asarray(vectors, dtype=np.float32).reshape(len(self.chunks), -1)
+        norms = np.linalg.norm(self.vectors, axis=1)
+        self._norms = np.where(norms == 0, 1, norms)
+
+    def route(self, query: str, mode: str = "hybrid") -> str:
+        """Return the mode a query is actually served with."""
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {mode}. Expected one of {RETRIEVAL_MODES}")
+        if mode == "hybrid" and is_identifier_query(query, self.identifier_max_words):
+            return "lexical"
+        return mode
+
+    def dense_scores(self, query_vector: Any) -> np.ndarray:
+        """Return the cosine similarity of every chunk to an embedded query."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        return (self.vectors @ query) / (self._norms * (norm if norm else 1))
+
+    def search(
+        self,
+        query: str,
+        k: int = 4,
+        mode: str = "hybrid",
+        query_vector: Optional[Any] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Return the k best chunks for a query as (position, score), best first.
+
+        Args:
+            query (str): Query text
+            k (int): Number of chunks to return
+            mode (str): "dense", "lexical" or "hybrid"
+            query_vector (Optional[Any]): Precomputed query embedding for the dense side
+        """
+        mode = self.route(query, mode)
+        if mode == "lexical":
+            lexical = self.lexical.scores(query)
+            best = lexical.max() if len(lexical) else 0
+            return _top_k(lexical / best if best > 0 else lexical, k)
+
+        if query_vector is None:
+            query_vector = self.embeddings.embed_query(query)
+        dense = np.clip(self.dense_scores(query_vector), 0, None)
+        if mode == "dense":
+            return _top_k(dense, k)
+
+        lexical = self.lexical.scores(query)
+        best = lexical.max() if len(lexical) else 0
+        if best > 0:
+            lexical = lexical / best
+        return _top_k(self.alpha * dense + (1 - self.alpha) * lexical, k)
+
+def synthetic_queries(chunks: Sequence[str], limit: int = 50) -> List[Tuple[str, Set[int]]]:
+    """
+    Build benchmark queries with known answers from the chunks themselves.
+
+    Identifier queries are reference phrases found in the text ("Section 4.2", "Annex B",
+    codes); their relevant chunks are every chunk containing the identifier. Content queries
+    are sentences taken from a chunk, with that chunk as the relevant one.
+    """
+    reference_re = re.compile(
+        r"\b(?:Section|Article|Annex|Appendix|Part|Clause|Schedule|Table|Rule|Chapter)\s+[A-Z0-9]+(?:[.\-][A-Z0-9]+)*\b"
+    )
+    identifier_queries: Dict[str, Set[int]] = {}
+    for i, chunk in enumerate(chunks):
+        for reference in reference_re.findall(chunk):
+            identifier_queries.setdefault(reference, set()).add(i)
+    queries = [(query, ids) for query, ids in identifier_queries.items()][:limit]
+
+    content_queries = []
+    for i, chunk in enumerate(chunks):
+        sentences = [sentence.strip() for sentence in re.split(r"(?<=[.!?])\s+", chunk) if 40 <= len(sentence.strip()) <= 200]
+        if sentences:
+            content_queries.append((sentences[len(sentences) // 2], {i}))
+    step = max(1, len(content_queries) // limit)
+    return queries + content_queries[::step][:limit]
+
+def benchmark_retrieval(
+    searcher: HybridSearcher,
+    queries: List[Tuple[str, Set[int]]],
+    k: int = 4,
+    modes: Sequence[str] = RETRIEVAL_MODES
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Measure retrieval latency and recall@k of each mode on identifier and content queries.
+
+    Latency includes embedding the query where the mode needs it.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Per mode and query kind, the number of queries, recall@k
+            (share of queries with a relevant chunk in the top k), and mean and p95 latency in ms
+    """
+    report: Dict[str, Dict[str, Any]] = {}
+    for mode in modes:
+        rows: Dict[str, Dict[str, List[float]]] = {}
+        for query, relevant in queries:
+            kind = "identifier" if is_identifier_query(query, searcher.identifier_max_words) else "content"
+            start = time.perf_counter()
+            results = searcher.search(query, k, mode)
+            elapsed = (time.perf_counter() - start) * 1000
+            row = rows.setdefault(kind, {"hits": [], "latency": []})
+            row["hits"].append(float(any(position in relevant for position, _ in results)))
+            row["latency"].append(elapsed)
+        report[mode] = {
+            kind: {
+                "queries": len(row["hits"]),
+                "recall": round(statistics.mean(row["hits"]), 3),
+                "mean_ms": round(statistics.mean(row["latency"]), 2),
+                "p95_ms": round(sorted(row["latency"])[int(0.95 * (len(row["latency"]) - 1))], 2)
+            }
+            for kind, row in rows.items()
+        }
+    return report
+
+if __name__ == "__main__":
+    import sys
+    from ..config.settings import embeddings
+    from ..document_processing.extractor import extract_text_from_pdf
+
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else "data/test.pdf"
+    chunks = extract_text_from_pdf(pdf_path, max_chars_per_chunk=1000)
+    searcher = HybridSearcher(chunks, embeddings.embed_documents(chunks), embeddings)
+    queries = synthetic_queries(chunks)
+    report = benchmark_retrieval(searcher, queries)
+    print(f"{len(chunks)} chunks, {searcher.lexical.vocabulary_size} terms, {len(queries)} queries")
+    print(f"{'mode':<8} {'queries':<11} {'n':>4} {'recall@4':>9} {'mean (ms)':>10} {'p95 (ms)':>9}")
+    for mode, kinds in report.items():
+        for kind, row in kinds.items():
+            print(f"{mode:<8} {kind:<11} {row['queries']:>4} {row['recall']:>9} {row['mean_ms']:>10} {row['p95_ms']:>9}")
@@ -0,0 +1,189 @@
+"""
+Spell correction for query preprocessing.
+This module implements symmetric-delete (SymSpell-style) spelling correction: the deletes of
+every dictionary word are indexed once, so finding the closest known words for a misspelling
+only needs the deletes of the input instead of every edit of it. Corrections are memoized,
+and a domain vocabulary harvested from ingested documents is treated as known words.
+"""
+
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set
+
+# Words in queries and documents; apostrophes are kept so contractions stay whole
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z']*")
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Damerau-Levenshtein (optimal string alignment) distance between two words.
+
+    Returns max_distance + 1 as soon as the distance is known to exceed max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+def harvest_vocabulary(texts: Iterable[str], min_count: int = 2) -> Counter:
+    """
+    Collect the words that occur at least min_count times in a set of texts.
+
+    Used to build a domain vocabulary (regulatory terms, names, jargon) from document chunks.
+    """
+    counts = Counter(word.lower() for text in texts for word in _WORD_RE.findall(text) if len(word) > 2)
+    return Counter({word: count for word, count in counts.items() if count >= min_count})
+
+class SpellCorrector:
+    """
+    Spelling corrector backed by a precomputed deletion index.
+
+    The index is built on first use rather than when the corrector is created, so importing
+    the settings (e.g. in a process that never corrects a query) does not pay for it.
+    """
+
+    def __init__(
+        self,
+        frequencies: Dict[str, int],
+        max_edit_distance: int = 2,
+        prefix_length: int = 7,
+        min_frequency: int = 1,
+        memo_size: int = 4096
+    ):
+        """
+        Args:
+            frequencies (Dict[str, int]): Dictionary words and their corpus frequencies
+            max_edit_distance (int): Largest edit distance considered for a correction
+            prefix_length (int): Only this many leading characters of a word are indexed
+            min_frequency (int): Words rarer than this are known but never suggested
+            memo_size (int): Number of corrected words remembered
+        """
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.min_frequency = min_frequency
+        self._frequencies: Dict[str, int] = {}
+        self._deletes: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self._pending: Optional[Dict[str, int]] = dict(frequencies)
+        self._memo = lru_cache(maxsize=memo_size)(self._lookup)
+
+    def _ensure_built(self) -> None:
+        """Index the deletes of every dictionary word, once; concurrent first callers wait for it."""
+        if self._pending is None:
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._add_words(self._pending)
+                self._pending = None
+
+    def _prefix_deletes(self, word: str) -> Set[str]:
+        """Return the word's prefix and every string reachable from it by up to max_edit_distance deletes."""
+        prefix = word[:self.prefix_length]
+        deletes = {prefix}
+        frontier = {prefix}
+        for _ in range(self.max_edit_distance):
+            frontier = {
+                candidate[:i] + candidate[i + 1:]
+                for candidate in frontier if len(candidate) > 1
+                for i in range(len(candidate))
+            } - deletes
+            deletes |= frontier
+        return deletes
+
+    def _add_words(self, frequencies: Dict[str, int]) -> None:
+        """Add words to the dictionary and index the ones frequent enough to be suggested."""
+        for word, count in frequencies.items():
+            word = word.lower()
+            if word in self._frequencies:
+                self._frequencies[word] = max(self._frequencies[word], count)
+                continue
+            self._frequencies[word] = count
+            if count < self.min_frequency:
+                continue
+            for delete in self._prefix_deletes(word):
+                self._deletes.setdefault(delete, []).append(word)
+
+    def add_vocabulary(self, words: Dict[str, int]) -> None:
+        """Treat domain words (e.g. harvested from document chunks) as correctly spelled."""
+        self._ensure_built()
+        with self._lock:
+            new_words = {word: count for word, count in words.items() if word.lower() not in self._frequencies}
+            if not new_words:
+                return
+            # Domain terms are always suggestible, however rare they are in the document
+            self._add_words({word: max(count, self.min_frequency) for word, count in new_words.items()})
+        self._memo.cache_clear()
+
+    def known(self, word: str) -> bool:
+        """Return True if the word is in the dictionary or the domain vocabulary."""
+        self._ensure_built()
+        return word.lower() in self._frequencies
+
+    def unknown(self, words: Iterable[str]) -> Set[str]:
+        """Return the words that are neither dictionary nor domain words."""
+        return {word for word in words if not self.known(word)}
+
+    def _lookup(self, word: str) -> str:
+        """Return the closest, most frequent known word within max_edit_distance, or the word itself."""
+        if word in self._frequencies:
+            return word
+        best, best_distance, best_count = word, self.max_edit_distance + 1, 0
+        input_prefix = word[:self.prefix_length]
+        candidates = [input_prefix]
+        seen = {input_prefix}
+        # Candidates are visited by increasing number of deletes
+        for candidate in candidates:
+            candidate_distance = len(input_prefix) - len(candidate)
+            if candidate_distance > best_distance:
+                break
+            for suggestion in self._deletes.get(candidate, ()):
+                distance = edit_distance(word, suggestion, min(best_distance, self.max_edit_distance))
+                count = self._frequencies[suggestion]
+                if distance < best_distance or (distance == best_distance and count > best_count):
+                    best, best_distance, best_count = suggestion, distance, count
+            if candidate_distance < self.max_edit_distance and len(candidate) > 1:
+                for i in range(len(candidate)):
+                    delete = candidate[:i] + candidate[i + 1:]
+                    if delete not in seen:
+                        seen.add(delete)
+                        candidates.append(delete)
+        return best if best_distance <= self.max_edit_distance else word
+
+    def correct_word(self, word: str) -> str:
+        """Correct one word, keeping its capitalization; acronyms and mixed-case names are left alone."""
+        if any(char.isupper() for char in word[1:]):
+            return word
+        self._ensure_built()
+        corrected = self._memo(word.lower())
+        if corrected == word.lower():
+            return word
+        if word[0].isupper():
+            corrected = corrected[:1].upper() + corrected[1:]
+        return corrected
+
+    def correct(self, text: str) -> str:
+        """Correct every word of a text, leaving punctuation and spacing untouched."""
+        return _WORD_RE.sub(lambda match: self.correct_word(match.group()), text)
+
+    def stats(self) -> Dict[str, int]:
+        """Return dictionary and index sizes and memo hit/miss counters."""
+        memo = self._memo.cache_info()
+        return {
+            "words": len(self._frequencies),
+            "indexed_deletes": len(self._deletes),
+            "memo_hits": memo.hits,
+            "memo_misses": memo.misses,
+            "memo_size": memo.currsize
+        }
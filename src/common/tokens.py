@@ -0,0 +1,43 @@
+"""
+Token accounting helpers.
+These helpers estimate prompt sizes without loading a model-specific tokenizer.
+"""
+
+from typing import List
+
+# Average characters per token for English text with llama-style tokenizers
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a piece of text."""
+    if not text:
+        return 0
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+def batch_by_token_budget(texts: List[str], budget: int) -> List[List[str]]:
+    """
+    Group consecutive texts into batches whose estimated size fits the token budget.
+
+    A text larger than the budget on its own still gets a batch of its own.
+
+    Args:
+        texts (List[str]): Texts to group, in order
+        budget (int): Maximum estimated tokens per batch
+
+    Returns:
+        List[List[str]]: Batches of texts, preserving order
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if current and current_tokens + tokens > budget:
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
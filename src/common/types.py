@@ -11,6 +11,7 @@ class DocumentState(TypedDict):
     chunks: List[str]
     summaries: List[str]
     final_summary: Optional[str]
+    reduce_stats: Optional[Dict[str, Any]]
     error: Optional[str]
 
 class FAQState(TypedDict):
@@ -27,6 +28,8 @@ class QueryState(TypedDict):
     hypotheses: Optional[List[str]]
     improved_query: Optional[str]
     error: Optional[str]
+    stage_timings: Optional[Dict[str, float]]
+    llm_calls: Optional[int]
 
 class ChatState(TypedDict):
     """State for chat processing"""
@@ -37,4 +40,12 @@ class ChatState(TypedDict):
     error: Optional[str]
     context: Optional[str]
     summary: Optional[str]
-    faqs: Optional[List[Dict[str, str]]] 
\ No newline at end of file
+    faqs: Optional[List[Dict[str, str]]]
+    vectorstore: Optional[Any]
+    embedding_calls: Optional[Dict[str, int]]
+    faq_index: Optional[Any]
+    faq_match: Optional[Dict[str, Any]]
+    memory: Optional[Any]
+    context_tokens: Optional[Dict[str, int]]
+    searcher: Optional[Any]
+    retrieval_mode: Optional[str] 
\ No newline at end of file
@@ -3,29 +3,111 @@ Configuration settings and model initialization for the application.
 This module contains all the global settings, model configurations, and prompt templates.
 """
 
+import os
 from dotenv import load_dotenv
 from langchain_ollama import OllamaLLM
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.prompts import PromptTemplate
 from spellchecker import SpellChecker
+from ..common.embeddings import CountingEmbeddings, CachedEmbeddings, BatchingEmbeddings
+from ..common.spelling import SpellCorrector
 
 # Load environment variables
 load_dotenv()
 
+# Model names
+LLM_MODEL_NAME = "llama3"
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Concurrency for per-chunk LLM calls (summaries, FAQs); 1 runs them serially
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+# Token budget for one combine step when reducing chunk summaries (llama3 has an 8k context)
+SUMMARY_REDUCE_TOKEN_BUDGET = int(os.getenv("SUMMARY_REDUCE_TOKEN_BUDGET", "3000"))
+
+# FAQs whose questions overlap at least this much (word Jaccard) are treated as duplicates
+FAQ_DEDUP_THRESHOLD = float(os.getenv("FAQ_DEDUP_THRESHOLD", "0.8"))
+
+# Chat queries whose embedding is at least this similar (cosine) to an FAQ question get the FAQ's answer
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.9"))
+
+# Query processing mode: "staged" (four LLM calls), "fast" (one structured call) or "adaptive"
+# (no LLM call for short, well-formed queries, one structured call otherwise)
+QUERY_PROCESSING_MODE = os.getenv("QUERY_PROCESSING_MODE", "staged")
+QUERY_ADAPTIVE_MAX_WORDS = int(os.getenv("QUERY_ADAPTIVE_MAX_WORDS", "12"))
+
+# Chat memory mode: "buffer" (replay the whole conversation) or "summary" (a rolling summary of
+# older turns plus the most recent CHAT_MEMORY_WINDOW_TOKENS verbatim, within CHAT_MEMORY_MAX_TOKENS)
+CHAT_MEMORY_MODE = os.getenv("CHAT_MEMORY_MODE", "buffer")
+CHAT_MEMORY_MAX_TOKENS = int(os.getenv("CHAT_MEMORY_MAX_TOKENS", "1000"))
+CHAT_MEMORY_WINDOW_TOKENS = int(os.getenv("CHAT_MEMORY_WINDOW_TOKENS", "500"))
+
+# Chat prompt context: the summary, FAQs and retrieved chunks most relevant to the query are packed
+# into CONTEXT_TOKEN_BUDGET estimated tokens; CONTEXT_CANDIDATE_CHUNKS chunks are retrieved as candidates
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_CANDIDATE_CHUNKS = int(os.getenv("CONTEXT_CANDIDATE_CHUNKS", "8"))
+
+# Chunk retrieval: "dense" (embeddings only), "lexical" (BM25 only) or "hybrid" (both scores fused,
+# with HYBRID_ALPHA the weight of the dense score). In hybrid mode, queries of at most
+# IDENTIFIER_QUERY_MAX_WORDS words that look up an identifier ("Section 4.2.1") only use BM25.
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+HYBRID_ALPHA = float(os.getenv("HYBRID_ALPHA", "0.5"))
+IDENTIFIER_QUERY_MAX_WORDS = int(os.getenv("IDENTIFIER_QUERY_MAX_WORDS", "8"))
+
+# Corpus index (chunks of every indexed document): CORPUS_INDEX_KIND "flat" (exact), "hnsw", "ivf" or
+# "auto", which picks exact search up to CORPUS_FLAT_MAX_VECTORS vectors, HNSW up to
+# CORPUS_HNSW_MAX_VECTORS and IVF beyond. Recall/speed knobs: CORPUS_HNSW_M (graph degree) and
+# CORPUS_HNSW_EF_CONSTRUCTION at build time, CORPUS_HNSW_EF_SEARCH and CORPUS_IVF_NPROBE (lists
+# scanned) per query; CORPUS_IVF_NLIST lists (0 = about 4 * sqrt(vectors))
+CORPUS_INDEX_KIND = os.getenv("CORPUS_INDEX_KIND", "auto")
+CORPUS_FLAT_MAX_VECTORS = int(os.getenv("CORPUS_FLAT_MAX_VECTORS", "50000"))
+CORPUS_HNSW_MAX_VECTORS = int(os.getenv("CORPUS_HNSW_MAX_VECTORS", "2000000"))
+CORPUS_HNSW_M = int(os.getenv("CORPUS_HNSW_M", "32"))
+CORPUS_HNSW_EF_CONSTRUCTION = int(os.getenv("CORPUS_HNSW_EF_CONSTRUCTION", "80"))
+CORPUS_HNSW_EF_SEARCH = int(os.getenv("CORPUS_HNSW_EF_SEARCH", "64"))
+CORPUS_IVF_NLIST = int(os.getenv("CORPUS_IVF_NLIST", "0"))
+CORPUS_IVF_NPROBE = int(os.getenv("CORPUS_IVF_NPROBE", "16"))
+
+# Versions that key the document artifact cache; bump one when the output of its step changes
+CHUNKER_VERSION = "fitz-pages-4000-v1"
+PROMPT_VERSION = "v1"
+
 # Initialize LLM with optimized parameters
 llm = OllamaLLM(
-    model="llama3",
+    model=LLM_MODEL_NAME,
     temperature=0.1,
     max_tokens=1024,
     stop=["Observation:", "\nObservation"]
 )
 
-# Initialize embeddings
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+# Embedding service: the model is loaded once and requests from concurrent sessions share batches
+EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "64"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))
+embedding_service = BatchingEmbeddings(
+    HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME),
+    max_batch_size=EMBED_MAX_BATCH_SIZE,
+    max_wait_ms=EMBED_MAX_WAIT_MS
+)
+
+# Initialize embeddings (cached on disk by text, and wrapped so callers can see how often they are used)
+embeddings = CountingEmbeddings(CachedEmbeddings(embedding_service, EMBEDDING_MODEL_NAME))
 
 # Initialize spell checker
 spell = SpellChecker()
 
+# Query spell correction: a deletion index over the spell checker's dictionary, built on the
+# first correction. Words rarer than SPELL_MIN_FREQUENCY are accepted but never suggested.
+SPELL_MAX_EDIT_DISTANCE = int(os.getenv("SPELL_MAX_EDIT_DISTANCE", "2"))
+SPELL_MIN_FREQUENCY = int(os.getenv("SPELL_MIN_FREQUENCY", "100"))
+SPELL_MEMO_SIZE = int(os.getenv("SPELL_MEMO_SIZE", "4096"))
+spell_corrector = SpellCorrector(
+    spell.word_frequency.dictionary,
+    max_edit_distance=SPELL_MAX_EDIT_DISTANCE,
+    min_frequency=SPELL_MIN_FREQUENCY,
+    memo_size=SPELL_MEMO_SIZE
+)
+
 # Prompt templates for different processing steps
 spell_check_prompt = PromptTemplate(
     input_variables=["query"],
@@ -62,6 +144,20 @@ Hypotheses: {hypotheses}
 Provide an improved version of the query that is more precise and comprehensive."""
 )
 
+query_analysis_prompt = PromptTemplate(
+    input_variables=["query"],
+    template="""Analyze the following query in a single pass:
+Query: {query}
+
+1. Correct its spelling and grammar.
+2. Decompose the corrected query into simpler sub-queries that together cover the original question.
+3. List the main hypotheses that need to be tested or verified.
+4. Write an improved version of the query that is more precise and comprehensive.
+
+Respond with only a JSON object of this form:
+{{"corrected_query": "...", "sub_queries": ["..."], "hypotheses": ["..."], "improved_query": "..."}}"""
+)
+
 # Document processing prompts
 document_summary_prompt = PromptTemplate(
     input_variables=["text"],
@@ -113,6 +209,22 @@ Instructions:
 Provide a clear, accurate answer based on the regulatory context. If you find multiple relevant pieces of information, combine them into a comprehensive response."""
 )
 
+# Extends the rolling summary of a long conversation (CHAT_MEMORY_MODE="summary")
+history_summary_prompt = PromptTemplate(
+    input_variables=["summary", "new_lines"],
+    template="""Progressively summarize a conversation about a regulatory document, extending the current summary with the new lines.
+
+Keep every question asked, the facts, figures and references given in the answers, and anything the user said they need. Use at most 150 words.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{new_lines}
+
+New summary:"""
+)
+
 # Example questions for testing
 EXAMPLE_QUESTIONS = [
     "What are the key requirements for compliance with this regulation?",
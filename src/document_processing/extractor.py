@@ -3,38 +3,99 @@ PDF text extraction module.
 This module handles the extraction and chunking of text from PDF documents.
 """
 
+import os
 import fitz  # PyMuPDF
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
 
-def extract_text_from_pdf(pdf_path: str, max_chars_per_chunk: int = 4000) -> List[str]:
+# Number of worker processes for page extraction (defaults to the CPU count)
+PDF_EXTRACT_PROCESSES = int(os.getenv("PDF_EXTRACT_PROCESSES", str(os.cpu_count() or 1)))
+
+# Documents with fewer pages are extracted in-process; spawning workers costs more than it saves
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+
+def _extract_page_range(args: Tuple[str, int, int]) -> List[str]:
+    """Extract the text of pages [start, end) of a PDF; runs inside a worker process."""
+    pdf_path, start, end = args
+    with fitz.open(pdf_path) as doc:
+        return [doc[i].get_text() for i in range(start, end)]
+
+def extract_pages(pdf_path: str, processes: Optional[int] = None) -> List[str]:
     """
-    Extract text from a PDF file and split it into manageable chunks.
-    
+    Extract the text of every page of a PDF, in page order.
+
+    Large documents are split into contiguous page ranges that are extracted in a process
+    pool and merged back in order.
+
     Args:
         pdf_path (str): Path to the PDF file
+        processes (Optional[int]): Number of worker processes; 1 extracts in-process
+
+    Returns:
+        List[str]: Text of each page
+    """
+    processes = PDF_EXTRACT_PROCESSES if processes is None else processes
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+        print(f"Number of pages in PDF: {page_count}")
+        if processes <= 1 or page_count < PDF_PARALLEL_MIN_PAGES:
+            return [page.get_text() for page in doc]
+
+    # A few ranges per worker keeps the pool busy when some pages are much heavier than others
+    range_count = min(page_count, processes * 4)
+    step = -(-page_count // range_count)
+    ranges = [(pdf_path, start, min(start + step, page_count)) for start in range(0, page_count, step)]
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pages = []
+        for range_pages in pool.map(_extract_page_range, ranges):
+            pages.extend(range_pages)
+    return pages
+
+def chunk_pages(pages: List[str], max_chars_per_chunk: int = 4000) -> List[str]:
+    """
+    Merge consecutive pages into chunks of at most max_chars_per_chunk characters.
+
+    A page longer than the limit becomes a chunk of its own.
+
+    Args:
+        pages (List[str]): Text of each page, in order
         max_chars_per_chunk (int): Maximum number of characters per chunk
-        
+
     Returns:
-        List[str]: List of text chunks extracted from the PDF
+        List[str]: List of text chunks
     """
-    doc = fitz.open(pdf_path)
-    print(f"Number of pages in PDF: {doc.page_count}")
     chunks = []
-    current_chunk = ""
-    
-    for page in doc:
-        print(f"Extracting text from page {page.number + 1}...")
-        page_text = page.get_text()
-        
-        if len(current_chunk) + len(page_text) > max_chars_per_chunk:
-            if current_chunk:
-                chunks.append(current_chunk)
-            current_chunk = page_text
+    current_parts = []
+    current_length = 0
+
+    for page_text in pages:
+        if current_length + len(page_text) > max_chars_per_chunk:
+            if current_parts:
+                chunks.append("".join(current_parts))
+            current_parts = [page_text]
+            current_length = len(page_text)
         else:
-            current_chunk += page_text
-    
-    if current_chunk:
-        chunks.append(current_chunk)
-        
+            current_parts.append(page_text)
+            current_length += len(page_text)
+
+    if current_parts:
+        chunks.append("".join(current_parts))
+
+    return chunks
+
+def extract_text_from_pdf(pdf_path: str, max_chars_per_chunk: int = 4000, processes: Optional[int] = None) -> List[str]:
+    """
+    Extract text from a PDF file and split it into manageable chunks.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        max_chars_per_chunk (int): Maximum number of characters per chunk
+        processes (Optional[int]): Number of worker processes used for page extraction
+
+    Returns:
+        List[str]: List of text chunks extracted from the PDF
+    """
+    chunks = chunk_pages(extract_pages(pdf_path, processes), max_chars_per_chunk)
     print(f"Split PDF into {len(chunks)} chunks")
-    return chunks 
\ No newline at end of file
+    return chunks
@@ -3,16 +3,76 @@ Document processing workflow module.
 This module handles the document processing pipeline including text extraction, chunking, and summarization.
 """
 
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List, Tuple
 from langgraph.graph import StateGraph, END
 from ..common.types import DocumentState
-from ..config.settings import llm, document_summary_prompt
+from ..common.concurrency import map_concurrently
+from ..common.tokens import batch_by_token_budget
+from ..config.settings import (
+    llm,
+    document_summary_prompt,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    SUMMARY_REDUCE_TOKEN_BUDGET
+)
 from .extractor import extract_text_from_pdf
 
-def build_document_graph() -> StateGraph:
+def reduce_summaries(
+    summaries: List[str],
+    token_budget: int = SUMMARY_REDUCE_TOKEN_BUDGET,
+    max_concurrency: int = LLM_MAX_CONCURRENCY
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Combine summaries with a multi-level tree reduce.
+    
+    Each level groups the current summaries into batches that fit the token budget and
+    combines every batch with one LLM call, running the batches of a level in parallel.
+    Levels repeat until a single summary remains.
+    
+    Args:
+        summaries (List[str]): Per-chunk summaries, in document order
+        token_budget (int): Maximum estimated tokens of summaries per combine call
+        max_concurrency (int): Number of combine calls run in parallel per level
+        
+    Returns:
+        Tuple[str, Dict[str, Any]]: The final summary and reduce statistics (depth and per-level timings)
+    """
+    def combine(batch: List[str]) -> str:
+        if len(batch) == 1:
+            return batch[0]
+        combined_summaries = "\n\n".join(batch)
+        return llm.invoke(f"Combine these summaries into a coherent overall summary:\n\n{combined_summaries}")
+    
+    levels = []
+    current = summaries
+    while len(current) > 1:
+        batches = batch_by_token_budget(current, token_budget)
+        if len(batches) == len(current):
+            # Every summary fills the budget alone; pair them up so each level still shrinks
+            batches = [current[i:i + 2] for i in range(0, len(current), 2)]
+        
+        start = time.perf_counter()
+        current = map_concurrently(combine, batches, max_workers=max_concurrency, retries=LLM_MAX_RETRIES)
+        elapsed = time.perf_counter() - start
+        
+        levels.append({
+            "level": len(levels) + 1,
+            "inputs": sum(len(batch) for batch in batches),
+            "calls": len(batches),
+            "seconds": round(elapsed, 3)
+        })
+        print(f"Reduce level {len(levels)}: {levels[-1]['inputs']} summaries -> {len(current)} in {elapsed:.1f}s")
+    
+    return current[0], {"depth": len(levels), "levels": levels}
+
+def build_document_graph(max_concurrency: int = LLM_MAX_CONCURRENCY) -> StateGraph:
     """
     Build the document processing workflow graph.
     
+    Args:
+        max_concurrency (int): Number of chunk summaries generated in parallel; 1 runs them serially
+        
     Returns:
         StateGraph: The configured document processing workflow
     """
@@ -30,11 +90,14 @@ def build_document_graph() -> StateGraph:
     def summarize_chunks(state: DocumentState) -> Dict[str, Any]:
         """Generate summaries for each chunk of text."""
         try:
-            summaries = []
-            for i, chunk in enumerate(state["chunks"]):
-                print(f"Summarizing chunk {i+1}/{len(state['chunks'])}...")
-                summary = llm.invoke(document_summary_prompt.format(text=chunk))
-                summaries.append(summary)
+            total = len(state["chunks"])
+            summaries = map_concurrently(
+                lambda chunk: llm.invoke(document_summary_prompt.format(text=chunk)),
+                state["chunks"],
+                max_workers=max_concurrency,
+                retries=LLM_MAX_RETRIES,
+                on_result=lambda i, _: print(f"Summarized chunk {i+1}/{total}")
+            )
             return {"summaries": summaries}
         except Exception as e:
             return {"error": str(e)}
@@ -42,13 +105,8 @@ def build_document_graph() -> StateGraph:
     def combine_summaries(state: DocumentState) -> Dict[str, Any]:
         """Combine individual chunk summaries into a final summary."""
         try:
-            if len(state["summaries"]) == 1:
-                final_summary = state["summaries"][0]
-            else:
-                combined_summaries = "\n\n".join(state["summaries"])
-                final_prompt = f"Combine these summaries into a coherent overall summary:\n\n{combined_summaries}"
-                final_summary = llm.invoke(final_prompt)
-            return {"final_summary": final_summary}
+            final_summary, reduce_stats = reduce_summaries(state["summaries"], max_concurrency=max_concurrency)
+            return {"final_summary": final_summary, "reduce_stats": reduce_stats}
         except Exception as e:
             return {"error": str(e)}
     
@@ -81,5 +139,19 @@ def build_document_graph() -> StateGraph:
             }
         )
     
-    workflow.set_entry_point("extract_text")
+    def entry_router(state: DocumentState) -> str:
+        """Start from the first step whose output the state does not already carry."""
+        if not state.get("chunks"):
+            return "extract_text"
+        return router(state)
+    
+    workflow.set_conditional_entry_point(
+        entry_router,
+        {
+            "extract_text": "extract_text",
+            "summarize_chunks": "summarize_chunks",
+            "combine_summaries": "combine_summaries",
+            "end": END
+        }
+    )
     return workflow.compile() 
\ No newline at end of file
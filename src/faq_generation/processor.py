@@ -3,15 +3,101 @@ FAQ generation workflow module.
 This module handles the generation of FAQs from document chunks.
 """
 
-from typing import Dict, Any, List
+import re
+from typing import Dict, Any, List, Set
 from langgraph.graph import StateGraph, END
+from ..common.concurrency import map_concurrently
 from ..common.types import FAQState
-from ..config.settings import llm, faq_generation_prompt
+from ..config.settings import (
+    llm,
+    faq_generation_prompt,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    FAQ_DEDUP_THRESHOLD
+)
 
-def build_faq_graph() -> StateGraph:
+def parse_faqs(faq_result: str) -> List[Dict[str, str]]:
+    """Parse Q:/A: formatted LLM output into question/answer pairs."""
+    faqs = []
+    current_question = None
+    current_answer = []
+    
+    for line in faq_result.split('\n'):
+        if line.startswith('Q:'):
+            if current_question and current_answer:
+                faqs.append({
+                    "question": current_question,
+                    "answer": "\n".join(current_answer)
+                })
+            current_question = line[2:].strip()
+            current_answer = []
+        elif line.startswith('A:'):
+            current_answer.append(line[2:].strip())
+        elif current_answer is not None:
+            current_answer.append(line.strip())
+    
+    if current_question and current_answer:
+        faqs.append({
+            "question": current_question,
+            "answer": "\n".join(current_answer)
+        })
+    
+    return faqs
+
+def generate_chunk_faqs(chunk: str) -> List[Dict[str, str]]:
+    """Generate FAQs for a single document chunk."""
+    section_title = chunk.split('\n')[0][:100] if chunk else "Section"
+    faq_result = llm.invoke(faq_generation_prompt.format(
+        text=chunk,
+        section_title=section_title
+    ))
+    return parse_faqs(faq_result)
+
+def _question_terms(question: str) -> Set[str]:
+    """Normalize a question into its set of lowercase word terms."""
+    return set(re.findall(r"[a-z0-9]+", question.lower()))
+
+def deduplicate_faqs(faqs: List[Dict[str, str]], threshold: float = FAQ_DEDUP_THRESHOLD) -> List[Dict[str, str]]:
+    """
+    Drop FAQs whose question is a near-duplicate of an earlier one.
+    
+    Questions are compared by the Jaccard similarity of their word sets; the first
+    occurrence (from the earliest chunk) is kept.
+    
+    Args:
+        faqs (List[Dict[str, str]]): FAQs in document order
+        threshold (float): Similarity at or above which two questions count as duplicates
+        
+    Returns:
+        List[Dict[str, str]]: FAQs with near-duplicates removed
+    """
+    kept = []
+    kept_terms = []
+    for faq in faqs:
+        terms = _question_terms(faq["question"])
+        duplicate = False
+        for other in kept_terms:
+            if terms == other:
+                duplicate = True
+                break
+            # Jaccard can only reach the threshold if the set sizes are close enough
+            if min(len(terms), len(other)) < threshold * max(len(terms), len(other)):
+                continue
+            if len(terms & other) / len(terms | other) >= threshold:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(faq)
+            kept_terms.append(terms)
+    return kept
+
+def build_faq_graph(max_concurrency: int = LLM_MAX_CONCURRENCY) -> StateGraph:
     """
     Build the FAQ generation workflow graph.
     
+    Args:
+        max_concurrency (int): Number of chunks whose FAQs are generated in parallel; 1 runs them serially
+        
     Returns:
         StateGraph: The configured FAQ generation workflow
     """
@@ -22,43 +108,21 @@ def build_faq_graph() -> StateGraph:
         try:
             if not state.get("chunks"):
                 return {"error": "No document chunks available"}
-                
-            faqs = []
-            for i, chunk in enumerate(state["chunks"]):
-                print(f"Generating FAQs for chunk {i+1}/{len(state['chunks'])}...")
-                section_title = chunk.split('\n')[0][:100] if chunk else "Section"
-                faq_result = llm.invoke(faq_generation_prompt.format(
-                    text=chunk,
-                    section_title=section_title
-                ))
-                
-                current_faqs = []
-                current_question = None
-                current_answer = []
-                
-                for line in faq_result.split('\n'):
-                    if line.startswith('Q:'):
-                        if current_question and current_answer:
-                            current_faqs.append({
-                                "question": current_question,
-                                "answer": "\n".join(current_answer)
-                            })
-                        current_question = line[2:].strip()
-                        current_answer = []
-                    elif line.startswith('A:'):
-                        current_answer.append(line[2:].strip())
-                    elif current_answer is not None:
-                        current_answer.append(line.strip())
-                
-                if current_question and current_answer:
-                    current_faqs.append({
-                        "question": current_question,
-                        "answer": "\n".join(current_answer)
-                    })
-                
-                faqs.extend(current_faqs)
             
-            return {"faqs": faqs}
+            total = len(state["chunks"])
+            chunk_faqs = map_concurrently(
+                generate_chunk_faqs,
+                state["chunks"],
+                max_workers=max_concurrency,
+                retries=LLM_MAX_RETRIES,
+                on_result=lambda i, _: print(f"Generated FAQs for chunk {i+1}/{total}")
+            )
+            
+            faqs = [faq for current_faqs in chunk_faqs for faq in current_faqs]
+            unique_faqs = deduplicate_faqs(faqs)
+            print(f"Kept {len(unique_faqs)} of {len(faqs)} FAQs after removing near-duplicates")
+            
+            return {"faqs": unique_faqs}
         except Exception as e:
             return {"error": str(e)}
     
@@ -19,8 +19,19 @@ from spellchecker import SpellChecker
 import re
 from .document_processing.processor import build_document_graph
 from .faq_generation.processor import build_faq_graph
-from .chat.processor import build_chat_graph
-from .config.settings import EXAMPLE_QUESTIONS
+from .chat.processor import build_chat_graph, build_chunk_index, build_chunk_searcher
+from .common.cache import artifact_cache, hash_file
+from .common.faq_index import FAQIndex, faq_fast_path_stats
+from .common.spelling import harvest_vocabulary
+from .config.settings import (
+    EXAMPLE_QUESTIONS,
+    CHUNKER_VERSION,
+    PROMPT_VERSION,
+    LLM_MODEL_NAME,
+    EMBEDDING_MODEL_NAME,
+    embeddings as counted_embeddings,
+    spell_corrector
+)
 
 # Load environment variables from .env file
 load_dotenv()
@@ -314,23 +325,46 @@ def process_pdf(pdf_path: str, query: Optional[str] = None, previous_state: Opti
             "error": None
         }
         
+        # Content hash of the PDF; keys the on-disk artifact cache
+        doc_hash = (previous_state or {}).get("document_hash") or hash_file(pdf_path)
+        summary_version = (CHUNKER_VERSION, LLM_MODEL_NAME, PROMPT_VERSION)
+        
         # If we have previous state, reuse the document processing results
         if previous_state and previous_state.get("chunks"):
             doc_state["chunks"] = previous_state["chunks"]
             doc_state["summaries"] = previous_state.get("summaries", [])
             doc_state["final_summary"] = previous_state.get("final_summary")
         else:
-            # Process document only if we don't have previous state
-            doc_graph = build_document_graph()
-            doc_result = doc_graph.invoke(doc_state)
-            
-            if doc_result.get("error"):
-                return {"error": doc_result["error"]}
+            # Start from whatever an earlier run of this document left in the cache
+            doc_state["chunks"] = artifact_cache.get(doc_hash, "chunks", CHUNKER_VERSION) or []
+            cached_summaries = artifact_cache.get(doc_hash, "summaries", *summary_version)
+            if doc_state["chunks"] and cached_summaries:
+                doc_state["summaries"] = cached_summaries["summaries"]
+                doc_state["final_summary"] = cached_summaries["final_summary"]
+            else:
+                # Process document only if we don't have previous state
+                doc_graph = build_document_graph()
+                doc_result = doc_graph.invoke(doc_state)
+                
+                if doc_result.get("error"):
+                    return {"error": doc_result["error"]}
+                
+                doc_state = doc_result
+                artifact_cache.put(doc_hash, "chunks", doc_state["chunks"], CHUNKER_VERSION)
+                artifact_cache.put(doc_hash, "summaries", {
+                    "summaries": doc_state["summaries"],
+                    "final_summary": doc_state["final_summary"]
+                }, *summary_version)
             
-            doc_state = doc_result
+            # Teach the query spell corrector the document's terminology so it is not "corrected"
+            spell_corrector.add_vocabulary(harvest_vocabulary(doc_state["chunks"]))
         
-        # Generate FAQs only if we don't have them from previous state
-        if not (previous_state and previous_state.get("faqs")):
+        # Generate FAQs only if we don't have them from previous state or the cache
+        if previous_state and previous_state.get("faqs"):
+            faqs = previous_state["faqs"]
+        else:
+            faqs = artifact_cache.get(doc_hash, "faqs", *summary_version)
+        if not faqs:
             faq_state = {
                 "chunks": doc_state["chunks"],
                 "faqs": None,
@@ -343,8 +377,7 @@ def process_pdf(pdf_path: str, query: Optional[str] = None, previous_state: Opti
                 return {"error": faq_result["error"]}
             
             faqs = faq_result["faqs"]
-        else:
-            faqs = previous_state["faqs"]
+            artifact_cache.put(doc_hash, "faqs", faqs, *summary_version)
         
         # If there's a query, process it
         if query:
@@ -356,9 +389,39 @@ def process_pdf(pdf_path: str, query: Optional[str] = None, previous_state: Opti
                 "current_chat_response": None,
                 "error": None,
                 "summary": doc_state["final_summary"],
-                "faqs": faqs
+                "faqs": faqs,
+                # Reuse the index from earlier turns so chunks are embedded once per document
+                "vectorstore": previous_state.get("vectorstore") if previous_state else None,
+                "embedding_calls": None,
+                "faq_index": previous_state.get("faq_index") if previous_state else None,
+                "faq_match": None,
+                # Token-budgeted conversation memory carried across turns (CHAT_MEMORY_MODE="summary")
+                "memory": previous_state.get("memory") if previous_state else None,
+                "context_tokens": None,
+                # BM25 + vector search over the chunks, built with the vector index
+                "searcher": previous_state.get("searcher") if previous_state else None,
+                "retrieval_mode": None
             }
             
+            # Index the FAQ questions once per document so matching queries skip the LLM
+            if not chat_state["faq_index"]:
+                faq_vectors = artifact_cache.get_or_compute_vectors(
+                    doc_hash, "faq_embeddings",
+                    lambda: counted_embeddings.embed_documents([faq["question"] for faq in faqs]),
+                    *summary_version, EMBEDDING_MODEL_NAME
+                )
+                chat_state["faq_index"] = FAQIndex(faqs, counted_embeddings, faq_vectors)
+            
+            # On the first turn, build the index from cached chunk vectors where possible
+            if not chat_state["vectorstore"]:
+                vectors = artifact_cache.get_or_compute_vectors(
+                    doc_hash, "embeddings",
+                    lambda: counted_embeddings.embed_documents(doc_state["chunks"]),
+                    CHUNKER_VERSION, EMBEDDING_MODEL_NAME
+                )
+                chat_state["vectorstore"] = build_chunk_index(doc_state["chunks"], vectors)
+                chat_state["searcher"] = build_chunk_searcher(doc_state["chunks"], vectors)
+            
             chat_graph = build_chat_graph()
             chat_result = chat_graph.invoke(chat_state)
             
@@ -371,7 +434,16 @@ def process_pdf(pdf_path: str, query: Optional[str] = None, previous_state: Opti
                 "chat_history": chat_result["chat_history"],
                 "current_chat_response": chat_result["current_chat_response"],
                 "chunks": doc_state["chunks"],
-                "summaries": doc_state["summaries"]
+                "summaries": doc_state["summaries"],
+                "vectorstore": chat_result["vectorstore"],
+                "embedding_calls": chat_result["embedding_calls"],
+                "faq_index": chat_result["faq_index"],
+                "faq_match": chat_result.get("faq_match") or None,
+                "memory": chat_result.get("memory"),
+                "context_tokens": chat_result.get("context_tokens"),
+                "searcher": chat_result.get("searcher"),
+                "retrieval_mode": chat_result.get("retrieval_mode"),
+                "document_hash": doc_hash
             }
         
         # If no query, just return document processing results
@@ -379,7 +451,9 @@ def process_pdf(pdf_path: str, query: Optional[str] = None, previous_state: Opti
             "summary": doc_state["final_summary"],
             "faqs": faqs,
             "chunks": doc_state["chunks"],
-            "summaries": doc_state["summaries"]
+            "summaries": doc_state["summaries"],
+            "reduce_stats": doc_state.get("reduce_stats"),
+            "document_hash": doc_hash
         }
         
     except Exception as e:
@@ -405,6 +479,11 @@ def main():
         print("\nSummary:")
         print(result["summary"])
     
+    if result.get("reduce_stats"):
+        print(f"\nSummary reduce depth: {result['reduce_stats']['depth']}")
+        for level in result["reduce_stats"]["levels"]:
+            print(f"  Level {level['level']}: {level['inputs']} summaries in {level['calls']} calls, {level['seconds']}s")
+    
     if result.get("faqs"):
         print("\nGenerated FAQs:")
         for faq in result["faqs"]:
@@ -425,11 +504,19 @@ def main():
             
         if chat_result.get("current_chat_response"):
             print(f"Answer: {chat_result['current_chat_response']}")
+            if chat_result.get("faq_match"):
+                print(f"Answered from FAQ (score {chat_result['faq_match']['score']}): {chat_result['faq_match']['question']}")
+            if chat_result.get("context_tokens"):
+                print(f"Context tokens by section: {chat_result['context_tokens']}")
+                print(f"Retrieval mode: {chat_result['retrieval_mode']}")
+            print(f"Embedding calls this turn: {chat_result['embedding_calls']}")
         else:
             print("Failed to generate response")
             
         # Update result with new chat history for next question
         result = chat_result  # Update the entire state for the next iteration
+    
+    print(f"\nFAQ fast path: {faq_fast_path_stats.stats()}")
 
 if __name__ == "__main__":
     main()
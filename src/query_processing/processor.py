@@ -3,10 +3,30 @@ Query processing workflow module.
 This module handles the processing of user queries including spell checking, decomposition, and improvement.
 """
 
-from typing import Dict, Any
+import json
+import re
+import statistics
+import time
+from typing import Dict, Any, Callable, List, Optional
 from langgraph.graph import StateGraph, END
 from ..common.types import QueryState
-from ..config.settings import llm, spell, spell_check_prompt, decomposition_prompt, hypothesis_prompt, improvement_prompt
+from ..config.settings import (
+    llm,
+    spell_corrector,
+    spell_check_prompt,
+    decomposition_prompt,
+    hypothesis_prompt,
+    improvement_prompt,
+    query_analysis_prompt,
+    QUERY_PROCESSING_MODE,
+    QUERY_ADAPTIVE_MAX_WORDS
+)
+
+QUERY_MODES = ["staged", "fast", "adaptive"]
+
+def correct_spelling(query: str) -> str:
+    """Correct misspelled words with the dictionary spell corrector (no LLM call)."""
+    return spell_corrector.correct(query)
 
 def spell_check_query(state: QueryState) -> Dict[str, Any]:
     """Check and correct spelling in the query."""
@@ -17,19 +37,8 @@ def spell_check_query(state: QueryState) -> Dict[str, Any]:
         if not state.get("query"):
             return {"error": "No query provided"}
             
-        # Use pyspellchecker for spell checking
-        words = state["query"].split()
-        misspelled = spell.unknown(words)
-        
-        # Correct misspelled words
-        corrected_words = []
-        for word in words:
-            if word in misspelled:
-                corrected_words.append(spell.correction(word))
-            else:
-                corrected_words.append(word)
-                
-        corrected_query = " ".join(corrected_words)
+        # Correct spelling against the dictionary and domain vocabulary
+        corrected_query = correct_spelling(state["query"])
         
         # Use LLM for grammar correction
         grammar_corrected = llm.invoke(spell_check_prompt.format(query=corrected_query))
@@ -99,15 +108,127 @@ def improve_query(state: QueryState) -> Dict[str, Any]:
     except Exception as e:
         return {"error": str(e)}
 
-def build_query_graph() -> StateGraph:
+def is_simple_query(query: str) -> bool:
+    """
+    Decide whether a query is short and well-formed enough to skip the LLM stages.
+    
+    A simple query has at most QUERY_ADAPTIVE_MAX_WORDS words, asks a single question and
+    has no words the spell checker does not know.
+    """
+    words = re.findall(r"[A-Za-z']+", query)
+    if not words or len(words) > QUERY_ADAPTIVE_MAX_WORDS:
+        return False
+    if query.count("?") > 1 or re.search(r";|\b(and|or|versus|vs)\b", query, re.IGNORECASE):
+        return False
+    return not spell_corrector.unknown(words)
+
+def parse_query_analysis(result: str, query: str) -> Dict[str, Any]:
+    """
+    Parse the JSON produced by the single-call analysis into query state fields.
+    
+    Missing or malformed fields fall back to the original query so later steps always
+    have something to work with.
+    """
+    try:
+        analysis = json.loads(result[result.index("{"):result.rindex("}") + 1], strict=False)
+    except ValueError:
+        analysis = {}
+    if not isinstance(analysis, dict):
+        analysis = {}
+    
+    def as_list(value: Any) -> List[str]:
+        if isinstance(value, str):
+            value = value.split("\n")
+        return [str(item).strip() for item in value or [] if str(item).strip()]
+    
+    corrected = str(analysis.get("corrected_query") or "").strip() or query
+    return {
+        "spell_checked_query": corrected,
+        "decomposed_queries": as_list(analysis.get("sub_queries")) or [corrected],
+        "hypotheses": as_list(analysis.get("hypotheses")),
+        "improved_query": str(analysis.get("improved_query") or "").strip() or corrected
+    }
+
+def analyze_query(state: QueryState) -> Dict[str, Any]:
+    """Produce the outputs of all four stages from one structured LLM call."""
+    try:
+        if not state.get("query"):
+            return {"error": "No query provided"}
+        
+        corrected_query = correct_spelling(state["query"])
+        result = llm.invoke(query_analysis_prompt.format(query=corrected_query))
+        return parse_query_analysis(result, corrected_query)
+    except Exception as e:
+        return {"error": str(e)}
+
+def pass_through_query(state: QueryState) -> Dict[str, Any]:
+    """Use a simple query as is, with dictionary spell correction only."""
+    try:
+        if not state.get("query"):
+            return {"error": "No query provided"}
+        
+        corrected_query = correct_spelling(state["query"])
+        return {
+            "spell_checked_query": corrected_query,
+            "decomposed_queries": [corrected_query],
+            "hypotheses": [],
+            "improved_query": corrected_query
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+def _timed(name: str, node: Callable[[QueryState], Dict[str, Any]], llm_calls: int) -> Callable[[QueryState], Dict[str, Any]]:
+    """Wrap a graph node so it records its latency and LLM calls in the state."""
+    def run(state: QueryState) -> Dict[str, Any]:
+        start = time.perf_counter()
+        result = node(state)
+        timings = dict(state.get("stage_timings") or {})
+        timings[name] = round(time.perf_counter() - start, 3)
+        return {
+            **result,
+            "stage_timings": timings,
+            "llm_calls": (state.get("llm_calls") or 0) + llm_calls
+        }
+    return run
+
+def build_query_graph(mode: str = QUERY_PROCESSING_MODE) -> StateGraph:
     """
     Build the query processing workflow graph.
     
+    Args:
+        mode (str): "staged" runs spell check, decomposition, hypotheses and improvement as
+            four LLM calls; "fast" produces all four from one structured call; "adaptive"
+            passes short, well-formed queries through without an LLM call and uses the
+            fast path for the rest
+    
     Returns:
         StateGraph: The configured query processing workflow
     """
+    if mode not in QUERY_MODES:
+        raise ValueError(f"Unknown query processing mode: {mode}")
+    
     workflow = StateGraph(QueryState)
     
+    if mode != "staged":
+        def select_path(state: QueryState) -> str:
+            """Route simple queries past the LLM in adaptive mode."""
+            if mode == "adaptive" and is_simple_query(state.get("query") or ""):
+                return "pass_through_query"
+            return "analyze_query"
+        
+        workflow.add_node("analyze_query", _timed("analyze_query", analyze_query, 1))
+        workflow.add_node("pass_through_query", _timed("pass_through_query", pass_through_query, 0))
+        workflow.add_edge("analyze_query", END)
+        workflow.add_edge("pass_through_query", END)
+        workflow.set_conditional_entry_point(
+            select_path,
+            {
+                "analyze_query": "analyze_query",
+                "pass_through_query": "pass_through_query"
+            }
+        )
+        return workflow.compile()
+    
     def router(state: QueryState) -> str:
         """Route the workflow based on current state."""
         if "error" in state and state["error"]:
@@ -124,10 +245,10 @@ def build_query_graph() -> StateGraph:
         return "end"
     
     # Add nodes to the workflow
-    workflow.add_node("spell_check_query", spell_check_query)
-    workflow.add_node("decompose_query", decompose_query)
-    workflow.add_node("identify_hypotheses", identify_hypotheses)
-    workflow.add_node("improve_query", improve_query)
+    workflow.add_node("spell_check_query", _timed("spell_check_query", spell_check_query, 1))
+    workflow.add_node("decompose_query", _timed("decompose_query", decompose_query, 1))
+    workflow.add_node("identify_hypotheses", _timed("identify_hypotheses", identify_hypotheses, 1))
+    workflow.add_node("improve_query", _timed("improve_query", improve_query, 1))
     
     # Add edges to the workflow
     for node in ["spell_check_query", "decompose_query", "identify_hypotheses", "improve_query"]:
@@ -144,4 +265,50 @@ def build_query_graph() -> StateGraph:
         )
     
     workflow.set_entry_point("spell_check_query")
-    return workflow.compile() 
\ No newline at end of file
+    return workflow.compile()
+
+def compare_query_modes(queries: List[str], modes: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the same queries through each processing mode and report their latency.
+    
+    Args:
+        queries (List[str]): Queries to process
+        modes (Optional[List[str]]): Modes to compare (defaults to all of them)
+    
+    Returns:
+        Dict[str, Dict[str, Any]]: Per mode, the mean and median latency in seconds, the
+            total number of LLM calls, the mean time spent in each stage and any errors
+    """
+    report = {}
+    for mode in modes or QUERY_MODES:
+        graph = build_query_graph(mode)
+        latencies = []
+        stage_totals: Dict[str, float] = {}
+        llm_calls = 0
+        errors = 0
+        for query in queries:
+            start = time.perf_counter()
+            result = graph.invoke({"query": query})
+            latencies.append(time.perf_counter() - start)
+            llm_calls += result.get("llm_calls") or 0
+            errors += int(bool(result.get("error")))
+            for stage, seconds in (result.get("stage_timings") or {}).items():
+                stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+        report[mode] = {
+            "mean_seconds": round(statistics.mean(latencies), 3) if latencies else 0,
+            "median_seconds": round(statistics.median(latencies), 3) if latencies else 0,
+            "llm_calls": llm_calls,
+            "stage_seconds": {stage: round(total / len(queries), 3) for stage, total in stage_totals.items()},
+            "errors": errors
+        }
+    return report
+
+if __name__ == "__main__":
+    from ..config.settings import EXAMPLE_QUESTIONS
+    
+    report = compare_query_modes(EXAMPLE_QUESTIONS)
+    print(f"{'mode':<10} {'mean (s)':>10} {'median (s)':>11} {'LLM calls':>10} {'errors':>7}")
+    for mode, row in report.items():
+        print(f"{mode:<10} {row['mean_seconds']:>10} {row['median_seconds']:>11} {row['llm_calls']:>10} {row['errors']:>7}")
+    for mode, row in report.items():
+        print(f"\n{mode} stages: {row['stage_seconds']}")
@@ -0,0 +1,143 @@
+import threading
+import pytest
+from src.api.services import answers, faqs, qa
+from src.api.services.answer_cache import AnswerCache
+from src.common.faq_index import FAQIndex
+
+class CountingChain:
+    """Stand-in for a QA chain without memory that counts how often it runs."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def acall(self, inputs, callbacks=None, **kwargs):
+        self.calls += 1
+        return {"answer": f"answer {self.calls}", "source_documents": []}
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(qa, "_qa_semaphore", None)
+    monkeypatch.setattr(answers, "answer_cache", AnswerCache(path=None))
+    monkeypatch.setattr(answers, "get_faq_index", lambda document_hash: None)
+
+@pytest.mark.asyncio
+async def test_repeated_question_is_served_from_cache():
+    chain = CountingChain()
+
+    first = await answers.answer_question(chain, "What is this document about?", "doc-1")
+    second = await answers.answer_question(chain, "  what is this document ABOUT ", "doc-1")
+
+    assert chain.calls == 1
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert second["response"] == first["response"]
+
+@pytest.mark.asyncio
+async def test_bypass_and_other_documents_run_the_chain():
+    chain = CountingChain()
+
+    await answers.answer_question(chain, "What is this document about?", "doc-1")
+    bypassed = await answers.answer_question(chain, "What is this document about?", "doc-1", bypass_cache=True)
+    other = await answers.answer_question(chain, "What is this document about?", "doc-2")
+
+    assert chain.calls == 3
+    assert not bypassed["cached"] and not other["cached"]
+
+@pytest.mark.asyncio
+async def test_persistent_cache_is_read_and_written_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+
+    class RecordingCache(AnswerCache):
+        def get(self, key):
+            threads.append(threading.get_ident())
+            return super().get(key)
+
+        def put(self, key, value):
+            threads.append(threading.get_ident())
+            super().put(key, value)
+
+    monkeypatch.setattr(answers, "answer_cache", RecordingCache(path=str(tmp_path / "answers.sqlite")))
+    chain = CountingChain()
+
+    await answers.answer_question(chain, "What is this document about?", "doc-1")
+    second = await answers.answer_question(chain, "What is this document about?", "doc-1")
+
+    assert second["cached"] and chain.calls == 1
+    assert len(threads) == 3 and threading.get_ident() not in threads
+
+def test_expired_entries_are_dropped():
+    cache = AnswerCache(ttl_seconds=0, path=None)
+    cache.put("key", {"response": "old", "sources": []})
+
+    assert cache.get("key") is None
+
+class KeywordEmbeddings:
+    """Embeds a text as a one-hot vector of the keywords it mentions."""
+
+    keywords = ["deadline", "penalty", "scope"]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float(keyword in text.lower()) for keyword in self.keywords]
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+@pytest.mark.asyncio
+async def test_matching_faq_answers_without_the_chain(monkeypatch):
+    faqs = [
+        {"question": "What is the filing deadline?", "answer": "March 31."},
+        {"question": "What is the penalty?", "answer": "A fine."}
+    ]
+    index = FAQIndex(faqs, KeywordEmbeddings())
+    monkeypatch.setattr(answers, "get_faq_index", lambda document_hash: index)
+    chain = CountingChain()
+
+    hit = await answers.answer_question(chain, "When is the deadline?", "doc-1")
+    miss = await answers.answer_question(chain, "Who is in scope?", "doc-1")
+
+    assert chain.calls == 1
+    assert hit["response"] == "March 31."
+    assert hit["faq_match"]["question"] == "What is the filing deadline?"
+    assert hit["faq_match"]["score"] == pytest.approx(1.0)
+    assert miss["faq_match"] is None
+
+class ChatMemory:
+    def __init__(self, messages):
+        self.chat_memory = type("ChatMessages", (), {"messages": list(messages)})()
+
+    def save_context(self, inputs, outputs):
+        self.chat_memory.messages += [inputs["question"], outputs["answer"]]
+
+@pytest.mark.asyncio
+async def test_follow_up_questions_do_not_take_the_faq_path(monkeypatch):
+    index = FAQIndex([{"question": "What is the penalty?", "answer": "A fine."}], KeywordEmbeddings())
+    monkeypatch.setattr(answers, "get_faq_index", lambda document_hash: index)
+    chain = CountingChain()
+    chain.memory = ChatMemory(["Who must report incidents?", "Operators."])
+
+    follow_up = await answers.answer_question(chain, "What is the penalty for that?", "doc-1")
+
+    assert chain.calls == 1
+    assert follow_up["faq_match"] is None and follow_up["response"] == "answer 1"
+
+def test_document_faqs_are_generated_once_from_sections(monkeypatch):
+    stored = {}
+    invocations = []
+
+    class FakeFAQGraph:
+        def invoke(self, state):
+            invocations.append(state["chunks"])
+            return {"faqs": [{"question": "Q?", "answer": "A."}], "error": None}
+
+    monkeypatch.setattr(faqs, "_faq_graph", FakeFAQGraph())
+    monkeypatch.setattr(faqs, "get_faqs", stored.get)
+    monkeypatch.setattr(faqs, "put_faqs", stored.__setitem__)
+    chunks = ["a" * 3000, "b" * 800, "c" * 3000]
+
+    first = faqs.generate_document_faqs("doc", chunks)
+    second = faqs.generate_document_faqs("doc", chunks)
+
+    assert first == second == [{"question": "Q?", "answer": "A."}]
+    assert invocations == [["a" * 3000 + "\n" + "b" * 800, "c" * 3000]]
@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+from src.common.memory import RollingSummary
+from src.common.tokens import estimate_tokens
+
+def turn(i):
+    return [
+        SimpleNamespace(type="human", content=f"question {i} " + "q" * 80),
+        SimpleNamespace(type="ai", content=f"answer {i} " + "a" * 160)
+    ]
+
+def test_history_stays_within_budget_with_a_rolling_summary():
+    calls = []
+
+    def summarize(summary, new_lines):
+        calls.append(new_lines)
+        return (summary + " | " if summary else "") + f"{new_lines.count('Human:')} turns"
+
+    rolling = RollingSummary(summarize, max_tokens=300, window_tokens=150)
+    messages = []
+    sizes = []
+    for i in range(12):
+        messages += turn(i)
+        rolling.schedule(messages)
+        rolling.wait()
+        summary, recent = rolling.select(messages)
+        sizes.append(estimate_tokens(summary) + sum(estimate_tokens(m.content) for m in recent))
+        # Recent messages are whole turns, newest last
+        assert recent[-1] is messages[-1] and recent[0].type == "human"
+
+    assert max(sizes) <= 300
+    assert calls and all(lines.startswith("Human: question") for lines in calls)
+    assert rolling.summarized == len(messages) - len(recent)
+
+    # A replaced, shorter history drops the stale summary
+    assert rolling.select(messages[:2]) == ("", messages[:2])
@@ -0,0 +1,26 @@
+from src.common.context import context_candidates, pack_context
+from src.common.tokens import estimate_tokens
+
+def test_context_is_packed_by_relevance_within_budget():
+    faqs = [{"question": f"Question {i}?", "answer": "x" * 200} for i in range(100)]
+    candidates = context_candidates(
+        [1.0, 0.0],
+        summary="s" * 400,
+        summary_vector=[0.5, 0.5],
+        faqs=faqs,
+        faq_vectors=[[1.0, i / 10] for i in range(100)],
+        chunks=["c" * 800, "d" * 800],
+        chunk_vectors=[[0.9, 0.1], [0.0, 1.0]]
+    )
+
+    packed = pack_context(candidates, budget=500)
+
+    assert packed["total_tokens"] <= 500
+    assert estimate_tokens(packed["text"]) <= 500
+    assert packed["total_tokens"] == sum(packed["tokens"].values())
+    # The most relevant FAQs and chunk are kept; the unrelated chunk is not
+    assert "Question 0?" in packed["text"] and "Question 99?" not in packed["text"]
+    assert "c" * 800 in packed["text"] and "d" * 800 not in packed["text"]
+    assert packed["candidates"] == {"summary": 1, "faqs": 100, "chunks": 2}
+    assert packed["dropped"]["faqs"] > 90
+    assert packed["text"].index("Relevant FAQs:") < packed["text"].index("Relevant Document Chunks:")
@@ -0,0 +1,77 @@
+import numpy as np
+from src.common.corpus_index import CorpusIndex, choose_index_kind, exact_top_k, synthetic_vectors
+
+def test_index_kind_follows_corpus_size():
+    assert choose_index_kind(1000, flat_max_vectors=2000, hnsw_max_vectors=5000) == "flat"
+    assert choose_index_kind(3000, flat_max_vectors=2000, hnsw_max_vectors=5000) == "hnsw"
+    assert choose_index_kind(6000, flat_max_vectors=2000, hnsw_max_vectors=5000) == "ivf"
+
+    vectors = synthetic_vectors(3000, 16, clusters=20)
+    index = CorpusIndex(flat_max_vectors=1000, hnsw_max_vectors=2000, nlist=16, nprobe=16)
+    index.add("a", vectors[:1000], [f"a{i}" for i in range(1000)])
+    assert index.search(vectors[5], k=1)[0] == {"document_id": "a", "chunk": 5, "score": 1.0, "text": "a5"}
+    assert index.index_kind == "flat"
+    index.add("b", vectors[1000:2000])
+    index.search(vectors[0])
+    assert index.index_kind == "hnsw"
+    index.add("c", vectors[2000:])
+    hit = index.search(vectors[2500], k=1)[0]
+    assert index.index_kind == "ivf" and index.builds == 3
+    assert (hit["document_id"], hit["chunk"], hit["text"]) == ("c", 500, None)
+
+def test_approximate_search_recall_and_document_filters():
+    vectors = synthetic_vectors(4000, 32, clusters=40)
+    queries = vectors[:50] + np.random.default_rng(0).standard_normal((50, 32), dtype=np.float32) * 0.05
+    truth = exact_top_k(vectors, queries / np.linalg.norm(queries, axis=1, keepdims=True), 10)
+    for kind in ("hnsw", "ivf"):
+        index = CorpusIndex(kind, flat_max_vectors=100, nlist=32, nprobe=8)
+        for i in range(4):
+            index.add(f"doc-{i}", vectors[i * 1000:(i + 1) * 1000])
+        found = [
+            {int(hit["document_id"][4:]) * 1000 + hit["chunk"] for hit in index.search(query, k=10)}
+            for query in queries
+        ]
+        assert np.mean([len(rows & set(top.tolist())) / 10 for rows, top in zip(found, truth)]) > 0.9
+
+        # Filtered searches only return the requested documents, exactly or through the index
+        for documents in (["doc-2"], ["doc-1", "doc-3"]):
+            hits = index.search(vectors[0], k=20, documents=documents)
+            assert len(hits) == 20 and {hit["document_id"] for hit in hits} <= set(documents)
+        assert index.search(vectors[0], documents=["unknown"]) == []
+
+def test_removed_documents_are_filtered_then_compacted():
+    vectors = synthetic_vectors(2000, 16, clusters=10)
+    index = CorpusIndex("flat")
+    for i in range(4):
+        index.add(f"doc-{i}", vectors[i * 500:(i + 1) * 500])
+    index.search(vectors[0])
+    assert index.remove("doc-0") and not index.remove("doc-0")
+    assert all(hit["document_id"] != "doc-0" for hit in index.search(vectors[0], k=50))
+    # A quarter of the rows removed: filtered out, not compacted yet
+    assert index.stats()["removed_vectors"] == 500 and index.builds == 1
+    index.remove("doc-1")
+    hit = index.search(vectors[1700], k=1)[0]
+    assert (hit["document_id"], hit["chunk"]) == ("doc-3", 200)
+    assert index.stats()["removed_vectors"] == 0 and index.builds == 2 and len(index) == 1000
+
+def test_corpus_is_filled_from_the_shared_artifact_cache(tmp_path, monkeypatch):
+    from src.api.services import artifacts, corpus
+    from src.common.cache import ArtifactCache
+
+    cache = ArtifactCache(str(tmp_path))
+    version = (artifacts.EXTRACTOR_VERSION, artifacts.CHUNKER_VERSION)
+    vectors = synthetic_vectors(6, 8, clusters=2)
+    # Documents ingested by another worker: only their artifacts are shared
+    for document_hash, rows in (("a" * 64, vectors[:3]), ("b" * 64, vectors[3:])):
+        cache.put(document_hash, "chunks", [f"{document_hash[0]}{i}" for i in range(3)], *version)
+        cache.put_vectors(document_hash, "embeddings", rows, *version, artifacts.EMBEDDING_MODEL_NAME)
+    monkeypatch.setattr(artifacts, "artifact_cache", cache)
+    monkeypatch.setattr(corpus, "artifact_cache", cache)
+    monkeypatch.setattr(corpus, "corpus_index", CorpusIndex())
+    monkeypatch.setattr(corpus, "_refreshed_at", None)
+
+    hits = corpus.search_corpus(vectors[4], k=1)
+    assert hits[0]["document_id"] == "b" * 64 and hits[0]["text"] == "b1"
+    assert sorted(corpus.corpus_index.documents) == ["a" * 64, "b" * 64]
+    # Later searches only rescan the cache once the refresh interval has passed
+    assert corpus.refresh_corpus() == 0
@@ -0,0 +1,32 @@
+import threading
+import numpy as np
+from src.common.cache import EmbeddingCache
+
+def vector(i):
+    return np.full(8, i, dtype=np.float32)
+
+def test_rows_are_not_reused_between_lookup_and_read(tmp_path):
+    # Two instances stand in for two workers sharing the cache; it holds 4 vectors
+    writer = EmbeddingCache(str(tmp_path), max_bytes=4 * 8 * 4)
+    reader = EmbeddingCache(str(tmp_path), max_bytes=4 * 8 * 4)
+    writer.put_many([f"text-{i}" for i in range(4)], [vector(i) for i in range(4)])
+    lookup = reader._lookup
+    writes = []
+
+    def lookup_then_let_writer_evict(keys):
+        slots = lookup(keys)
+        # Another worker caches new texts, evicting every row, between the lookup and the read
+        evict = threading.Thread(target=writer.put_many, args=([f"text-{i}" for i in range(4, 8)], [vector(i) for i in range(4, 8)]))
+        evict.start()
+        writes.append(evict)
+        evict.join(0.5)
+        return slots
+
+    reader._lookup = lookup_then_let_writer_evict
+    found = reader.get_many(["text-0", "text-1"])
+
+    assert {key: value[0] for key, value in found.items()} == {"text-0": 0, "text-1": 1}
+    reader._lookup = lookup
+    writes[0].join(5)
+    assert reader.get_many(["text-0"]) == {}
+    assert reader.get_many(["text-5"])["text-5"][0] == 5
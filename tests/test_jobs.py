@@ -0,0 +1,55 @@
+import threading
+from src.api.services.jobs import JobManager
+from src.api.services.session_store import FileSessionBackend
+
+def test_jobs_report_progress_and_failures():
+    manager = JobManager(max_workers=1, history_size=1)
+
+    def ingest(pages, on_progress):
+        for page in range(1, pages + 1):
+            on_progress({"stage": "ingesting", "pages_extracted": page})
+        return {"pages": pages}
+
+    def broken(on_progress):
+        on_progress({"stage": "ingesting"})
+        raise ValueError("not a PDF")
+
+    job = manager.submit("ingest", ingest, 3, subject="session")
+    manager.future(job.id).result()
+    status = manager.get(job.id).to_dict()
+    assert status["status"] == "succeeded"
+    assert status["progress"] == {"stage": "done", "pages_extracted": 3}
+    assert status["result"] == {"pages": 3}
+
+    failed = manager.submit("ingest", broken)
+    manager.future(failed.id).exception()
+    assert manager.get(failed.id).status == "failed"
+    assert manager.get(failed.id).error == "not a PDF"
+    # Only the most recent finished job is kept
+    assert manager.get(job.id) is None
+    assert manager.stats() == {"failed": 1}
+
+def test_job_status_is_shared_through_the_store(tmp_path):
+    store = FileSessionBackend(str(tmp_path))
+    worker_a = JobManager(max_workers=1, store=store, save_interval=0)
+    worker_b = JobManager(store=FileSessionBackend(str(tmp_path)))
+    started, release = threading.Event(), threading.Event()
+
+    def ingest(on_progress):
+        on_progress({"stage": "ingesting", "pages_extracted": 2})
+        started.set()
+        release.wait(5)
+        return {"pages": 2}
+
+    job = worker_a.submit("ingest", ingest, subject="session")
+    started.wait(5)
+    # Worker B never ran the job, but reports its progress from the store
+    status = worker_b.status(job.id)
+    assert status["status"] == "running"
+    assert status["progress"]["pages_extracted"] == 2
+
+    release.set()
+    worker_a.future(job.id).result()
+    assert worker_b.status(job.id)["status"] == "succeeded"
+    assert worker_b.status(job.id)["result"] == {"pages": 2}
+    assert worker_b.status("unknown") is None
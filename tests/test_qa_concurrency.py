@@ -0,0 +1,66 @@
+import asyncio
+import time
+import pytest
+from src.api.services import qa
+
+class SlowChain:
+    """Stand-in for a QA chain whose LLM takes `delay` seconds to produce an answer."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.started = None
+        self.finished = None
+
+    async def acall(self, inputs, callbacks=None, **kwargs):
+        self.started = time.monotonic()
+        for token in ["slow ", "answer"]:
+            await asyncio.sleep(self.delay / 2)
+            for callback in callbacks or []:
+                await callback.on_llm_new_token(token)
+        self.finished = time.monotonic()
+        return {"answer": "slow answer", "source_documents": []}
+
+@pytest.fixture(autouse=True)
+def fresh_semaphore(monkeypatch):
+    """Give every test its own semaphore bound to its own event loop."""
+    monkeypatch.setattr(qa, "_qa_semaphore", None)
+
+@pytest.mark.asyncio
+async def test_two_sessions_progress_concurrently():
+    first, second = SlowChain(0.5), SlowChain(0.5)
+
+    start = time.monotonic()
+    results = await asyncio.gather(
+        qa.arun_qa_chain(first, "What is this document about?"),
+        qa.arun_qa_chain(second, "What are the key requirements?")
+    )
+    elapsed = time.monotonic() - start
+
+    assert [result["answer"] for result in results] == ["slow answer", "slow answer"]
+    # Both chains were running at the same time instead of queueing
+    assert second.started < first.finished
+    assert elapsed < 0.9
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_queues_extra_chats(monkeypatch):
+    monkeypatch.setattr(qa, "QA_MAX_CONCURRENCY", 1)
+    first, second = SlowChain(0.2), SlowChain(0.2)
+
+    await asyncio.gather(qa.arun_qa_chain(first, "q1"), qa.arun_qa_chain(second, "q2"))
+
+    assert second.started >= first.finished
+
+@pytest.mark.asyncio
+async def test_streams_interleave_across_sessions():
+    frames = []
+
+    async def consume(name: str):
+        async for frame in qa.astream_qa_chain(SlowChain(0.4), "q"):
+            frames.append((name, frame["type"]))
+
+    await asyncio.gather(consume("a"), consume("b"))
+
+    first_end = frames.index(next(frame for frame in frames if frame[1] == "end"))
+    # Both sessions received tokens before either one finished
+    assert {name for name, kind in frames[:first_end] if kind == "delta"} == {"a", "b"}
+    assert frames.count(("a", "end")) == 1 and frames.count(("b", "end")) == 1
@@ -0,0 +1,57 @@
+from src.common.retrieval import BM25Index, HybridSearcher, is_identifier_query, tokenize
+
+CHUNKS = [
+    "Section 4.2.1 requires operators to keep records of every XR-2000 inspection.",
+    "Section 4.2 covers general reporting duties of operators.",
+    "Annex B lists the forms used for incident reports.",
+    "Operators must train staff on safety procedures every year."
+]
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.queries = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return [0.0, 1.0]
+
+def test_identifiers_are_kept_whole_and_ranked_first():
+    assert tokenize("See Section 4.2.1 and XR-2000.") == ["see", "section", "4.2.1", "and", "xr-2000"]
+    index = BM25Index(CHUNKS)
+    assert index.search("4.2.1", k=2) == index.search("4.2.1", k=1)
+    assert index.search("4.2.1", k=1)[0][0] == 0
+    assert index.search("annex b", k=1)[0][0] == 2
+    assert index.search("nothing matches") == []
+
+def test_identifier_queries_are_detected():
+    assert is_identifier_query("Section 4.2.1")
+    assert is_identifier_query("what does Annex B say?")
+    assert is_identifier_query("XR-2000 inspections")
+    assert is_identifier_query("Part IV")
+    assert not is_identifier_query("which part of the rules applies to staff training?")
+    assert not is_identifier_query("how often must staff be trained?")
+
+def test_everyday_reference_words_need_a_marked_label():
+    assert is_identifier_query("Form 10-K")
+    assert is_identifier_query("item 7a")
+    assert is_identifier_query("Item A")
+    assert is_identifier_query("what does item a. cover")
+    assert is_identifier_query("Form I")
+    assert not is_identifier_query("what form i need")
+    assert not is_identifier_query("what form I need")
+    assert not is_identifier_query("item a list")
+    assert not is_identifier_query("which part i should read")
+
+def test_hybrid_search_routes_identifier_queries_to_bm25():
+    embeddings = CountingEmbeddings()
+    vectors = [[1.0, 0.0], [1.0, 0.0], [1.0, 0.0], [0.0, 1.0]]
+    searcher = HybridSearcher(CHUNKS, vectors, embeddings, alpha=0.5)
+
+    assert searcher.search("Section 4.2.1", k=1)[0][0] == 0
+    assert embeddings.queries == 0
+
+    # Dense similarity and the shared term "operators" are fused
+    results = searcher.search("how often do operators train staff", k=2)
+    assert embeddings.queries == 1
+    assert results[0][0] == 3
+    assert all(0 <= score <= 1 for _, score in results)
@@ -0,0 +1,165 @@
+import threading
+from src.api.models.session import SessionState
+from src.api.services.session import SessionManager
+from src.api.services.session_store import FileSessionBackend, SQLiteSessionBackend
+
+def make_session(vector_bytes: int) -> SessionState:
+    return SessionState(pdf_path="doc.pdf", vector_bytes=vector_bytes, chunk_bytes=0)
+
+def test_idle_sessions_expire():
+    manager = SessionManager(ttl_seconds=60, memory_budget_bytes=10 ** 9)
+    manager.create_session("old", make_session(100))
+    manager.create_session("new", make_session(100))
+    manager._last_access["old"] -= 120
+
+    assert manager.get_session("old") is None
+    assert manager.get_session("new") is not None
+    assert manager.stats()["evictions"]["ttl"] == 1
+
+def test_least_recently_used_sessions_are_evicted_over_budget():
+    manager = SessionManager(ttl_seconds=3600, memory_budget_bytes=2500)
+    manager.create_session("a", make_session(1000))
+    manager.create_session("b", make_session(1000))
+    manager.get_session("a")
+    manager.create_session("c", make_session(1000))
+
+    assert [session["session_id"] for session in manager.stats()["sessions"]] == ["c", "a"]
+    assert manager.stats()["evictions"]["memory"] == 1
+
+def test_sessions_are_rehydrated_from_the_store(tmp_path):
+    store = FileSessionBackend(str(tmp_path))
+    rehydrated = []
+
+    def rehydrate(record):
+        rehydrated.append(record)
+        return "rebuilt chain"
+
+    SessionManager(store=store).create_session("s1", SessionState(pdf_path="doc.pdf", document_hash="abc"))
+
+    # A new manager stands in for a restarted server
+    restarted = SessionManager(store=store, rehydrate=rehydrate)
+    session = restarted.get_session("s1")
+
+    assert session["document_hash"] == "abc"
+    assert session["qa_chain"] == "rebuilt chain"
+    assert rehydrated[0]["chat_history"] == []
+    assert restarted.delete_session("s1")
+    assert SessionManager(store=store, rehydrate=rehydrate).get_session("s1") is None
+
+class FakeChatMemory:
+    def __init__(self):
+        self.messages = []
+
+    def clear(self):
+        self.messages = []
+
+    def add_user_message(self, content):
+        self.messages.append(type("Message", (), {"type": "human", "content": content})())
+
+    def add_ai_message(self, content):
+        self.messages.append(type("Message", (), {"type": "ai", "content": content})())
+
+class FakeChain:
+    def __init__(self):
+        self.memory = type("Memory", (), {"chat_memory": FakeChatMemory()})()
+
+def test_workers_share_sessions_through_sqlite(tmp_path):
+    store = SQLiteSessionBackend(str(tmp_path / "sessions.sqlite"))
+    worker_a = SessionManager(store=store, rehydrate=lambda record: FakeChain())
+    worker_b = SessionManager(store=SQLiteSessionBackend(store.path), rehydrate=lambda record: FakeChain())
+
+    worker_a.create_session("s1", SessionState(pdf_path="doc.pdf", document_hash="abc", qa_chain=FakeChain()))
+    chain_b = worker_b.get_session("s1")["qa_chain"]
+
+    # A turn answered on worker A reaches worker B's copy of the session
+    chain_a = worker_a.get_session("s1")["qa_chain"]
+    chain_a.memory.chat_memory.add_user_message("What is in scope?")
+    chain_a.memory.chat_memory.add_ai_message("Banks.")
+    worker_a.record_turn("s1")
+    assert [m.content for m in worker_b.get_session("s1")["qa_chain"].memory.chat_memory.messages] == ["What is in scope?", "Banks."]
+    assert worker_b.get_session("s1")["qa_chain"] is chain_b
+
+    worker_a.delete_session("s1")
+    assert worker_b.get_session("s1") is None
+
+def test_session_indexed_by_another_worker_gets_a_chain(tmp_path):
+    store = SQLiteSessionBackend(str(tmp_path / "sessions.sqlite"))
+    worker_a = SessionManager(store=store, rehydrate=lambda record: FakeChain())
+    worker_b = SessionManager(store=SQLiteSessionBackend(store.path), rehydrate=lambda record: FakeChain())
+
+    # Worker B loads the placeholder while worker A's job is still indexing the document
+    worker_a.create_session("s1", SessionState(pdf_path="doc.pdf", job_id="job-1"))
+    assert "qa_chain" not in worker_b.get_session("s1")
+
+    # The job installs the indexed session on worker A
+    worker_a.create_session("s1", SessionState(pdf_path="doc.pdf", document_hash="abc", qa_chain=FakeChain()))
+    session = worker_b.get_session("s1")
+    assert session["job_id"] is None
+    assert isinstance(session["qa_chain"], FakeChain)
+
+def test_rehydration_does_not_block_other_sessions(tmp_path):
+    store = FileSessionBackend(str(tmp_path))
+    SessionManager(store=store).create_session("cold", SessionState(pdf_path="doc.pdf", document_hash="abc"))
+    started, release = threading.Event(), threading.Event()
+    rebuilds = []
+
+    def rehydrate(record):
+        rebuilds.append(record["document_hash"])
+        started.set()
+        release.wait(5)
+        return FakeChain()
+
+    manager = SessionManager(store=store, rehydrate=rehydrate)
+    manager.create_session("warm", SessionState(pdf_path="doc.pdf", qa_chain=FakeChain()))
+    readers = [threading.Thread(target=manager.get_session, args=("cold",)) for _ in range(2)]
+    for reader in readers:
+        reader.start()
+    started.wait(5)
+
+    # The cold session is being rebuilt; the warm one is still served meanwhile
+    warm = []
+    lookup = threading.Thread(target=lambda: warm.append(manager.get_session("warm")))
+    lookup.start()
+    lookup.join(1)
+    assert warm and isinstance(warm[0]["qa_chain"], FakeChain)
+    release.set()
+    for reader in readers:
+        reader.join(5)
+    assert rebuilds == ["abc"]
+    assert isinstance(manager.get_session("cold")["qa_chain"], FakeChain)
+
+class SlowStore(FileSessionBackend):
+    def __init__(self, root):
+        super().__init__(root)
+        self.saving, self.release = threading.Event(), threading.Event()
+        self.block = False
+
+    def save(self, session_id, record):
+        if self.block:
+            self.saving.set()
+            self.release.wait(5)
+        return super().save(session_id, record)
+
+def test_recording_a_turn_writes_the_store_outside_the_lock(tmp_path):
+    store = SlowStore(str(tmp_path))
+    manager = SessionManager(store=store)
+    manager.create_session("a", SessionState(pdf_path="doc.pdf", qa_chain=FakeChain()))
+    manager.create_session("b", SessionState(pdf_path="doc.pdf", qa_chain=FakeChain()))
+    manager.get_session("a")["qa_chain"].memory.chat_memory.add_user_message("What is in scope?")
+
+    store.block = True
+    writer = threading.Thread(target=manager.record_turn, args=("a",))
+    writer.start()
+    store.saving.wait(5)
+
+    # Both sessions are served while the turn is being written
+    lookups = []
+    lookup = threading.Thread(target=lambda: lookups.extend([manager.get_session("b"), manager.get_session("a")]))
+    lookup.start()
+    lookup.join(1)
+    assert len(lookups) == 2
+    assert [m.content for m in lookups[1]["qa_chain"].memory.chat_memory.messages] == ["What is in scope?"]
+    store.release.set()
+    writer.join(5)
+    assert store.load("a")["chat_history"] == [{"role": "user", "content": "What is in scope?"}]
+    assert manager.delete_session("a") and store.load("a") is None
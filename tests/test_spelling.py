@@ -0,0 +1,26 @@
+from src.common.spelling import SpellCorrector, harvest_vocabulary
+
+DICTIONARY = {"the": 1000, "requirements": 50, "compliance": 40, "regulation": 30, "complains": 5}
+
+def test_corrects_misspellings_and_keeps_formatting():
+    corrector = SpellCorrector(DICTIONARY)
+
+    assert corrector.correct("The requirments for complaince?") == "The requirements for compliance?"
+    assert corrector.correct("GDPR regulaton") == "GDPR regulation"
+
+def test_domain_vocabulary_is_not_corrected():
+    corrector = SpellCorrector(DICTIONARY)
+    assert corrector.correct("the compliancy regime") == "the compliance regime"
+
+    corrector.add_vocabulary(harvest_vocabulary(["A compliancy regime. The compliancy rules."]))
+
+    assert corrector.correct("the compliancy regime") == "the compliancy regime"
+    assert not corrector.unknown(["compliancy"])
+
+def test_deletion_index_is_built_on_first_use():
+    corrector = SpellCorrector(DICTIONARY)
+    assert corrector.stats()["indexed_deletes"] == 0
+
+    assert corrector.correct("regulaton") == "regulation"
+    assert corrector.stats()["words"] == len(DICTIONARY)
+    assert corrector.stats()["indexed_deletes"] > 0
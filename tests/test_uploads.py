@@ -0,0 +1,30 @@
+import asyncio
+import hashlib
+import io
+import os
+import time
+from fastapi import UploadFile
+from src.api.services.uploads import UploadStore, UploadTooLarge
+
+def test_uploads_are_streamed_deduplicated_and_purged(tmp_path):
+    store = UploadStore(str(tmp_path), chunk_bytes=4, max_bytes=64, ttl_seconds=60)
+    content = b"%PDF-1.4 streamed in small chunks"
+
+    first = asyncio.run(store.save(UploadFile(io.BytesIO(content), filename="a.pdf")))
+    second = asyncio.run(store.save(UploadFile(io.BytesIO(content), filename="b.pdf")))
+    assert first["document_id"] == second["document_id"] == hashlib.sha256(content).hexdigest()
+    assert first["bytes"] == len(content)
+    assert os.listdir(tmp_path) == [f"{first['document_id']}.pdf"]
+    assert store.resolve("../../etc/passwd") is None
+
+    try:
+        asyncio.run(store.save(UploadFile(io.BytesIO(b"x" * 65), filename="big.pdf")))
+        assert False, "oversized upload accepted"
+    except UploadTooLarge:
+        pass
+    assert len(os.listdir(tmp_path)) == 1
+
+    path = store.resolve(first["document_id"])
+    os.utime(path, (time.time() - 120, time.time() - 120))
+    assert store.purge() == 1
+    assert store.resolve(first["document_id"]) is None
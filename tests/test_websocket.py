@@ -24,7 +24,8 @@ async def test_websocket_chat():
         # Create session
         response = requests.post(
             f"{BASE_URL}/sessions/{session_id}",
-            json={"pdf_path": pdf_path}
+            json={"pdf_path": pdf_path},
+            params={"wait": "true"}  # Block until the document is indexed
         )
         response.raise_for_status()
         logger.info(f"Created session: {session_id}")